@@ -0,0 +1,26 @@
+"""
+Management command to render responsive renditions of candidate profile images.
+"""
+from django.core.management.base import BaseCommand
+from candidates.models import Candidate
+from candidates.thumbnails import refresh_variants
+
+
+class Command(BaseCommand):
+    help = 'Renders the resized WebP/JPEG renditions of candidate profile images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render candidates whose renditions are already up to date',
+        )
+
+    def handle(self, *args, **options):
+        for candidate in Candidate.objects.exclude(profile_image='').exclude(profile_image__isnull=True):
+            refresh_variants(candidate.pk, force=options['force'])
+            candidate.refresh_from_db()
+            widths = [rendition['width'] for rendition in candidate.image_variants.get('jpeg', [])]
+            self.stdout.write(
+                self.style.SUCCESS(f'{candidate.name}: {widths}')
+            )
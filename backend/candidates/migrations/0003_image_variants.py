@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0002_candidate_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized renditions of profile_image, maintained by candidates.thumbnails'),
+        ),
+    ]
@@ -14,6 +14,12 @@ class Candidate(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True, help_text="Brief description of the candidate")
     profile_image = models.ImageField(upload_to='candidates/', blank=True, null=True)
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized renditions of profile_image, maintained by candidates.thumbnails"
+    )
     linkedin_url = models.URLField(max_length=500)
     team_id = models.IntegerField(help_text="Team identifier (1 or 2)")
     created_at = models.DateTimeField(default=timezone.now)
@@ -1,6 +1,7 @@
 """
 Serializers for Candidate model.
 """
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from .models import Candidate
 
@@ -8,17 +9,47 @@ from .models import Candidate
 class CandidateSerializer(serializers.ModelSerializer):
     """Serializer for Candidate model."""
     profile_image_url = serializers.SerializerMethodField()
+    profile_image_srcset = serializers.SerializerMethodField()
+    profile_image_original_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Candidate
-        fields = ['id', 'name', 'description', 'profile_image', 'profile_image_url', 'linkedin_url', 'team_id', 'created_at']
+        fields = [
+            'id', 'name', 'description', 'profile_image', 'profile_image_url',
+            'profile_image_srcset', 'profile_image_original_url', 'linkedin_url', 'team_id', 'created_at'
+        ]
         read_only_fields = ['id', 'created_at']
     
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else None
+    
     def get_profile_image_url(self, obj):
-        """Get full URL for profile image."""
+        """
+        Get full URL for the profile image: the largest JPEG rendition,
+        or the original upload until its renditions are ready.
+        """
+        if not obj.profile_image:
+            return None
+        renditions = obj.image_variants.get('jpeg')
+        if renditions:
+            return self._absolute(default_storage.url(renditions[-1]['path']))
+        return self._absolute(obj.profile_image.url)
+    
+    def get_profile_image_srcset(self, obj):
+        """``srcset`` strings per format, e.g. {'webp': '<url> 160w, <url> 320w', 'jpeg': ...}."""
+        if not obj.profile_image or not obj.image_variants.get('jpeg'):
+            return None
+        return {
+            name: ', '.join(
+                f"{self._absolute(default_storage.url(rendition['path']))} {rendition['width']}w"
+                for rendition in obj.image_variants[name]
+            )
+            for name in ('webp', 'jpeg')
+        }
+    
+    def get_profile_image_original_url(self, obj):
+        """Full-size upload, for explicit download only."""
         if obj.profile_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.profile_image.url)
+            return self._absolute(obj.profile_image.url)
         return None
-
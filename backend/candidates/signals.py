@@ -0,0 +1,23 @@
+"""
+Signal handlers for the candidates app.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from voting_platform.conditional import bump_version
+from .models import Candidate
+from .thumbnails import needs_refresh, schedule_variants
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def bump_candidates_version(sender, instance, **kwargs):
+    """Invalidate ETags of every response that lists candidates."""
+    bump_version('candidates')
+
+
+@receiver(post_save, sender=Candidate)
+def render_image_variants(sender, instance, raw=False, **kwargs):
+    """Render responsive renditions after a new profile image is saved."""
+    if not raw and needs_refresh(instance):
+        schedule_variants(instance.pk)
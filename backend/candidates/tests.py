@@ -0,0 +1,104 @@
+"""
+Tests for the candidates app.
+"""
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import Candidate
+
+User = get_user_model()
+
+
+def make_image(width, height, name='portrait.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), (20, 120, 200)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(CANDIDATE_IMAGES_IN_BACKGROUND=False, CANDIDATE_IMAGE_WIDTHS=[160, 320, 640])
+class CandidateImageTest(TestCase):
+    """Test the responsive renditions of candidate profile images."""
+    
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.client.force_authenticate(user=self.admin)
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def create_candidate(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/candidates/create/', {
+                'name': 'Test Candidate',
+                'linkedin_url': 'https://www.linkedin.com/in/test/',
+                'team_id': 1,
+                'profile_image': image,
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Candidate.objects.get(pk=response.data['id'])
+    
+    def test_upload_renders_renditions(self):
+        """Test that an upload yields hashed WebP/JPEG renditions and srcsets."""
+        candidate = self.create_candidate(make_image(1000, 800))
+        variants = candidate.image_variants
+        self.assertEqual(variants['source'], candidate.profile_image.name)
+        self.assertEqual([rendition['width'] for rendition in variants['webp']], [160, 320, 640])
+        for rendition in variants['jpeg']:
+            self.assertTrue(rendition['path'].startswith(f"candidates/variants/{variants['hash']}-"))
+            self.assertTrue(default_storage.exists(rendition['path']))
+        with default_storage.open(variants['webp'][0]['path']) as rendition:
+            self.assertEqual(Image.open(rendition).size, (160, 128))
+        
+        data = self.client.get('/api/candidates/').data[0]
+        self.assertTrue(data['profile_image_url'].endswith('-640w.jpeg'))
+        self.assertIn('-160w.webp 160w, ', data['profile_image_srcset']['webp'])
+        self.assertTrue(data['profile_image_original_url'].endswith('.jpg'))
+    
+    def test_small_images_are_not_upscaled(self):
+        """Test that renditions never exceed the source width."""
+        candidate = self.create_candidate(make_image(200, 200))
+        self.assertEqual([rendition['width'] for rendition in candidate.image_variants['jpeg']], [160, 200])
+    
+    def test_replacing_and_clearing_image(self):
+        """Test that a new upload re-renders and clearing the image drops the renditions."""
+        candidate = self.create_candidate(make_image(400, 400))
+        first_hash = candidate.image_variants['hash']
+        
+        candidate.profile_image = make_image(500, 300, name='new.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate.save()
+        candidate.refresh_from_db()
+        self.assertNotEqual(candidate.image_variants['hash'], first_hash)
+        
+        candidate.profile_image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate.save()
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.image_variants, {})
+    
+    def test_render_command(self):
+        """Test backfilling renditions with the management command."""
+        candidate = self.create_candidate(make_image(400, 400))
+        Candidate.objects.filter(pk=candidate.pk).update(image_variants={})
+        call_command('render_candidate_images', stdout=StringIO())
+        candidate.refresh_from_db()
+        self.assertEqual(len(candidate.image_variants['webp']), 3)
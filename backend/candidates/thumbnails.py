@@ -0,0 +1,133 @@
+"""
+Responsive renditions of candidate profile images.
+
+When a profile image is uploaded, a worker pool renders it at each of
+CANDIDATE_IMAGE_WIDTHS in WebP and JPEG. Pillow releases the GIL while it
+resizes and encodes, so threads render in parallel. Renditions are named after
+a hash of the source bytes (``candidates/variants/<hash>-<width>w.<ext>``), so
+a URL never changes meaning and can be cached as immutable. They are recorded on
+``Candidate.image_variants``, which the serializer turns into ``srcset`` strings;
+the original upload is only linked for explicit download.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from voting_platform.conditional import bump_version
+from .models import Candidate
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'candidates/variants'
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def render_variants(source):
+    """
+    Render ``source`` (bytes) at each configured width that does not upscale it.
+    Returns ``{format: [(width, bytes), ...]}``, narrowest first.
+    """
+    with Image.open(BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        widths = [width for width in sorted(settings.CANDIDATE_IMAGE_WIDTHS) if width < image.width]
+        widths.append(min(image.width, max(settings.CANDIDATE_IMAGE_WIDTHS)))
+
+        rendered = {name: [] for name in FORMATS}
+        for width in sorted(set(widths)):
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for name, options in FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, **options)
+                rendered[name].append((width, buffer.getvalue()))
+        return rendered
+
+
+def generate_variants(candidate):
+    """Render and store every rendition of ``candidate``'s current image; return the variants record."""
+    source_name = candidate.profile_image.name
+    with candidate.profile_image.open('rb') as source_file:
+        source = source_file.read()
+    digest = hashlib.sha256(source).hexdigest()[:20]
+
+    variants = {'source': source_name, 'hash': digest}
+    for name, renditions in render_variants(source).items():
+        variants[name] = []
+        for width, data in renditions:
+            path = f'{VARIANT_DIR}/{digest}-{width}w.{name}'
+            # The name is derived from the content, so an existing file is already right
+            if not default_storage.exists(path):
+                path = default_storage.save(path, ContentFile(data))
+            variants[name].append({'width': width, 'path': path})
+    return variants
+
+
+def refresh_variants(candidate_id, force=False):
+    """Bring ``image_variants`` in line with the candidate's current profile image."""
+    candidate = Candidate.objects.filter(pk=candidate_id).first()
+    if candidate is None or not (force or needs_refresh(candidate)):
+        return
+    current = Candidate.objects.filter(pk=candidate_id)
+    if candidate.profile_image:
+        variants = generate_variants(candidate)
+        current = current.filter(profile_image=candidate.profile_image.name)
+    else:
+        variants = {}
+        current = current.filter(Q(profile_image='') | Q(profile_image__isnull=True))
+
+    # Only record them if the image was not replaced while they rendered
+    if current.update(image_variants=variants):
+        bump_version('candidates')
+
+
+def needs_refresh(candidate):
+    """True if the recorded renditions are not those of the current profile image."""
+    return (candidate.profile_image.name or '') != candidate.image_variants.get('source', '')
+
+
+def _refresh_in_worker(candidate_id):
+    close_old_connections()
+    try:
+        refresh_variants(candidate_id)
+    except Exception:
+        logger.exception('Rendering image variants for candidate %s failed', candidate_id)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process-wide rendering pool."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.CANDIDATE_IMAGE_WORKERS, thread_name_prefix='candidate-images'
+                )
+    return _executor
+
+
+def schedule_variants(candidate_id):
+    """Render the candidate's renditions once the current transaction commits."""
+    def submit():
+        if settings.CANDIDATE_IMAGES_IN_BACKGROUND:
+            get_executor().submit(_refresh_in_worker, candidate_id)
+        else:
+            refresh_variants(candidate_id)
+    transaction.on_commit(submit)
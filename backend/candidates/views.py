@@ -9,15 +9,18 @@ from django.db.models import Count
 from .models import Candidate
 from .serializers import CandidateSerializer
 from votes.models import Vote
+from voting_platform.conditional import conditional, versions
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(versions('candidates'), max_age=5, stale_while_revalidate=60)
 def candidate_list(request):
     """
     Get list of all candidates WITHOUT vote counts.
     Vote counts are hidden from voters for election integrity.
     Should return exactly 2 candidates (one per team).
+    Revalidated with ETag/Last-Modified; unchanged lists get a 304.
     """
     candidates = Candidate.objects.all()
     serializer = CandidateSerializer(candidates, many=True, context={'request': request})
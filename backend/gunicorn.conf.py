@@ -0,0 +1,74 @@
+"""
+Gunicorn configuration for production serving.
+
+    gunicorn -c gunicorn.conf.py
+
+serves voting_platform.wsgi with threaded workers. For the ASGI entry point
+(live-tally streams and, with OAUTH_ASYNC_VIEWS, the async OAuth logins) set
+
+    GUNICORN_APP=voting_platform.asgi:application
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+
+Every setting can be overridden from the environment; see the README for sizing.
+"""
+import multiprocessing
+import os
+
+# Gunicorn reads every module-level name as a setting, and ``config`` is one
+from decouple import config as env
+
+wsgi_app = env('GUNICORN_APP', default='voting_platform.wsgi:application')
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000')
+
+# Processes give CPU parallelism; threads cover time spent waiting on the
+# database, SMTP and OAuth providers. Uvicorn workers ignore ``threads``.
+# Workers share throttles and idempotency records through the cache, so with
+# the per-process LocMemCache the default is a single worker (and readiness
+# fails if WEB_CONCURRENCY asks for more).
+_shared_cache = 'locmem' not in env('CACHE_BACKEND', default='locmem').lower()
+workers = env('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1 if _shared_cache else 1, cast=int)
+worker_class = env('GUNICORN_WORKER_CLASS', default='gthread')
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+backlog = env('GUNICORN_BACKLOG', default=2048, cast=int)
+
+# Import Django once in the master so workers fork with it loaded (faster
+# boots, shared memory pages). A preloaded app is not re-imported on HUP, so
+# deploy new code with a rolling restart, or set GUNICORN_PRELOAD=False to
+# let ``kill -HUP`` reload it.
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+
+# Recycle each worker after this many requests (plus jitter, so they do not
+# all restart together) to bound slow leaks
+max_requests = env('GUNICORN_MAX_REQUESTS', default=2000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=200, cast=int)
+
+# A worker silent for ``timeout`` seconds is killed; on SIGTERM or a recycle,
+# in-flight requests get ``graceful_timeout`` seconds to finish
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+accesslog = env('GUNICORN_ACCESS_LOG', default='-')
+errorlog = '-'
+loglevel = env('GUNICORN_LOG_LEVEL', default='info')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voting_platform.settings')
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading belong to the master; never share them
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Replay ballots a crashed worker logged but never flushed, so has_voted
+    # and the tallies include them before this worker answers anything, then
+    # build the voted-user index from the votes table
+    from django.db import connections
+    from votes.ingest import start_vote_buffer
+    from votes.voted_index import warm_voted_index
+    start_vote_buffer()
+    warm_voted_index()
+    # Requests run on other threads; do not leave this one's connection idle
+    connections.close_all()
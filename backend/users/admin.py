@@ -3,7 +3,8 @@ Admin configuration for users app.
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from django.utils import timezone
+from .models import User, OutboundEmail
 
 
 @admin.register(User)
@@ -29,3 +30,20 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Admin interface for the email outbox."""
+    list_display = ['subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    ordering = ['-created_at']
+    readonly_fields = ['subject', 'body', 'from_email', 'to', 'attempts', 'claim_token', 'last_error', 'created_at', 'sent_at']
+    actions = ['requeue']
+    
+    @admin.action(description='Requeue selected messages')
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING, attempts=0, claim_token='', next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{count} messages requeued')
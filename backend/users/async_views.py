@@ -0,0 +1,162 @@
+"""
+Async versions of the OAuth login endpoints.
+
+A login spends most of its time waiting on Google or LinkedIn. As coroutines
+on the ASGI entry point (voting_platform.asgi) those waits cost no worker
+thread, so one process can hold thousands of logins in flight. They answer
+exactly like ``google_oauth_simple`` and ``linkedin_oauth_simple`` and are
+routed in their place when OAUTH_ASYNC_VIEWS is set. Leave it off under WSGI,
+where every async view would run on its own short-lived event loop.
+"""
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .identity import aremember_identity, arecall_identity, aupsert_oauth_user
+from .oauth import ProviderUnavailable, averify_google_id_token, get_async_client
+from .serializers import UserSerializer
+from .views import get_tokens_for_user
+
+logger = logging.getLogger(__name__)
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _provider_unavailable(exc):
+    response = _error('The sign-in provider is not responding. Please try again shortly.', status=503)
+    response['Retry-After'] = str(exc.retry_after or settings.OAUTH_CIRCUIT_RESET_SECONDS)
+    return response
+
+
+async def _login_response(user):
+    """Answer with the same body as the sync views."""
+    tokens = await sync_to_async(get_tokens_for_user)(user)
+    return JsonResponse({'user': UserSerializer(user).data, 'tokens': tokens})
+
+
+@csrf_exempt
+async def google_oauth(request):
+    """Google OAuth endpoint: accepts a ``credential`` (ID token) or an ``access_token``."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    data = _request_data(request)
+    credential = data.get('credential')
+    access_token = data.get('access_token')
+    if not credential and not access_token:
+        return _error('credential or access_token is required')
+
+    token = access_token or credential
+    user = await arecall_identity('google', token)
+    if user is not None:
+        return await _login_response(user)
+
+    expires_at = None
+    try:
+        if access_token:
+            response = await get_async_client().get(
+                settings.GOOGLE_OAUTH2_USERINFO_URL,
+                headers={'Authorization': f'Bearer {access_token}'},
+            )
+            if response.status_code != 200:
+                return _error('Failed to fetch user info from Google')
+            idinfo = response.json()
+        else:
+            idinfo = await averify_google_id_token(
+                credential, settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY, clock_skew_in_seconds=300
+            )
+            expires_at = idinfo.get('exp')
+    except ProviderUnavailable as exc:
+        logger.error(f'Google OAuth provider unavailable: {exc}')
+        return _provider_unavailable(exc)
+    except ValueError as exc:
+        logger.error(f'Google OAuth token validation error: {exc}')
+        return _error(f'Invalid Google token: {exc}')
+
+    email = idinfo.get('email')
+    if not email:
+        return _error('Email not found in Google profile')
+    user = await aupsert_oauth_user(email, idinfo.get('name', ''), 'google')
+    await aremember_identity('google', token, user, expires_at)
+    return await _login_response(user)
+
+
+@csrf_exempt
+async def linkedin_oauth(request):
+    """LinkedIn OAuth endpoint: accepts ``code`` + ``redirect_uri`` or an ``access_token``."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    data = _request_data(request)
+    code = data.get('code')
+    redirect_uri = data.get('redirect_uri')
+    access_token = data.get('access_token')
+    client = get_async_client()
+    expires_at = None
+
+    try:
+        if code and redirect_uri:
+            response = await client.post(settings.LINKEDIN_OAUTH2_TOKEN_URL, data={
+                'grant_type': 'authorization_code',
+                'code': code,
+                'redirect_uri': redirect_uri,
+                'client_id': settings.SOCIAL_AUTH_LINKEDIN_OAUTH2_KEY,
+                'client_secret': settings.SOCIAL_AUTH_LINKEDIN_OAUTH2_SECRET,
+            })
+            if response.status_code != 200:
+                return _error(
+                    f'Failed to exchange code for token. Status: {response.status_code}, Response: {response.text}'
+                )
+            try:
+                token_payload = response.json()
+                access_token = token_payload.get('access_token')
+                if token_payload.get('expires_in'):
+                    expires_at = time.time() + int(token_payload['expires_in'])
+            except (ValueError, AttributeError) as exc:
+                logger.error(f'Token exchange failed: {exc}')
+                return _error(f'Token exchange failed: {exc}')
+        elif access_token:
+            user = await arecall_identity('linkedin', access_token)
+            if user is not None:
+                return await _login_response(user)
+
+        if not access_token:
+            return _error('Either code+redirect_uri or access_token is required')
+
+        response = await client.get(
+            settings.LINKEDIN_OAUTH2_USERINFO_URL, headers={'Authorization': f'Bearer {access_token}'}
+        )
+    except ProviderUnavailable as exc:
+        logger.error(f'LinkedIn OAuth provider unavailable: {exc}')
+        return _provider_unavailable(exc)
+
+    if response.status_code != 200:
+        return _error(
+            f'Failed to fetch LinkedIn profile. Status: {response.status_code}, Details: {response.text}'
+        )
+    try:
+        user_data = response.json()
+    except ValueError:
+        return _error(f'Invalid response from LinkedIn: {response.text[:200]}')
+
+    email = user_data.get('email')
+    if not email:
+        return _error(f'Email not found in LinkedIn profile. Available fields: {list(user_data.keys())}')
+    user = await aupsert_oauth_user(email, user_data.get('name', ''), 'linkedin', user_data.get('sub', ''))
+    await aremember_identity('linkedin', access_token, user, expires_at)
+    return await _login_response(user)
@@ -0,0 +1,126 @@
+"""
+Resolving an OAuth login to a local user.
+
+``upsert_oauth_user`` reads the user by email (one indexed lookup) and writes
+only the fields the provider's profile actually changed, so a repeat login
+normally performs no write at all.
+
+After a login, ``remember_identity`` maps a hash of the presented token to the
+user's id in the shared cache for OAUTH_IDENTITY_CACHE_TTL seconds, never past
+the token's own expiry. While it is remembered, ``recall_identity`` answers
+with one primary-key read and skips the provider round trip and the upsert.
+Only hashes are stored, so a cache dump does not reveal usable tokens.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from voting_platform import metrics
+
+User = get_user_model()
+
+IDENTITY_KEY = 'oauth:identity:{}'
+
+
+def _identity_key(provider, token):
+    return IDENTITY_KEY.format(hashlib.sha256(f'{provider}:{token}'.encode()).hexdigest())
+
+
+def _identity_ttl(expires_at):
+    ttl = settings.OAUTH_IDENTITY_CACHE_TTL
+    if expires_at is not None:
+        ttl = min(ttl, int(expires_at - time.time()))
+    return ttl
+
+
+def remember_identity(provider, token, user, expires_at=None):
+    """Remember that ``token`` resolved to ``user`` until ``expires_at`` (epoch seconds) at the latest."""
+    ttl = _identity_ttl(expires_at)
+    if ttl > 0:
+        cache.set(_identity_key(provider, token), user.pk, ttl)
+
+
+async def aremember_identity(provider, token, user, expires_at=None):
+    ttl = _identity_ttl(expires_at)
+    if ttl > 0:
+        await cache.aset(_identity_key(provider, token), user.pk, ttl)
+
+
+def recall_identity(provider, token):
+    """The active user ``token`` last resolved to, or None."""
+    user_id = cache.get(_identity_key(provider, token))
+    user = User.objects.filter(pk=user_id, is_active=True).first() if user_id is not None else None
+    metrics.increment('oauth.identity.hit' if user is not None else 'oauth.identity.miss')
+    return user
+
+
+async def arecall_identity(provider, token):
+    user_id = await cache.aget(_identity_key(provider, token))
+    user = await User.objects.filter(pk=user_id, is_active=True).afirst() if user_id is not None else None
+    metrics.increment('oauth.identity.hit' if user is not None else 'oauth.identity.miss')
+    return user
+
+
+def _profile(email, name, provider, linkedin_id):
+    return {
+        'name': name or email.split('@')[0],
+        'auth_provider': provider,
+        'is_email_verified': True,  # the provider has verified the address
+        'linkedin_url': f'https://www.linkedin.com/in/{linkedin_id}/' if linkedin_id else '',
+    }
+
+
+def _changed_fields(user, name, provider, linkedin_url):
+    """Apply the profile to ``user`` in memory; return the names of fields that changed."""
+    wanted = {'auth_provider': provider, 'is_email_verified': True}
+    if name:
+        wanted['name'] = name
+    if linkedin_url and not user.linkedin_url:
+        wanted['linkedin_url'] = linkedin_url
+    changed = [field for field, value in wanted.items() if getattr(user, field) != value]
+    for field in changed:
+        setattr(user, field, wanted[field])
+    return changed
+
+
+def _create(email, profile):
+    """Create the user; return None if a concurrent first login got there first."""
+    try:
+        with transaction.atomic():
+            return User.objects.create(email=email, **profile)
+    except IntegrityError:
+        return None
+
+
+def upsert_oauth_user(email, name, provider, linkedin_id=''):
+    """Return the user for ``email``, created or brought up to date with the provider's profile."""
+    profile = _profile(email, name, provider, linkedin_id)
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        user = _create(email, profile)
+        if user is not None:
+            return user
+        user = User.objects.get(email=email)
+    changed = _changed_fields(user, name, provider, profile['linkedin_url'])
+    if changed:
+        user.save(update_fields=changed)
+    return user
+
+
+async def aupsert_oauth_user(email, name, provider, linkedin_id=''):
+    profile = _profile(email, name, provider, linkedin_id)
+    user = await User.objects.filter(email=email).afirst()
+    if user is None:
+        user = await sync_to_async(_create)(email, profile)
+        if user is not None:
+            return user
+        user = await User.objects.aget(email=email)
+    changed = _changed_fields(user, name, provider, profile['linkedin_url'])
+    if changed:
+        await user.asave(update_fields=changed)
+    return user
@@ -0,0 +1,59 @@
+"""
+Management command that delivers queued emails from the outbox.
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from users.outbox import MailDelivery
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbox emails in batches over a reused connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver what is due now and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MAIL_OUTBOX_BATCH_SIZE,
+            help='Messages claimed per batch',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.MAIL_WORKER_POLL_INTERVAL,
+            help='Seconds to wait when the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        delivery = MailDelivery()
+        sent = 0
+        try:
+            while self.running:
+                close_old_connections()
+                attempted = delivery.deliver_batch(options['batch_size'])
+                sent += attempted
+                if attempted:
+                    continue
+                # Nothing due: do not hold the SMTP session open while idle
+                delivery.close()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            delivery.close()
+        self.stdout.write(self.style.SUCCESS(f'Attempted {sent} emails'))
+
+    def stop(self, signum, frame):
+        self.running = False
@@ -77,6 +77,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='users_created_at_id_idx'),
+            models.Index(fields=['auth_provider'], name='users_auth_provider_idx'),
+            models.Index(fields=['verification_token'], name='users_verification_token_idx'),
+            models.Index(fields=['reset_token'], name='users_reset_token_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.email})"
@@ -120,3 +126,42 @@ class User(AbstractBaseUser, PermissionsMixin):
         self.reset_token_expires = None
         self.save()
 
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting in (or sent from) the outbox.
+    Views queue messages here; the run_mail_worker command delivers them.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead letter'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(help_text="List of recipient addresses")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Not picked up before this time (retry backoff, or a worker's claim)"
+    )
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'outbound_emails'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_emails_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
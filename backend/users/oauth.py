@@ -0,0 +1,336 @@
+"""
+Outbound HTTP for the OAuth providers.
+
+Every call to Google or LinkedIn goes through one shared ``requests.Session``,
+so connections are kept alive and pooled. Each call is bounded by
+OAUTH_HTTP_CONNECT_TIMEOUT / OAUTH_HTTP_READ_TIMEOUT, and a per-host circuit
+breaker stops sending requests to a provider that keeps failing. After
+OAUTH_CIRCUIT_FAILURE_THRESHOLD consecutive failures, calls fail fast with
+ProviderUnavailable for OAUTH_CIRCUIT_RESET_SECONDS, then one trial request
+decides whether the circuit closes again.
+
+Google ID tokens are verified against signing certificates held in process
+for as long as Google's Cache-Control allows, instead of being downloaded
+for every login.
+
+The async views (``users.async_views``) use ``AsyncProviderClient``, an
+``httpx.AsyncClient`` per event loop, with the same timeouts, breakers and
+certificate cache.
+"""
+import asyncio
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from google.auth import jwt
+from requests.adapters import HTTPAdapter
+
+from voting_platform import metrics
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class ProviderUnavailable(Exception):
+    """The provider timed out, failed, or its circuit is open; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider host."""
+
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise ProviderUnavailable while open; let a single trial call through once
+        the wait is over. Returns True for that trial call.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.reset_after - time.monotonic()
+            if remaining > 0 or self._trial_running:
+                raise ProviderUnavailable('Provider circuit is open', retry_after=max(1, round(remaining)))
+            self._trial_running = True
+            return True
+
+    @contextmanager
+    def call(self):
+        """
+        Guard one call. An error that is not already a recorded ProviderUnavailable
+        counts as a failure too, and a half-open trial ends however the call does.
+        """
+        trial = self.before_call()
+        try:
+            yield
+        except ProviderUnavailable:
+            raise
+        except BaseException:
+            self.record_failure()
+            raise
+        finally:
+            if trial:
+                with self._lock:
+                    self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url):
+    """The circuit breaker for ``url``'s host, shared by the sync and async clients."""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(
+                settings.OAUTH_CIRCUIT_FAILURE_THRESHOLD, settings.OAUTH_CIRCUIT_RESET_SECONDS
+            )
+        return _breakers[host]
+
+
+def _failed(breaker, url, reason, exc=None):
+    breaker.record_failure()
+    metrics.increment('oauth.http.failure')
+    raise ProviderUnavailable(f'{urlsplit(url).netloc} {reason}') from exc
+
+
+def _completed(breaker, url, response):
+    if response.status_code >= 500:
+        _failed(breaker, url, f'returned {response.status_code}')
+    breaker.record_success()
+    metrics.increment('oauth.http.success')
+    return response
+
+
+class ProviderClient:
+    """Shared keep-alive session with timeouts and a circuit breaker per host."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=settings.OAUTH_HTTP_POOL_SIZE, max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request; raises ProviderUnavailable on timeouts, connection errors,
+        5xx responses or an open circuit. 4xx responses are returned to the caller.
+        """
+        breaker = breaker_for(url)
+        kwargs.setdefault('timeout', (settings.OAUTH_HTTP_CONNECT_TIMEOUT, settings.OAUTH_HTTP_READ_TIMEOUT))
+        with breaker.call():
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                _failed(breaker, url, f'unreachable: {exc}', exc)
+            return _completed(breaker, url, response)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+class AsyncProviderClient:
+    """``ProviderClient`` for coroutines; an httpx client is bound to one event loop."""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OAUTH_HTTP_READ_TIMEOUT, connect=settings.OAUTH_HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.OAUTH_ASYNC_MAX_CONNECTIONS),
+        )
+
+    async def request(self, method, url, **kwargs):
+        breaker = breaker_for(url)
+        with breaker.call():
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.HTTPError as exc:
+                _failed(breaker, url, f'unreachable: {exc!r}', exc)
+            return _completed(breaker, url, response)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class CertificateCache:
+    """
+    Signing certificates from a certs URL, kept until their Cache-Control max-age
+    runs out. A forced refresh (for an unknown key id) refetches at most once
+    per GOOGLE_CERTS_MIN_REFRESH_SECONDS, so tokens with made-up key ids cannot
+    drive a fetch per request.
+    """
+
+    def __init__(self, client, url):
+        self.client = client
+        self.url = url
+        self.certs = None
+        self.expires = 0.0
+        self.fetched_at = None
+        self._lock = threading.Lock()
+
+    def fresh(self):
+        return self.certs is not None and time.monotonic() < self.expires
+
+    def refresh_due(self):
+        return self.fetched_at is None or time.monotonic() - self.fetched_at >= settings.GOOGLE_CERTS_MIN_REFRESH_SECONDS
+
+    def cached(self, refresh=False):
+        """The certs to use without fetching, or None."""
+        if refresh:
+            return None if self.refresh_due() else self.certs
+        return self.certs if self.fresh() else None
+
+    def get(self, refresh=False):
+        certs = self.cached(refresh)
+        if certs is not None:
+            metrics.increment('oauth.google_certs.hit')
+            return certs
+        with self._lock:
+            return self.cached(refresh) or self.store(self.client.get(self.url))
+
+    async def aget(self, refresh=False):
+        """``get`` for coroutines; concurrent misses on one loop share a single fetch."""
+        certs = self.cached(refresh)
+        if certs is not None:
+            metrics.increment('oauth.google_certs.hit')
+            return certs
+        async with _loop_lock(self):
+            return self.cached(refresh) or self.store(await get_async_client().get(self.url))
+
+    def store(self, response):
+        if response.status_code != 200:
+            raise ProviderUnavailable(f'Fetching signing certificates returned {response.status_code}')
+        try:
+            self.certs = response.json()
+        except ValueError:
+            raise ProviderUnavailable('Signing certificates response is not JSON')
+        self.fetched_at = time.monotonic()
+        self.expires = self.fetched_at + self.max_age(response)
+        metrics.increment('oauth.google_certs.fetch')
+        return self.certs
+
+    @staticmethod
+    def max_age(response):
+        cache_control = response.headers.get('Cache-Control', '')
+        if 'no-store' in cache_control or 'no-cache' in cache_control:
+            return 0
+        match = MAX_AGE.search(cache_control)
+        if not match:
+            return 0
+        return max(0, int(match.group(1)) - int(response.headers.get('Age', 0) or 0))
+
+
+def verify_google_id_token(token, audience, clock_skew_in_seconds=0):
+    """
+    Verify a Google ID token's signature, audience, expiry and issuer.
+    Raises ValueError for an invalid token, ProviderUnavailable if the certs cannot be fetched.
+    """
+    cache = get_google_certs()
+    certs = cache.get()
+    kid = jwt.decode_header(token).get('kid')
+    if kid not in certs:
+        # Google may have rotated its keys before our copy expired
+        certs = cache.get(refresh=True)
+    return _decode_google_id_token(token, kid, certs, audience, clock_skew_in_seconds)
+
+
+async def averify_google_id_token(token, audience, clock_skew_in_seconds=0):
+    """``verify_google_id_token`` for coroutines."""
+    cache = get_google_certs()
+    certs = await cache.aget()
+    kid = jwt.decode_header(token).get('kid')
+    if kid not in certs:
+        certs = await cache.aget(refresh=True)
+    return _decode_google_id_token(token, kid, certs, audience, clock_skew_in_seconds)
+
+
+def _decode_google_id_token(token, kid, certs, audience, clock_skew_in_seconds):
+    if kid not in certs:
+        raise ValueError(f'Unknown signing key id {kid!r}')
+    idinfo = jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=clock_skew_in_seconds)
+    if idinfo.get('iss') not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS}")
+    return idinfo
+
+
+_client = None
+_google_certs = None
+_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_loop_locks = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """The process-wide provider client."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = ProviderClient()
+    return _client
+
+
+def get_google_certs():
+    """The process-wide Google certificate cache."""
+    global _google_certs
+    if _google_certs is None:
+        client = get_client()
+        with _lock:
+            if _google_certs is None:
+                _google_certs = CertificateCache(client, settings.GOOGLE_OAUTH2_CERTS_URL)
+    return _google_certs
+
+
+def get_async_client():
+    """The async provider client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.client.is_closed:
+        client = _async_clients[loop] = AsyncProviderClient()
+    return client
+
+
+def _loop_lock(owner):
+    """An asyncio.Lock for ``owner`` on the running event loop."""
+    locks = _loop_locks.setdefault(asyncio.get_running_loop(), {})
+    return locks.setdefault(id(owner), asyncio.Lock())
@@ -0,0 +1,147 @@
+"""
+Email outbox.
+
+Views call ``queue_email``, which only inserts a row, so a request never waits
+on SMTP. ``run_mail_worker`` calls ``deliver_batch`` in a loop: it claims up
+to MAIL_OUTBOX_BATCH_SIZE due messages and sends them over one reused
+connection. A message that fails temporarily is retried with exponential
+backoff. It is dead-lettered after MAIL_OUTBOX_MAX_ATTEMPTS attempts, or at
+once when the server rejects it permanently (5xx).
+
+Claiming writes a random token and pushes ``next_attempt_at`` out by
+MAIL_OUTBOX_LEASE_SECONDS in one UPDATE. Concurrent workers therefore never
+pick up the same message, and messages held by a crashed worker become due
+again when the lease runs out.
+"""
+import logging
+import random
+import smtplib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from voting_platform import metrics
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Connection-level failures: the message itself may be fine, so reconnect and retry
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, OSError)
+
+
+def queue_email(subject, body, to, from_email=''):
+    """Add a message to the outbox; the mail worker delivers it."""
+    metrics.increment('mail.queued')
+    return OutboundEmail.objects.create(
+        subject=subject, body=body, to=list(to), from_email=from_email or ''
+    )
+
+
+def claim_batch(batch_size=None):
+    """Claim up to ``batch_size`` due messages for this worker and return them."""
+    batch_size = batch_size or settings.MAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    due.filter(pk__in=ids).update(
+        claim_token=token,
+        next_attempt_at=now + timedelta(seconds=settings.MAIL_OUTBOX_LEASE_SECONDS),
+    )
+    return list(OutboundEmail.objects.filter(claim_token=token).order_by('next_attempt_at', 'pk'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at MAIL_OUTBOX_RETRY_MAX_SECONDS."""
+    delay = settings.MAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    delay = min(delay, settings.MAIL_OUTBOX_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _is_permanent(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+def _record_failure(message, exc):
+    message.attempts += 1
+    message.last_error = f'{type(exc).__name__}: {exc}'[:2000]
+    message.claim_token = ''
+    if _is_permanent(exc) or message.attempts >= settings.MAIL_OUTBOX_MAX_ATTEMPTS:
+        message.status = OutboundEmail.STATUS_DEAD
+        metrics.increment('mail.dead')
+        logger.error('Dead-lettered email %s after %s attempts: %s', message.pk, message.attempts, exc)
+    else:
+        message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+        metrics.increment('mail.retried')
+        logger.warning('Email %s failed (attempt %s), retrying: %s', message.pk, message.attempts, exc)
+    message.save(update_fields=['attempts', 'last_error', 'claim_token', 'status', 'next_attempt_at'])
+
+
+class MailDelivery:
+    """Sends outbox messages over one backend connection, reopened only after a failure."""
+
+    def __init__(self):
+        self.connection = None
+
+    def _connection(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+            metrics.increment('mail.connections')
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def send(self, message):
+        email = EmailMessage(
+            message.subject, message.body, message.from_email or None, message.to,
+            connection=self._connection(),
+        )
+        email.send()
+
+    def deliver_batch(self, batch_size=None):
+        """Deliver one claimed batch; return the number of messages attempted."""
+        messages = claim_batch(batch_size)
+        for message in messages:
+            try:
+                self.send(message)
+            except Exception as exc:
+                if isinstance(exc, CONNECTION_ERRORS) and not isinstance(exc, smtplib.SMTPResponseException):
+                    self.close()
+                _record_failure(message, exc)
+                continue
+            message.status = OutboundEmail.STATUS_SENT
+            message.attempts += 1
+            message.sent_at = timezone.now()
+            message.claim_token = ''
+            message.last_error = ''
+            message.save(update_fields=['status', 'attempts', 'sent_at', 'claim_token', 'last_error'])
+            metrics.increment('mail.sent')
+        return len(messages)
+
+
+def deliver_pending(batch_size=None):
+    """Deliver everything currently due, over one connection. Returns the number attempted."""
+    delivery = MailDelivery()
+    total = 0
+    try:
+        while True:
+            attempted = delivery.deliver_batch(batch_size)
+            if not attempted:
+                return total
+            total += attempted
+    finally:
+        delivery.close()
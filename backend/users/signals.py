@@ -0,0 +1,17 @@
+"""
+Signal handlers for the users app.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from voting_platform.authentication import forget_users_everywhere
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, created=False, **kwargs):
+    """Evict the user from the authentication cache, in every process, whenever the row changes."""
+    # No process can have cached a user that did not exist yet
+    if not created:
+        forget_users_everywhere()
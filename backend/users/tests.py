@@ -0,0 +1,642 @@
+"""
+Tests for the users app.
+"""
+import asyncio
+import datetime
+import json
+import socketserver
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from voting_platform import metrics, ratelimit
+from . import async_views, oauth
+from .models import OutboundEmail
+from .outbox import claim_batch, deliver_pending, queue_email
+
+User = get_user_model()
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+    
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+    
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost SMTP stand-in')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode().strip().split(' ', 1)[0].split(':', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(line.decode().strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    data.append(data_line)
+                response = server.data_replies.pop(0) if server.data_replies else '250 OK queued'
+                if response.startswith('250'):
+                    server.messages.append((recipients, b''.join(data).decode()))
+                self.reply(response)
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Local SMTP server recording what it receives; ``data_replies`` scripts DATA answers."""
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPStandInHandler)
+        self.connections = 0
+        self.messages = []
+        self.data_replies = []
+
+
+class MailOutboxTest(TestCase):
+    """Test the email outbox and mail worker against a local SMTP stand-in."""
+    
+    def setUp(self):
+        self.smtp = SMTPStandIn()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        )
+        self.settings_override.enable()
+        self.client = APIClient()
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        self.smtp.shutdown()
+        self.smtp.server_close()
+    
+    def test_views_queue_and_worker_delivers(self):
+        """Test that signup and forgot_password only queue, and one connection delivers both."""
+        response = self.client.post('/api/users/signup/', {
+            'name': 'New User',
+            'email': 'new@example.com',
+            'password': 'Str0ngPass!234',
+            'password_confirm': 'Str0ngPass!234',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        User.objects.filter(email='new@example.com').update(is_email_verified=True)
+        response = self.client.post('/api/users/forgot-password/', {'email': 'new@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.smtp.connections, 0)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count(), 2)
+        
+        call_command('run_mail_worker', '--once', stdout=StringIO())
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertIn('verify-email?token=', self.smtp.messages[0][1])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+    
+    @override_settings(MAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_retry_with_backoff_then_dead_letter(self):
+        """Test that temporary failures back off and exhausted messages are dead-lettered."""
+        message = queue_email('Subject', 'Body', ['someone@example.com'])
+        self.smtp.data_replies = ['451 Try again later', '451 Try again later']
+        
+        with self.assertLogs('users.outbox', level='WARNING'):
+            deliver_pending()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboundEmail.STATUS_PENDING, 1))
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertIn('451', message.last_error)
+        self.assertEqual(deliver_pending(), 0)
+        
+        OutboundEmail.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs('users.outbox', level='ERROR'):
+            deliver_pending()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboundEmail.STATUS_DEAD, 2))
+    
+    def test_permanent_failure_dead_letters_at_once(self):
+        """Test that a 5xx rejection is not retried."""
+        message = queue_email('Subject', 'Body', ['someone@example.com'])
+        self.smtp.data_replies = ['554 Rejected']
+        with self.assertLogs('users.outbox', level='ERROR'):
+            deliver_pending()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboundEmail.STATUS_DEAD, 1))
+    
+    def test_claims_are_exclusive(self):
+        """Test that a claimed message is not handed to a second worker until its lease ends."""
+        queue_email('Subject', 'Body', ['someone@example.com'])
+        self.assertEqual(len(claim_batch()), 1)
+        self.assertEqual(claim_batch(), [])
+
+
+def make_signing_key():
+    """An RSA key and a self-signed PEM certificate, like those Google publishes."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'stand-in')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name)
+        .public_key(key.public_key()).serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class ProviderStandInHandler(BaseHTTPRequestHandler):
+    """Serves /certs, /userinfo, /token; ``server.delay``, ``fail`` and ``garbled`` script misbehaviour."""
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, *args):
+        pass
+    
+    def send_json(self, payload, status_code=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def handle_one_request(self):
+        self.server.connections.add(self.client_address)
+        super().handle_one_request()
+    
+    def respond(self):
+        server = self.server
+        server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        if server.delay:
+            time.sleep(server.delay)
+        if server.fail:
+            return self.send_json({'error': 'unavailable'}, 503)
+        if server.garbled:
+            body = b'<html>Bad gateway</html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        if self.path == '/certs':
+            return self.send_json(server.certs, headers={'Cache-Control': 'public, max-age=3600', 'Age': '100'})
+        if self.path == '/userinfo':
+            if self.headers.get('Authorization') != 'Bearer good-token':
+                return self.send_json({'error': 'invalid_token'}, 401)
+            return self.send_json({'email': 'provider@example.com', 'name': 'Provider User', 'sub': 'abc123'})
+        if self.path == '/token':
+            length = int(self.headers.get('Content-Length', 0))
+            form = parse_qs(self.rfile.read(length).decode())
+            if form.get('code') != ['good-code']:
+                return self.send_json({'error': 'invalid_grant'}, 400)
+            return self.send_json({'access_token': 'good-token'})
+        return self.send_json({'error': 'not found'}, 404)
+    
+    do_GET = respond
+    do_POST = respond
+
+
+class ProviderStandIn(ThreadingHTTPServer):
+    """Local OAuth provider recording hits per path and client connections."""
+    daemon_threads = True
+    request_queue_size = 64
+    
+    def __init__(self, certs):
+        super().__init__(('127.0.0.1', 0), ProviderStandInHandler)
+        self.certs = certs
+        self.hits = {}
+        self.connections = set()
+        self.delay = 0
+        self.fail = False
+        self.garbled = False
+    
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+    
+    def handle_error(self, request, client_address):
+        # Clients that timed out have hung up by the time a delayed reply is written
+        pass
+
+
+class ProviderStandInMixin:
+    """Runs a ProviderStandIn and points the provider settings at it."""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key_pem, cls.cert_pem = make_signing_key()
+    
+    def setUp(self):
+        self.provider = ProviderStandIn({'key-1': self.cert_pem})
+        threading.Thread(target=self.provider.serve_forever, daemon=True).start()
+        self.settings_override = override_settings(
+            SOCIAL_AUTH_GOOGLE_OAUTH2_KEY='client-id',
+            GOOGLE_OAUTH2_USERINFO_URL=self.provider.url('/userinfo'),
+            GOOGLE_OAUTH2_CERTS_URL=self.provider.url('/certs'),
+            LINKEDIN_OAUTH2_TOKEN_URL=self.provider.url('/token'),
+            LINKEDIN_OAUTH2_USERINFO_URL=self.provider.url('/userinfo'),
+            OAUTH_HTTP_READ_TIMEOUT=0.5,
+            OAUTH_CIRCUIT_FAILURE_THRESHOLD=2,
+            OAUTH_CIRCUIT_RESET_SECONDS=30,
+        )
+        self.settings_override.enable()
+        oauth._client = oauth._google_certs = None
+        oauth._breakers.clear()
+        metrics.reset()
+        cache.clear()
+        self.client = APIClient()
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        oauth._client = oauth._google_certs = None
+        self.provider.shutdown()
+        self.provider.server_close()
+    
+    def id_token(self, kid='key-1', **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': 'client-id', 'iat': now, 'exp': now + 300,
+            'email': 'google@example.com', 'name': 'Google User',
+        }
+        payload.update(claims)
+        signer = crypt.RSASigner.from_string(self.key_pem, key_id=kid)
+        return jwt.encode(signer, payload).decode()
+
+
+class OAuthProviderTest(ProviderStandInMixin, TestCase):
+    """Test the OAuth views against a local stand-in provider."""
+    
+    def test_id_token_verified_with_cached_certs(self):
+        """Test that ID tokens are verified locally and the certs are fetched once."""
+        for _ in range(3):
+            response = self.client.post('/api/users/google/', {'credential': self.id_token()})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['email'], 'google@example.com')
+        self.assertEqual(self.provider.hits, {'/certs': 1})
+    
+    def test_certs_refetched_for_unknown_key(self):
+        """Test that a rotated signing key triggers one refetch of the certs."""
+        self.client.post('/api/users/google/', {'credential': self.id_token()})
+        self.provider.certs = {'key-2': self.cert_pem}
+        oauth.get_google_certs().fetched_at -= settings.GOOGLE_CERTS_MIN_REFRESH_SECONDS
+        response = self.client.post('/api/users/google/', {'credential': self.id_token(kid='key-2')})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.provider.hits, {'/certs': 2})
+    
+    def test_unknown_keys_cannot_force_fetches(self):
+        """Test that tokens with made-up key ids refetch at most once per refresh floor."""
+        self.client.post('/api/users/google/', {'credential': self.id_token()})
+        oauth.get_google_certs().fetched_at -= settings.GOOGLE_CERTS_MIN_REFRESH_SECONDS
+        for n in range(5):
+            with self.assertLogs('users.views', level='ERROR'):
+                response = self.client.post('/api/users/google/', {'credential': self.id_token(kid=f'forged-{n}')})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.provider.hits, {'/certs': 2})
+    
+    def test_invalid_id_tokens_rejected(self):
+        """Test that a wrong audience or issuer is rejected."""
+        for claims in ({'aud': 'someone-else'}, {'iss': 'https://evil.example.com'}):
+            with self.assertLogs('users.views', level='ERROR'):
+                response = self.client.post('/api/users/google/', {'credential': self.id_token(**claims)})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.filter(email='google@example.com').exists())
+    
+    def test_unparseable_certs_unavailable(self):
+        """Test that a certs response that is not JSON counts as the provider being down."""
+        self.provider.garbled = True
+        with self.assertLogs('users.views', level='ERROR'):
+            response = self.client.post('/api/users/google/', {'credential': self.id_token()})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+    
+    def test_linkedin_reuses_connection(self):
+        """Test that the code exchange and profile fetch share one keep-alive connection."""
+        response = self.client.post('/api/users/linkedin/', {
+            'code': 'good-code', 'redirect_uri': 'http://localhost:3000/callback',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['email'], 'provider@example.com')
+        self.assertEqual(self.provider.hits, {'/token': 1, '/userinfo': 1})
+        self.assertEqual(len(self.provider.connections), 1)
+    
+    def test_slow_provider_times_out_and_opens_circuit(self):
+        """Test that a hanging provider gives 503 quickly and the circuit then fails fast."""
+        self.provider.delay = 2
+        started = time.monotonic()
+        with self.assertLogs('users.views', level='ERROR'):
+            for _ in range(2):
+                response = self.client.post('/api/users/google/', {'access_token': 'good-token'})
+                self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertLess(time.monotonic() - started, 1.9)
+            
+            response = self.client.post('/api/users/google/', {'access_token': 'good-token'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.provider.hits, {'/userinfo': 2})
+        self.assertEqual(metrics.snapshot()['counters']['oauth.http.failure'], 2)
+    
+    def test_circuit_closes_after_successful_trial(self):
+        """Test that once the wait is over a successful trial call closes the circuit."""
+        self.provider.fail = True
+        with self.assertLogs('users.views', level='ERROR'):
+            for _ in range(2):
+                response = self.client.post('/api/users/google/', {'access_token': 'good-token'})
+                self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        breaker = oauth.breaker_for(self.provider.url('/userinfo'))
+        breaker.opened_at -= 30
+        self.provider.fail = False
+        response = self.client.post('/api/users/google/', {'access_token': 'good-token'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(breaker.opened_at)
+    
+    def test_trial_error_keeps_circuit_recoverable(self):
+        """Test that a half-open trial failing with any exception counts as a failure and frees the trial."""
+        self.provider.fail = True
+        with self.assertLogs('users.views', level='ERROR'):
+            for _ in range(2):
+                self.client.post('/api/users/google/', {'access_token': 'good-token'})
+        breaker = oauth.breaker_for(self.provider.url('/userinfo'))
+        self.provider.fail = False
+        
+        breaker.opened_at -= 30
+        client = oauth.get_client()
+        with mock.patch.object(client.session, 'request', side_effect=TimeoutError('wrapper gave up')):
+            with self.assertRaises(TimeoutError):
+                client.get(self.provider.url('/userinfo'))
+        self.assertFalse(breaker._trial_running)
+        self.assertEqual(breaker.failures, 3)
+        with self.assertRaises(oauth.ProviderUnavailable):
+            client.get(self.provider.url('/userinfo'))
+        
+        breaker.opened_at -= 30
+        response = self.client.post('/api/users/google/', {'access_token': 'good-token'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(breaker.opened_at)
+    
+    def test_repeat_token_resolves_from_cache(self):
+        """Test that a recently seen access token skips the provider and writes nothing."""
+        self.client.post('/api/users/google/', {'access_token': 'good-token'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/users/google/', {'access_token': 'good-token'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['email'], 'provider@example.com')
+        self.assertEqual(self.provider.hits, {'/userinfo': 1})
+        self.assertEqual([q['sql'].split()[0] for q in queries.captured_queries], ['SELECT'])
+        self.assertEqual(metrics.snapshot()['counters']['oauth.identity.hit'], 1)
+    
+    def test_expired_token_not_remembered(self):
+        """Test that a token inside the clock-skew window is accepted but never cached."""
+        token = self.id_token(exp=int(time.time()) - 10)
+        for _ in range(2):
+            response = self.client.post('/api/users/google/', {'credential': token})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('oauth.identity.hit', metrics.snapshot()['counters'])
+    
+    def test_upsert_writes_only_changed_fields(self):
+        """Test that a repeat login with an unchanged profile does not write, and a change writes only it."""
+        User.objects.create_user(
+            email='google@example.com', name='Google User', auth_provider='google', is_email_verified=True
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/users/google/', {'credential': self.id_token()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries.captured_queries if not q['sql'].startswith('SELECT')])
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/api/users/google/', {'credential': self.id_token(name='Renamed')})
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"name" = ', updates[0])
+        self.assertNotIn('"password"', updates[0])
+        self.assertEqual(User.objects.get(email='google@example.com').name, 'Renamed')
+
+
+class AsyncOAuthProviderTest(ProviderStandInMixin, TestCase):
+    """Test the async OAuth views against the same stand-in provider."""
+    
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+    
+    async def login(self, view, payload):
+        request = self.factory.post('/', payload, content_type='application/json')
+        response = await view(request)
+        await oauth.get_async_client().aclose()
+        return response.status_code, json.loads(response.content)
+    
+    async def test_google_id_token(self):
+        """Test that the async view verifies ID tokens against the shared certs cache."""
+        status_code, body = await self.login(async_views.google_oauth, {'credential': self.id_token()})
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(body['user']['email'], 'google@example.com')
+        self.assertIn('access', body['tokens'])
+        
+        with self.assertLogs('users.async_views', level='ERROR'):
+            status_code, _ = await self.login(async_views.google_oauth, {'credential': self.id_token(aud='other')})
+        self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.provider.hits, {'/certs': 1})
+        
+        # Within the refresh floor an unknown key id is rejected without a fetch
+        with self.assertLogs('users.async_views', level='ERROR'):
+            status_code, _ = await self.login(async_views.google_oauth, {'credential': self.id_token(kid='forged')})
+        self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.provider.hits, {'/certs': 1})
+    
+    async def test_linkedin_code_exchange(self):
+        """Test that the async view exchanges the code and links the profile."""
+        status_code, body = await self.login(async_views.linkedin_oauth, {
+            'code': 'good-code', 'redirect_uri': 'http://localhost:3000/callback',
+        })
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(body['user']['linkedin_url'], 'https://www.linkedin.com/in/abc123/')
+        
+        status_code, _ = await self.login(async_views.linkedin_oauth, {'code': 'bad', 'redirect_uri': 'x'})
+        self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(OAUTH_HTTP_READ_TIMEOUT=5)
+    async def test_logins_wait_concurrently(self):
+        """Test that concurrent logins overlap their upstream waits instead of queueing."""
+        self.provider.delay = 0.3
+        started = time.monotonic()
+        
+        async def login():
+            request = self.factory.post('/', {'access_token': 'good-token'}, content_type='application/json')
+            return (await async_views.google_oauth(request)).status_code
+        
+        codes = await asyncio.gather(*(login() for _ in range(20)))
+        await oauth.get_async_client().aclose()
+        self.assertEqual(codes, [status.HTTP_200_OK] * 20)
+        self.assertLess(time.monotonic() - started, 20 * 0.3 / 2)
+    
+    async def test_unparseable_provider_responses(self):
+        """Test that a 200 whose body is not JSON gets the sync views' 400 or 503, not a 500."""
+        self.provider.garbled = True
+        with self.assertLogs('users.async_views', level='ERROR'):
+            status_code, _ = await self.login(async_views.google_oauth, {'access_token': 'good-token'})
+            self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+            status_code, body = await self.login(async_views.linkedin_oauth, {
+                'code': 'good-code', 'redirect_uri': 'http://localhost:3000/callback',
+            })
+            self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('Token exchange failed', body['error'])
+            status_code, _ = await self.login(async_views.google_oauth, {'credential': self.id_token()})
+            self.assertEqual(status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        status_code, body = await self.login(async_views.linkedin_oauth, {'access_token': 'good-token'})
+        self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Invalid response from LinkedIn', body['error'])
+    
+    async def test_slow_provider_opens_circuit(self):
+        """Test that timeouts count against the same circuit breaker as the sync client."""
+        self.provider.delay = 2
+        with self.assertLogs('users.async_views', level='ERROR'):
+            for _ in range(3):
+                status_code, _ = await self.login(async_views.google_oauth, {'access_token': 'good-token'})
+                self.assertEqual(status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.provider.hits, {'/userinfo': 2})
+
+
+class RateLimitTest(TestCase):
+    """Test the sliding-window throttles on the credential endpoints."""
+    
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        User.objects.create_user(email='voter@example.com', password='Str0ngPass!234', name='Voter')
+    
+    def test_window_slides_at_rate(self):
+        """Test that a limit allows its burst, then reports when the next request fits."""
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual([ratelimit.take('t', '3/min') for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(ratelimit.take('t', '3/min'), 40.0)
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1040.0):
+            self.assertEqual(ratelimit.take('t', '3/min'), 0)
+            self.assertAlmostEqual(ratelimit.take('t', '3/min'), 20.0)
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1060.0):
+            self.assertEqual(ratelimit.take('t', '3/min'), 0)
+    
+    def test_limits_do_not_share_a_lock(self):
+        """Test that a slow cache call for one key does not hold up another key."""
+        started, release = threading.Event(), threading.Event()
+        get = cache.get
+        
+        def slow_get(key, *args):
+            if 'slow' in key:
+                started.set()
+                release.wait(5)
+            return get(key, *args)
+        
+        with mock.patch.object(cache, 'get', side_effect=slow_get):
+            slow = threading.Thread(target=ratelimit.take, args=('slow', '3/min'))
+            slow.start()
+            started.wait(5)
+            self.assertEqual(ratelimit.take('fast', '3/min'), 0)
+            release.set()
+            slow.join()
+    
+    @override_settings(RATE_LIMITS={'login.ip': '100/min', 'login.account_ip': '3/hour'})
+    def test_login_rejected_before_hashing(self):
+        """Test that failed logins for an account from one address end in 429s without calling authenticate."""
+        for _ in range(3):
+            response = self.client.post('/api/users/login/', {'email': 'voter@example.com', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        with mock.patch('users.serializers.authenticate') as authenticate:
+            response = self.client.post('/api/users/login/', {'email': 'Voter@Example.com', 'password': 'Str0ngPass!234'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 1000)
+        authenticate.assert_not_called()
+        
+        response = self.client.post('/api/users/login/', {'email': 'other@example.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['ratelimit.login.account_ip.rejected'], 1)
+        self.assertEqual(counters['ratelimit.login.allowed'], 4)
+    
+    @override_settings(RATE_LIMITS={'login.ip': '100/min', 'login.account_ip': '3/hour'})
+    def test_guesser_cannot_lock_out_owner(self):
+        """Test that failures from another address, and successful logins, leave the owner able to log in."""
+        for _ in range(5):
+            self.client.post(
+                '/api/users/login/', {'email': 'voter@example.com', 'password': 'wrong'}, REMOTE_ADDR='203.0.113.9'
+            )
+        codes = [
+            self.client.post(
+                '/api/users/login/', {'email': 'voter@example.com', 'password': 'Str0ngPass!234'}
+            ).status_code
+            for _ in range(5)
+        ]
+        self.assertEqual(codes, [status.HTTP_200_OK] * 5)
+    
+    @override_settings(RATE_LIMITS={'forgot_password.ip': '2/hour', 'forgot_password.account': '10/hour'})
+    def test_ip_rejection_spares_account_bucket(self):
+        """Test that requests refused per IP do not drain the account's bucket."""
+        for _ in range(5):
+            self.client.post('/api/users/forgot-password/', {'email': 'voter@example.com'})
+        self.assertEqual(metrics.snapshot()['counters']['ratelimit.forgot_password.ip.rejected'], 3)
+        self.assertAlmostEqual(
+            ratelimit.take(f'forgot_password.account:{ratelimit.hashed("voter@example.com")}', '10/hour', cost=8), 0
+        )
+    
+    @override_settings(RATE_LIMITS={'login.ip': '3/min', 'login.account_ip': ''})
+    def test_forwarded_for_cannot_dodge_ip_bucket(self):
+        """Test that rotating X-Forwarded-For addresses still share the client's IP bucket."""
+        codes = [
+            self.client.post(
+                '/api/users/login/', {'email': 'voter@example.com', 'password': 'wrong'},
+                HTTP_X_FORWARDED_FOR=f'203.0.113.{n}'
+            ).status_code
+            for n in range(5)
+        ]
+        self.assertEqual(codes.count(status.HTTP_429_TOO_MANY_REQUESTS), 2)
+    
+    @override_settings(RATE_LIMITS={'signup.ip': ''})
+    def test_empty_rate_disables_limit(self):
+        """Test that an empty rate turns a limit off."""
+        for _ in range(3):
+            response = self.client.post('/api/users/signup/', {})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
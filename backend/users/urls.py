@@ -1,8 +1,14 @@
 """
 URL configuration for users app.
 """
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if settings.OAUTH_ASYNC_VIEWS:
+    google_oauth, linkedin_oauth = async_views.google_oauth, async_views.linkedin_oauth
+else:
+    google_oauth, linkedin_oauth = views.google_oauth_simple, views.linkedin_oauth_simple
 
 urlpatterns = [
     path('signup/', views.signup, name='signup'),
@@ -11,8 +17,8 @@ urlpatterns = [
     path('forgot-password/', views.forgot_password, name='forgot-password'),
     path('reset-password/', views.reset_password, name='reset-password'),
     path('me/', views.get_current_user, name='current-user'),
-    path('google/', views.google_oauth_simple, name='google-oauth'),
-    path('linkedin/', views.linkedin_oauth_simple, name='linkedin-oauth'),
+    path('google/', google_oauth, name='google-oauth'),
+    path('linkedin/', linkedin_oauth, name='linkedin-oauth'),
     path('', views.list_users, name='list-users'),
 ]
 
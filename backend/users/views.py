@@ -1,16 +1,22 @@
 """
 Views for user authentication and management.
 """
+import time
 from rest_framework import status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.conf import settings
 from social_django.utils import psa
+from voting_platform.pagination import KeysetPagination
+from voting_platform.ratelimit import ForgotPasswordThrottle, LoginThrottle, SignupThrottle
+from votes.voted_index import add_token_claims
+from .identity import recall_identity, remember_identity, upsert_oauth_user
+from .oauth import ProviderUnavailable, get_client, verify_google_id_token
+from .outbox import queue_email
 from .serializers import (
     UserSerializer,
     SignupSerializer,
@@ -25,6 +31,8 @@ User = get_user_model()
 def get_tokens_for_user(user):
     """Generate JWT tokens for a user."""
     refresh = RefreshToken.for_user(user)
+    if settings.JWT_HAS_VOTED_CLAIM:
+        add_token_claims(refresh, user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -33,6 +41,7 @@ def get_tokens_for_user(user):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([SignupThrottle])
 def signup(request):
     """User registration endpoint."""
     serializer = SignupSerializer(data=request.data)
@@ -63,19 +72,8 @@ Best regards,
 Voting Platform Team
 """
         
-        try:
-            send_mail(
-                subject,
-                message,
-                settings.EMAIL_HOST_USER,
-                [user.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            # In development, log the error but still create the account
-            if settings.DEBUG:
-                print(f"Email sending failed: {e}")
-                print(f"Verification URL: {verify_url}")
+        # Delivered by the mail worker; the request never waits on SMTP
+        queue_email(subject, message, [user.email], settings.EMAIL_HOST_USER)
         
         # Auto-login the user immediately
         tokens = get_tokens_for_user(user)
@@ -89,6 +87,7 @@ Voting Platform Team
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle])
 def login(request):
     """User login endpoint."""
     serializer = LoginSerializer(data=request.data, context={'request': request})
@@ -102,11 +101,13 @@ def login(request):
             'user': UserSerializer(user).data,
             'tokens': tokens
         }, status=status.HTTP_200_OK)
+    LoginThrottle().record_failure(request)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([ForgotPasswordThrottle])
 def forgot_password(request):
     """Forgot password endpoint - sends reset email with token."""
     serializer = ForgotPasswordSerializer(data=request.data)
@@ -154,28 +155,10 @@ Best regards,
 Voting Platform Team
 """
             
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [email],
-                    fail_silently=False,
-                )
-                return Response({
-                    'message': 'Password reset email sent successfully! Please check your inbox.'
-                }, status=status.HTTP_200_OK)
-            except Exception as e:
-                # For development, return the token in response if email fails
-                if settings.DEBUG:
-                    return Response({
-                        'message': 'Email sending failed (dev mode). Use this token:',
-                        'reset_url': reset_url,
-                        'token': token
-                    }, status=status.HTTP_200_OK)
-                return Response({
-                    'error': 'Failed to send email. Please try again later.'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            queue_email(subject, message, [email], settings.EMAIL_HOST_USER)
+            return Response({
+                'message': 'Password reset email sent successfully! Please check your inbox.'
+            }, status=status.HTTP_200_OK)
                 
         except User.DoesNotExist:
             # Don't reveal that user doesn't exist
@@ -365,6 +348,22 @@ def linkedin_oauth(request, backend):
         )
 
 
+def _oauth_login_response(user):
+    return Response({
+        'user': UserSerializer(user).data,
+        'tokens': get_tokens_for_user(user)
+    }, status=status.HTTP_200_OK)
+
+
+def _provider_unavailable(exc):
+    """503 for a provider that timed out, failed or has its circuit open."""
+    return Response(
+        {'error': 'The sign-in provider is not responding. Please try again shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(exc.retry_after or settings.OAUTH_CIRCUIT_RESET_SECONDS)},
+    )
+
+
 # Alternative OAuth implementation using access token directly
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -374,9 +373,6 @@ def google_oauth_simple(request):
     Frontend can send either credential (ID token) or access_token from Google OAuth flow.
     """
     import logging
-    import requests as http_requests
-    from google.oauth2 import id_token
-    from google.auth.transport import requests as google_requests
     from django.conf import settings
     
     logger = logging.getLogger(__name__)
@@ -393,11 +389,17 @@ def google_oauth_simple(request):
     try:
         logger.info(f"Google OAuth attempt - Client ID configured: {bool(settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY)}")
         
+        # A token seen recently resolves straight to its user
+        user = recall_identity('google', access_token or credential)
+        if user is not None:
+            return _oauth_login_response(user)
+        expires_at = None
+        
         # Handle access_token (from useGoogleLogin hook)
         if access_token:
             logger.info("Using access_token to fetch user info")
-            userinfo_response = http_requests.get(
-                'https://www.googleapis.com/oauth2/v3/userinfo',
+            userinfo_response = get_client().get(
+                settings.GOOGLE_OAUTH2_USERINFO_URL,
                 headers={'Authorization': f'Bearer {access_token}'}
             )
             
@@ -414,9 +416,8 @@ def google_oauth_simple(request):
             # Handle credential (ID token from GoogleLogin component)
             logger.info("Using credential ID token")
             # Verify the token with clock skew tolerance
-            idinfo = id_token.verify_oauth2_token(
-                credential, 
-                google_requests.Request(), 
+            idinfo = verify_google_id_token(
+                credential,
                 settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
                 clock_skew_in_seconds=300  # Allow 5 minutes tolerance
             )
@@ -424,6 +425,7 @@ def google_oauth_simple(request):
             # Get user info from the token
             email = idinfo.get('email')
             name = idinfo.get('name', '')
+            expires_at = idinfo.get('exp')
         
         logger.info(f"Google OAuth successful - Email: {email}, Name: {name}")
         
@@ -433,29 +435,14 @@ def google_oauth_simple(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get or create user
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'name': name or email.split('@')[0],
-                'auth_provider': 'google',
-                'is_email_verified': True,  # Google emails are already verified
-            }
-        )
-        
-        if not created:
-            # Update existing user
-            user.name = name or user.name
-            user.auth_provider = 'google'
-            user.is_email_verified = True  # Google emails are already verified
-            user.save()
-        
-        tokens = get_tokens_for_user(user)
-        return Response({
-            'user': UserSerializer(user).data,
-            'tokens': tokens
-        }, status=status.HTTP_200_OK)
+        # Create the user, or write whatever the Google profile changed
+        user = upsert_oauth_user(email, name, 'google')
+        remember_identity('google', access_token or credential, user, expires_at)
+        return _oauth_login_response(user)
         
+    except ProviderUnavailable as exc:
+        logger.error(f"Google OAuth provider unavailable: {str(exc)}")
+        return _provider_unavailable(exc)
     except ValueError as ve:
         # Token validation error
         logger.error(f"Google OAuth token validation error: {str(ve)}")
@@ -480,7 +467,6 @@ def linkedin_oauth_simple(request):
     - 'code' + 'redirect_uri' (authorization code flow)
     - 'access_token' (implicit flow)
     """
-    import requests
     from django.conf import settings
     import logging
     
@@ -491,11 +477,12 @@ def linkedin_oauth_simple(request):
     access_token = request.data.get('access_token')
     
     logger.info(f"LinkedIn OAuth - code: {code[:10] if code else None}, redirect_uri: {redirect_uri}")
+    expires_at = None
     
     # If code is provided, exchange it for access token
     if code and redirect_uri:
         try:
-            token_url = 'https://www.linkedin.com/oauth/v2/accessToken'
+            token_url = settings.LINKEDIN_OAUTH2_TOKEN_URL
             token_data = {
                 'grant_type': 'authorization_code',
                 'code': code,
@@ -511,7 +498,7 @@ def linkedin_oauth_simple(request):
             )
             
             logger.info(f"Exchanging code for token with client_id: {settings.SOCIAL_AUTH_LINKEDIN_OAUTH2_KEY}")
-            token_response = requests.post(token_url, data=token_data)
+            token_response = get_client().post(token_url, data=token_data)
             
             logger.info(f"Token response status: {token_response.status_code}")
             logger.info(f"Token response: {token_response.text}")
@@ -524,8 +511,14 @@ def linkedin_oauth_simple(request):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            access_token = token_response.json().get('access_token')
+            token_payload = token_response.json()
+            access_token = token_payload.get('access_token')
+            if token_payload.get('expires_in'):
+                expires_at = time.time() + int(token_payload['expires_in'])
             logger.info(f"Got access token: {access_token[:10] if access_token else None}...")
+        except ProviderUnavailable as exc:
+            logger.error(f'LinkedIn token exchange unavailable: {str(exc)}')
+            return _provider_unavailable(exc)
         except Exception as e:
             error_msg = f'Token exchange failed: {str(e)}'
             logger.error(error_msg)
@@ -542,12 +535,17 @@ def linkedin_oauth_simple(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    # A token the client presented recently resolves straight to its user
+    user = None if code and redirect_uri else recall_identity('linkedin', access_token)
+    if user is not None:
+        return _oauth_login_response(user)
+    
     try:
         # Get user profile from LinkedIn OpenID Connect userinfo endpoint
-        profile_url = 'https://api.linkedin.com/v2/userinfo'
+        profile_url = settings.LINKEDIN_OAUTH2_USERINFO_URL
         headers = {'Authorization': f'Bearer {access_token}'}
         logger.info(f"Fetching LinkedIn profile from: {profile_url}")
-        response = requests.get(profile_url, headers=headers)
+        response = get_client().get(profile_url, headers=headers)
         
         logger.info(f"Profile response status: {response.status_code}")
         logger.info(f"Profile response: {response.text[:500]}")  # Log first 500 chars
@@ -581,40 +579,15 @@ def linkedin_oauth_simple(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get or create user
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'name': name or email.split('@')[0],
-                'auth_provider': 'linkedin',
-                'is_email_verified': True,  # LinkedIn emails are already verified
-                'linkedin_url': f"https://www.linkedin.com/in/{linkedin_id}/" if linkedin_id else '',
-            }
-        )
-        
-        if not created:
-            # Update existing user
-            user.name = name or user.name
-            user.auth_provider = 'linkedin'
-            user.is_email_verified = True  # LinkedIn emails are already verified
-            if linkedin_id and not user.linkedin_url:
-                user.linkedin_url = f"https://www.linkedin.com/in/{linkedin_id}/"
-            user.save()
-        
-        tokens = get_tokens_for_user(user)
+        # Create the user, or write whatever the LinkedIn profile changed
+        user = upsert_oauth_user(email, name, 'linkedin', linkedin_id)
+        remember_identity('linkedin', access_token, user, expires_at)
         logger.info(f"LinkedIn login successful for user: {email}")
-        return Response({
-            'user': UserSerializer(user).data,
-            'tokens': tokens
-        }, status=status.HTTP_200_OK)
+        return _oauth_login_response(user)
         
-    except requests.exceptions.RequestException as e:
-        error_msg = f'Network error while fetching LinkedIn profile: {str(e)}'
-        logger.error(error_msg)
-        return Response(
-            {'error': error_msg},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    except ProviderUnavailable as exc:
+        logger.error(f'Network error while fetching LinkedIn profile: {str(exc)}')
+        return _provider_unavailable(exc)
     except Exception as e:
         error_msg = f'Unexpected error: {str(e)}'
         logger.error(error_msg, exc_info=True)
@@ -634,7 +607,8 @@ def list_users(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    users = User.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    users = paginator.paginate_queryset(User.objects.all(), request)
     serializer = UserSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginator.get_paginated_response(serializer.data)
 
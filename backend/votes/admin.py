@@ -2,7 +2,7 @@
 Admin configuration for votes app.
 """
 from django.contrib import admin
-from .models import Vote
+from .models import Vote, CandidateTally, VoteRollup, ResetJob
 
 
 @admin.register(Vote)
@@ -14,3 +14,31 @@ class VoteAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     readonly_fields = ['created_at']
 
+
+@admin.register(CandidateTally)
+class CandidateTallyAdmin(admin.ModelAdmin):
+    """Admin interface for CandidateTally model."""
+    list_display = ['candidate', 'shard', 'count']
+    list_filter = ['candidate']
+    readonly_fields = ['candidate', 'shard', 'count']
+
+
+@admin.register(VoteRollup)
+class VoteRollupAdmin(admin.ModelAdmin):
+    """Admin interface for VoteRollup model."""
+    list_display = ['bucket', 'candidate', 'auth_provider', 'count']
+    list_filter = ['auth_provider', 'candidate']
+    ordering = ['-bucket']
+    readonly_fields = ['bucket', 'candidate', 'auth_provider', 'count']
+
+
+@admin.register(ResetJob)
+class ResetJobAdmin(admin.ModelAdmin):
+    """Admin interface for ResetJob model."""
+    list_display = ['id', 'status', 'requested_by', 'votes_deleted', 'users_reset', 'created_at', 'finished_at']
+    list_filter = ['status']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'status', 'requested_by', 'votes_total', 'votes_deleted', 'users_total',
+        'users_reset', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at'
+    ]
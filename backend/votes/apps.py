@@ -5,3 +5,9 @@ class VotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'votes'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .ingest import buffered_ingest_enabled, require_file_locks
+        if buffered_ingest_enabled():
+            require_file_locks()
+
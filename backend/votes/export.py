@@ -0,0 +1,94 @@
+"""
+Constant-memory export of the ballot log as CSV or NDJSON.
+
+Shared by the admin export endpoint and the ``export_votes`` management
+command. Rows come from a flat ``values_list`` projection read with
+``.iterator()``, which uses a server-side cursor on PostgreSQL. Output is
+written in chunks, optionally gzip-compressed as it goes.
+"""
+import csv
+import json
+import zlib
+
+from django.conf import settings
+
+from .models import Vote
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+COLUMNS = (
+    ('vote_id', 'id'),
+    ('voted_at', 'created_at'),
+    ('user_id', 'user_id'),
+    ('user_name', 'user__name'),
+    ('user_email', 'user__email'),
+    ('auth_provider', 'user__auth_provider'),
+    ('candidate_id', 'candidate_id'),
+    ('candidate_name', 'candidate__name'),
+    ('team_id', 'candidate__team_id'),
+)
+HEADER = [name for name, _ in COLUMNS]
+
+
+def export_rows(since=None, until=None):
+    """Yield one flat tuple per vote, oldest first, optionally within [since, until)."""
+    votes = Vote.objects.all()
+    if since is not None:
+        votes = votes.filter(created_at__gte=since)
+    if until is not None:
+        votes = votes.filter(created_at__lt=until)
+    return votes.order_by('created_at', 'id').values_list(
+        *[field for _, field in COLUMNS]
+    ).iterator(chunk_size=settings.VOTE_EXPORT_CHUNK_SIZE)
+
+
+def _plain(value):
+    """Datetimes as ISO 8601, UUIDs as strings; ints, strings and None unchanged."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def render(rows, output='csv'):
+    """Yield text chunks of about VOTE_EXPORT_CHUNK_SIZE rows each."""
+    chunk_size = settings.VOTE_EXPORT_CHUNK_SIZE
+    if output == 'csv':
+        writer = csv.writer(_Echo())
+        format_row = lambda values: writer.writerow(values)
+        yield format_row(HEADER)
+    else:
+        format_row = lambda values: json.dumps(dict(zip(HEADER, values))) + '\n'
+
+    buffer = []
+    for row in rows:
+        buffer.append(format_row([_plain(value) for value in row]))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(output='csv', compress=False, since=None, until=None):
+    """Full export pipeline: rows -> text chunks -> (optionally) gzip bytes."""
+    chunks = render(export_rows(since, until), output)
+    return gzip_chunks(chunks) if compress else (chunk.encode('utf-8') for chunk in chunks)
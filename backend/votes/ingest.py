@@ -0,0 +1,363 @@
+"""
+Buffered write-behind vote ingestion.
+
+When VOTE_INGEST_MODE is 'buffered', create_vote hands each accepted ballot to
+a per-process VoteBuffer instead of committing it directly. The buffer appends
+the ballot to a local write-ahead log (fsynced before the request returns),
+keeps it in a bounded in-memory queue, and a background thread flushes the
+queue to the database in batches with bulk_create and a bulk has_voted update.
+
+Log segments are deleted once every ballot in them has been committed. On
+start-up a buffer replays any segment left behind by a crashed process; the
+flush step dedupes against existing votes, so replaying is always safe.
+Gunicorn creates the buffer as each worker starts (post_worker_init), so that
+happens before the worker serves a request. Live segments are told apart from
+orphans by an flock, so buffered mode refuses to run where fcntl is
+unavailable rather than replay a live process's log.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from voting_platform.authentication import forget_users
+from . import stats_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Raised when the pending-ballot queue is at capacity."""
+
+
+class AlreadyQueued(Exception):
+    """Raised when a ballot for the user is already waiting to be flushed."""
+
+
+def require_file_locks():
+    """Raise ImproperlyConfigured if log segments cannot be locked on this platform."""
+    if fcntl is None:
+        raise ImproperlyConfigured(
+            "VOTE_INGEST_MODE='buffered' needs fcntl file locks, which this platform lacks"
+        )
+
+
+class VoteBuffer:
+    """
+    Bounded, WAL-backed queue of ballots that flushes to the votes table in batches.
+    """
+
+    def __init__(self, wal_dir, max_pending=10000, batch_size=500,
+                 flush_interval=0.2, segment_size=5000, start=True):
+        require_file_locks()
+        self.wal_dir = str(wal_dir)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_size = segment_size
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._queue = deque()
+        self._pending_users = set()
+        self._outstanding = Counter()
+        self._open_segments = {}
+        self._segment = None
+        self._segment_path = None
+        self._segment_records = 0
+        self._thread = None
+        self._candidate_ids = frozenset()
+        self._candidate_ids_loaded = 0.0
+
+        os.makedirs(self.wal_dir, exist_ok=True)
+        self.replay_orphans()
+        self._open_segment()
+
+        if start:
+            self.start()
+
+    # Write-ahead log
+
+    def _open_segment(self):
+        """Start a new log segment, locked for the lifetime of this process."""
+        name = f"{os.getpid()}-{time.time_ns()}-{uuid.uuid4().hex[:8]}.wal"
+        path = os.path.join(self.wal_dir, name)
+        segment = open(path, 'a', encoding='utf-8')
+        fcntl.flock(segment.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._open_segments[path] = segment
+        self._segment, self._segment_path, self._segment_records = segment, path, 0
+
+    def _rotate_segment(self):
+        """Switch to a new segment; the old one stays locked until fully flushed."""
+        path = self._segment_path
+        self._open_segments[path].flush()
+        self._open_segment()
+        if not self._outstanding[path]:
+            self._remove_segment(path)
+
+    def _remove_segment(self, path):
+        self._outstanding.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        segment = self._open_segments.pop(path, None)
+        if segment is not None:
+            segment.close()
+
+    def replay_orphans(self):
+        """Flush ballots from log segments no live process holds a lock on."""
+        for name in sorted(os.listdir(self.wal_dir)):
+            if not name.endswith('.wal'):
+                continue
+            path = os.path.join(self.wal_dir, name)
+            with open(path, 'r+', encoding='utf-8') as segment:
+                try:
+                    fcntl.flock(segment.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                ballots = []
+                for line in segment:
+                    try:
+                        ballots.append(json.loads(line))
+                    except ValueError:
+                        # A torn final write from the crash; the request never returned
+                        logger.warning("Skipping unreadable record in %s", path)
+                for start in range(0, len(ballots), self.batch_size):
+                    self._flush_batch(ballots[start:start + self.batch_size])
+            logger.info("Replayed %d ballot(s) from %s", len(ballots), path)
+            os.remove(path)
+
+    # Producer side
+
+    def submit(self, user_id, candidate_id):
+        """
+        Durably log a ballot and queue it for the next flush.
+        Returns the queued ballot; raises BufferFull or AlreadyQueued.
+        """
+        ballot = {
+            'user_id': str(user_id),
+            'candidate_id': int(candidate_id),
+            'created_at': timezone.now().isoformat(),
+        }
+        with self._lock:
+            if ballot['user_id'] in self._pending_users:
+                raise AlreadyQueued()
+            if len(self._queue) >= self.max_pending:
+                raise BufferFull()
+
+            self._segment.write(json.dumps(ballot) + '\n')
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+
+            self._queue.append((self._segment_path, ballot))
+            self._pending_users.add(ballot['user_id'])
+            self._outstanding[self._segment_path] += 1
+            self._segment_records += 1
+            if self._segment_records >= self.segment_size:
+                self._rotate_segment()
+            queued = len(self._queue)
+
+        if queued >= self.batch_size:
+            self._wakeup.set()
+        return ballot
+
+    def candidate_exists(self, candidate_id, max_age=5.0):
+        """Check a candidate id against a periodically refreshed in-memory set."""
+        from candidates.models import Candidate
+
+        age = time.monotonic() - self._candidate_ids_loaded
+        if candidate_id in self._candidate_ids and age < max_age:
+            return True
+        if age >= 1.0:
+            self._candidate_ids = frozenset(Candidate.objects.values_list('id', flat=True))
+            self._candidate_ids_loaded = time.monotonic()
+        return candidate_id in self._candidate_ids
+
+    def is_pending(self, user_id):
+        """Whether a ballot for the user is queued but not yet committed."""
+        return str(user_id) in self._pending_users
+
+    def __len__(self):
+        return len(self._queue)
+
+    # Consumer side
+
+    def start(self):
+        """Start the background flusher thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='vote-buffer-flusher', daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                while self.drain_once():
+                    pass
+            except Exception:
+                logger.exception("Vote buffer flush failed; retrying")
+                time.sleep(self.flush_interval)
+
+    def drain(self):
+        """Flush everything currently queued. Returns the number of ballots flushed."""
+        flushed = 0
+        while True:
+            count = self.drain_once()
+            if not count:
+                return flushed
+            flushed += count
+
+    def drain_once(self):
+        """Flush up to one batch. Queued ballots are only released after commit."""
+        with self._flush_lock:
+            return self._drain_once()
+
+    def _drain_once(self):
+        with self._lock:
+            batch = [self._queue[i] for i in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return 0
+
+        self._flush_batch([ballot for _, ballot in batch])
+        stats_cache.bump_version()
+
+        with self._lock:
+            for _ in batch:
+                self._queue.popleft()
+            for path, ballot in batch:
+                self._pending_users.discard(ballot['user_id'])
+                self._outstanding[path] -= 1
+                if not self._outstanding[path] and path != self._segment_path:
+                    self._remove_segment(path)
+        return len(batch)
+
+    def _flush_batch(self, ballots):
+        """Write a batch of ballots, skipping users who already have a vote."""
+        from candidates.models import Candidate
+        from users.models import User
+        from .models import Vote, CandidateTally, VoteRollup, minute_bucket
+
+        # Dedupe within the batch: a user's first ballot wins
+        by_user = {}
+        for ballot in ballots:
+            by_user.setdefault(ballot['user_id'], ballot)
+
+        with transaction.atomic():
+            # One read gives each voter's auth provider and any vote they already have
+            voters = {
+                str(pk): User(pk=pk, auth_provider=auth_provider)
+                for pk, auth_provider, vote_id in
+                User.objects.filter(pk__in=list(by_user)).values_list('pk', 'auth_provider', 'vote')
+                if vote_id is None
+            }
+            candidate_ids = set(
+                Candidate.objects.filter(
+                    id__in={ballot['candidate_id'] for ballot in by_user.values()}
+                ).values_list('id', flat=True)
+            )
+            votes = [
+                Vote(
+                    user=voters[user_id],
+                    candidate_id=ballot['candidate_id'],
+                    created_at=parse_datetime(ballot['created_at']),
+                )
+                for user_id, ballot in by_user.items()
+                if user_id in voters and ballot['candidate_id'] in candidate_ids
+            ]
+            if not votes:
+                return
+
+            try:
+                with transaction.atomic():
+                    Vote.objects.bulk_create(votes)
+            except IntegrityError:
+                # A vote landed through another path since the dedupe read;
+                # fall back to per-ballot conflict-safe inserts.
+                self._flush_one_by_one(votes)
+                return
+
+            User.objects.filter(pk__in=[vote.user_id for vote in votes]).update(has_voted=True)
+            forget_users(*[vote.user_id for vote in votes])
+            for candidate_id, count in Counter(vote.candidate_id for vote in votes).items():
+                CandidateTally.objects.increment(candidate_id, count)
+            rollups = Counter(
+                (minute_bucket(vote.created_at), vote.candidate_id, vote.user.auth_provider)
+                for vote in votes
+            )
+            for (bucket, candidate_id, auth_provider), count in rollups.items():
+                VoteRollup.objects.increment(bucket, candidate_id, auth_provider, count)
+
+    def _flush_one_by_one(self, votes):
+        from .models import Vote
+
+        for vote in votes:
+            Vote.objects.cast(vote.user, vote.candidate_id, created_at=vote.created_at)
+
+    def close(self):
+        """Stop the flusher and commit whatever is still queued."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        try:
+            self.drain()
+        except Exception:
+            # The ballots stay in the log and are replayed on the next start
+            logger.exception("Could not flush vote buffer on shutdown")
+            return
+        with self._lock:
+            for path in list(self._open_segments):
+                self._remove_segment(path)
+            self._segment = None
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_vote_buffer():
+    """Return this process's VoteBuffer, creating it (and replaying the log) on first use."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = VoteBuffer(
+                    wal_dir=settings.VOTE_INGEST_WAL_DIR,
+                    max_pending=settings.VOTE_INGEST_MAX_PENDING,
+                    batch_size=settings.VOTE_INGEST_BATCH_SIZE,
+                    flush_interval=settings.VOTE_INGEST_FLUSH_INTERVAL,
+                )
+    return _buffer
+
+
+def start_vote_buffer():
+    """Create the buffer at worker start, so orphaned logs are replayed before any request."""
+    if buffered_ingest_enabled():
+        get_vote_buffer()
+
+
+def buffered_ingest_enabled():
+    return settings.VOTE_INGEST_MODE == 'buffered'
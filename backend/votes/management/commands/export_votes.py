@@ -0,0 +1,44 @@
+"""
+Management command to export the ballot log for auditors.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from votes.export import EXPORT_FORMATS, export
+
+
+class Command(BaseCommand):
+    help = 'Streams every vote as CSV or NDJSON in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Gzip-compress the output')
+        parser.add_argument('--since', help='Only votes cast at or after this ISO 8601 datetime')
+        parser.add_argument('--until', help='Only votes cast before this ISO 8601 datetime')
+        parser.add_argument('--file', help='Write to this path instead of stdout')
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('since', 'until'):
+            if options[name]:
+                bounds[name] = parse_datetime(options[name])
+                if bounds[name] is None:
+                    raise CommandError(f'--{name} must be an ISO 8601 datetime.')
+
+        chunks = export(options['output'], options['gzip'], **bounds)
+        if options['file']:
+            with open(options['file'], 'wb') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exported votes to {options['file']}"))
+            return
+
+        out = getattr(self.stdout, 'buffer', None)
+        if out is not None:
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+        elif options['gzip']:
+            raise CommandError('--gzip output needs --file or a binary stdout.')
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
@@ -0,0 +1,92 @@
+"""
+Management command to check the candidate tallies and minute rollups against the votes table.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from candidates.models import Candidate
+from votes.models import CandidateTally, VoteRollup
+
+
+class Command(BaseCommand):
+    help = 'Compares sharded candidate tallies and minute rollups with a real COUNT(*) over the votes table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite drifted tallies and rollups from the votes table',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = self.drifted_tallies()
+            drifted_rollups = self.drifted_rollups()
+
+            if not drifted and not drifted_rollups:
+                self.stdout.write(self.style.SUCCESS(
+                    'All candidate tallies and rollups match the votes table.'
+                ))
+                return
+
+            if not options['fix']:
+                raise CommandError(
+                    f'{len(drifted)} candidate tally(ies) and {len(drifted_rollups)} rollup '
+                    f'bucket(s) drifted. Re-run with --fix to repair.'
+                )
+
+            for candidate, expected, _ in drifted:
+                CandidateTally.objects.filter(candidate=candidate).delete()
+                CandidateTally.objects.create(candidate=candidate, shard=0, count=expected)
+
+            for (bucket, candidate_id, auth_provider), expected in drifted_rollups:
+                VoteRollup.objects.filter(
+                    bucket=bucket, candidate_id=candidate_id, auth_provider=auth_provider
+                ).delete()
+                if expected:
+                    VoteRollup.objects.create(
+                        bucket=bucket, candidate_id=candidate_id,
+                        auth_provider=auth_provider, count=expected
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired {len(drifted)} candidate tally(ies) and {len(drifted_rollups)} rollup bucket(s).'
+        ))
+
+    def drifted_tallies(self):
+        """``(candidate, expected, counted)`` for every candidate whose tally is off."""
+        actual = CandidateTally.objects.recount()
+        tallied = CandidateTally.objects.counts()
+
+        drifted = []
+        for candidate in Candidate.objects.all():
+            expected = actual.get(candidate.id, 0)
+            counted = tallied.get(candidate.id, 0)
+            if expected != counted:
+                drifted.append((candidate, expected, counted))
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'{candidate.name}: tally {counted}, votes table {expected}'
+                    )
+                )
+        return drifted
+
+    def drifted_rollups(self):
+        """``((bucket, candidate_id, auth_provider), expected)`` for every rollup bucket that is off."""
+        actual = VoteRollup.objects.recount()
+        rolled = {
+            (bucket, candidate_id, auth_provider): count
+            for bucket, candidate_id, auth_provider, count in
+            VoteRollup.objects.values_list('bucket', 'candidate_id', 'auth_provider', 'count')
+        }
+
+        drifted = []
+        for key in actual.keys() | rolled.keys():
+            expected, counted = actual.get(key, 0), rolled.get(key, 0)
+            if expected != counted:
+                drifted.append((key, expected))
+                bucket, candidate_id, auth_provider = key
+                self.stdout.write(self.style.WARNING(
+                    f'Rollup {bucket:%Y-%m-%d %H:%M} candidate {candidate_id} ({auth_provider}): '
+                    f'{counted}, votes table {expected}'
+                ))
+        return drifted
@@ -0,0 +1,50 @@
+"""
+Management command that runs queued vote reset jobs.
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from votes.reset import claim_next_job, run_reset
+
+
+class Command(BaseCommand):
+    help = 'Runs pending vote reset jobs, one at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs pending now and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.VOTE_RESET_POLL_INTERVAL,
+            help='Seconds to wait when no job is pending',
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        completed = 0
+        while self.running:
+            close_old_connections()
+            job = claim_next_job()
+            if job is not None:
+                job = run_reset(job.pk)
+                completed += 1
+                self.stdout.write(f'Vote reset {job.pk} {job.status}')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {completed} reset job(s)'))
+
+    def stop(self, signum, frame):
+        # A job already running is finished before the worker exits
+        self.running = False
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tallies(apps, schema_editor):
+    """Seed shard 0 of each candidate's tally from the existing votes."""
+    Vote = apps.get_model('votes', 'Vote')
+    CandidateTally = apps.get_model('votes', 'CandidateTally')
+    db_alias = schema_editor.connection.alias
+    counts = (
+        Vote.objects.using(db_alias)
+        .values('candidate_id')
+        .annotate(total=models.Count('id'))
+    )
+    CandidateTally.objects.using(db_alias).bulk_create([
+        CandidateTally(candidate_id=row['candidate_id'], shard=0, count=row['total'])
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0002_candidate_description'),
+        ('votes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('count', models.BigIntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='candidates.candidate')),
+            ],
+            options={
+                'db_table': 'candidate_tallies',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='candidatetally',
+            constraint=models.UniqueConstraint(fields=('candidate', 'shard'), name='unique_candidate_tally_shard'),
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
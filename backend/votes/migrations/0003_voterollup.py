@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+
+
+def backfill_rollups(apps, schema_editor):
+    """Bucket the existing votes by minute, candidate and auth provider."""
+    Vote = apps.get_model('votes', 'Vote')
+    VoteRollup = apps.get_model('votes', 'VoteRollup')
+    db_alias = schema_editor.connection.alias
+    buckets = Counter(
+        (created_at.replace(second=0, microsecond=0), candidate_id, auth_provider)
+        for created_at, candidate_id, auth_provider in
+        Vote.objects.using(db_alias)
+        .values_list('created_at', 'candidate_id', 'user__auth_provider')
+        .iterator()
+    )
+    VoteRollup.objects.using(db_alias).bulk_create([
+        VoteRollup(bucket=bucket, candidate_id=candidate_id, auth_provider=auth_provider, count=count)
+        for (bucket, candidate_id, auth_provider), count in buckets.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0002_candidate_description'),
+        ('votes', '0002_candidatetally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the minute the votes were cast in')),
+                ('auth_provider', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='candidates.candidate')),
+            ],
+            options={
+                'db_table': 'vote_rollups',
+                'ordering': ['-bucket'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='voterollup',
+            constraint=models.UniqueConstraint(fields=('bucket', 'candidate', 'auth_provider'), name='unique_vote_rollup_bucket'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0005_resetjob'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='resetjob',
+            constraint=models.UniqueConstraint(models.Case(models.When(status__in=['pending', 'running'], then=models.Value('active')), default=models.F('status')), condition=models.Q(('status__in', ['pending', 'running'])), name='one_active_vote_reset'),
+        ),
+    ]
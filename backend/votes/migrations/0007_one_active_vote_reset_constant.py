@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0006_one_active_vote_reset'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='resetjob',
+            name='one_active_vote_reset',
+        ),
+        migrations.AddConstraint(
+            model_name='resetjob',
+            constraint=models.UniqueConstraint(models.Value(1), condition=models.Q(('status__in', ['pending', 'running'])), name='one_active_vote_reset'),
+        ),
+    ]
@@ -1,10 +1,105 @@
 """
 Vote models for the voting platform.
 """
-from django.db import models
+import datetime
+import random
+from django.conf import settings
+from django.db import models, connections, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMinute
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from users.models import User
+from voting_platform.authentication import forget_users
+from voting_platform.db.writer import serialized
+
+
+class VoteManager(models.Manager):
+    """Manager with a minimal-round-trip ballot casting path."""
+    
+    def cast(self, user, candidate_id, created_at=None):
+        """
+        Record ``user``'s vote for ``candidate_id`` in one short transaction.
+        
+        The ballot is written with ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``
+        so the OneToOneField unique constraint is the only duplicate guard and a
+        missing candidate inserts nothing. Returns the new Vote, or None when the
+        user has already voted. Raises Candidate.DoesNotExist for an unknown candidate.
+        On SQLite the write goes through the process's single writer thread.
+        ``created_at`` defaults to now; the vote buffer passes the time it
+        acknowledged the ballot.
+        """
+        return serialized(self._cast, user, candidate_id, created_at, using=self.db)
+    
+    def _cast(self, user, candidate_id, created_at=None):
+        from candidates.models import Candidate
+        
+        if created_at is None:
+            created_at = timezone.now()
+        connection = connections[self.db]
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            return self._cast_fallback(user, candidate_id, created_at)
+        
+        votes_table = connection.ops.quote_name(self.model._meta.db_table)
+        candidates_table = connection.ops.quote_name(Candidate._meta.db_table)
+        sql = (
+            f"INSERT INTO {votes_table} (user_id, candidate_id, created_at) "
+            f"SELECT %s, id, %s FROM {candidates_table} WHERE id = %s "
+            f"ON CONFLICT (user_id) DO NOTHING"
+        )
+        opts = self.model._meta
+        params = [
+            opts.get_field('user').get_db_prep_value(user.pk, connection),
+            opts.get_field('created_at').get_db_prep_value(created_at, connection),
+            candidate_id,
+        ]
+        
+        with transaction.atomic(using=self.db, savepoint=False):
+            with connection.cursor() as cursor:
+                if connection.features.can_return_columns_from_insert:
+                    cursor.execute(f"{sql} RETURNING id", params)
+                    row = cursor.fetchone()
+                    vote_id = row[0] if row else None
+                else:
+                    cursor.execute(sql, params)
+                    vote_id = cursor.lastrowid if cursor.rowcount == 1 else None
+            
+            if vote_id is not None:
+                self._mark_voted(user)
+                CandidateTally.objects.db_manager(self.db).increment(candidate_id)
+                VoteRollup.objects.db_manager(self.db).increment(
+                    created_at, candidate_id, user.auth_provider
+                )
+        
+        if vote_id is None:
+            # Nothing inserted: either a duplicate ballot or an unknown candidate
+            if not Candidate.objects.using(self.db).filter(id=candidate_id).exists():
+                raise Candidate.DoesNotExist('Candidate not found.')
+            self._mark_voted(user)
+            return None
+        
+        vote = self.model(id=vote_id, user=user, candidate_id=candidate_id, created_at=created_at)
+        vote._state.adding = False
+        vote._state.db = self.db
+        return vote
+    
+    def _mark_voted(self, user):
+        """Set has_voted without a full save of the user row."""
+        User.objects.using(self.db).filter(pk=user.pk).update(has_voted=True)
+        user.has_voted = True
+        forget_users(user.pk)
+    
+    def _cast_fallback(self, user, candidate_id, created_at):
+        """Portable cast path for backends without ON CONFLICT support."""
+        from candidates.models import Candidate
+        from django.db import IntegrityError
+        
+        candidate = Candidate.objects.using(self.db).get(id=candidate_id)
+        try:
+            with transaction.atomic(using=self.db):
+                return self.create(user=user, candidate=candidate, created_at=created_at)
+        except (IntegrityError, ValidationError):
+            return None
 
 
 class Vote(models.Model):
@@ -26,9 +121,16 @@ class Vote(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now)
     
+    objects = VoteManager()
+    
     class Meta:
         db_table = 'votes'
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first listing, keyset pagination and export ranges
+            models.Index(fields=['created_at', 'id'], name='votes_created_at_id_idx'),
+            models.Index(fields=['candidate', 'created_at'], name='votes_candidate_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.name} voted for {self.candidate.name}"
@@ -39,10 +141,275 @@ class Vote(models.Model):
             raise ValidationError('User has already voted.')
     
     def save(self, *args, **kwargs):
-        """Override save to update user's has_voted flag."""
+        """Override save to update user's has_voted flag and the candidate tally."""
         self.full_clean()
-        super().save(*args, **kwargs)
-        # Update user's has_voted flag
-        self.user.has_voted = True
-        self.user.save(update_fields=['has_voted'])
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if adding:
+                CandidateTally.objects.increment(self.candidate_id)
+                VoteRollup.objects.increment(
+                    self.created_at, self.candidate_id, self.user.auth_provider
+                )
+            # Update user's has_voted flag
+            self.user.has_voted = True
+            self.user.save(update_fields=['has_voted'])
+
+
+class CandidateTallyManager(models.Manager):
+    """Manager for sharded per-candidate vote counters."""
+    
+    def increment(self, candidate_id, amount=1):
+        """
+        Add ``amount`` votes to a random shard of the candidate's tally.
+        Must run inside the transaction that inserts the vote.
+        """
+        shard = random.randrange(max(settings.VOTE_TALLY_SHARDS, 1))
+        connection = connections[self.db]
+        
+        if connection.vendor in ('sqlite', 'postgresql'):
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (candidate_id, shard, count) VALUES (%s, %s, %s) "
+                    f"ON CONFLICT (candidate_id, shard) "
+                    f"DO UPDATE SET count = {table}.count + excluded.count",
+                    [candidate_id, shard, amount]
+                )
+            return
+        
+        updated = self.filter(candidate_id=candidate_id, shard=shard).update(
+            count=F('count') + amount
+        )
+        if not updated:
+            self.create(candidate_id=candidate_id, shard=shard, count=amount)
+    
+    def decrement(self, candidate_id):
+        """Take one vote off the candidate's tally, from a shard that still has one."""
+        shard = self.filter(candidate_id=candidate_id, count__gt=0).values_list('pk', flat=True).first()
+        if shard is not None:
+            self.filter(pk=shard, count__gt=0).update(count=F('count') - 1)
+    
+    def recount(self):
+        """Return ``{candidate_id: vote_count}`` counted from the votes table itself."""
+        return dict(
+            Vote.objects.using(self.db).values('candidate_id')
+            .annotate(total=Count('id'))
+            .values_list('candidate_id', 'total')
+        )
+    
+    def rebuild(self):
+        """Replace every tally with a recount of the votes table, one shard per candidate."""
+        self.all().delete()
+        self.bulk_create([
+            self.model(candidate_id=candidate_id, shard=0, count=total)
+            for candidate_id, total in self.recount().items()
+        ])
+    
+    def counts(self):
+        """Return a ``{candidate_id: vote_count}`` mapping summed over shards."""
+        return dict(
+            self.values('candidate_id')
+            .annotate(total=Sum('count'))
+            .values_list('candidate_id', 'total')
+        )
+
+
+class CandidateTally(models.Model):
+    """
+    Sharded vote counter for a candidate.
+    Votes are spread over VOTE_TALLY_SHARDS rows per candidate so concurrent
+    ballots for the same candidate don't all contend on one row.
+    """
+    candidate = models.ForeignKey(
+        'candidates.Candidate',
+        on_delete=models.CASCADE,
+        related_name='tallies'
+    )
+    shard = models.PositiveSmallIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+    
+    objects = CandidateTallyManager()
+    
+    class Meta:
+        db_table = 'candidate_tallies'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['candidate', 'shard'],
+                name='unique_candidate_tally_shard'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Candidate {self.candidate_id} shard {self.shard}: {self.count}"
+
 
+def minute_bucket(moment):
+    """Truncate a datetime to the start of its minute."""
+    return moment.replace(second=0, microsecond=0)
+
+
+class VoteRollupManager(models.Manager):
+    """Manager for minute-bucketed vote counts."""
+    
+    def increment(self, created_at, candidate_id, auth_provider, amount=1):
+        """Add ``amount`` votes to the (minute, candidate, auth_provider) bucket."""
+        bucket = minute_bucket(created_at)
+        connection = connections[self.db]
+        
+        if connection.vendor in ('sqlite', 'postgresql'):
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            bucket_value = self.model._meta.get_field('bucket').get_db_prep_value(bucket, connection)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (bucket, candidate_id, auth_provider, count) "
+                    f"VALUES (%s, %s, %s, %s) "
+                    f"ON CONFLICT (bucket, candidate_id, auth_provider) "
+                    f"DO UPDATE SET count = {table}.count + excluded.count",
+                    [bucket_value, candidate_id, auth_provider, amount]
+                )
+            return
+        
+        updated = self.filter(
+            bucket=bucket, candidate_id=candidate_id, auth_provider=auth_provider
+        ).update(count=F('count') + amount)
+        if not updated:
+            self.create(
+                bucket=bucket, candidate_id=candidate_id,
+                auth_provider=auth_provider, count=amount
+            )
+    
+    def decrement(self, created_at, candidate_id, auth_provider):
+        """Take one vote off the (minute, candidate, auth_provider) bucket."""
+        self.filter(
+            bucket=minute_bucket(created_at), candidate_id=candidate_id,
+            auth_provider=auth_provider, count__gt=0
+        ).update(count=F('count') - 1)
+    
+    def recount(self):
+        """Return ``{(bucket, candidate_id, auth_provider): count}`` from the votes table itself."""
+        return {
+            (bucket, candidate_id, auth_provider): total
+            for bucket, candidate_id, auth_provider, total in (
+                Vote.objects.using(self.db)
+                .annotate(bucket=TruncMinute('created_at', tzinfo=datetime.timezone.utc))
+                .values('bucket', 'candidate_id', 'user__auth_provider')
+                .annotate(total=Count('id'))
+                .values_list('bucket', 'candidate_id', 'user__auth_provider', 'total')
+            )
+        }
+    
+    def rebuild(self):
+        """Replace every rollup row with a recount of the votes table."""
+        self.all().delete()
+        self.bulk_create([
+            self.model(bucket=bucket, candidate_id=candidate_id, auth_provider=auth_provider, count=total)
+            for (bucket, candidate_id, auth_provider), total in self.recount().items()
+        ])
+    
+    def since(self, moment):
+        """Rollup rows for buckets overlapping ``moment`` onwards."""
+        return self.filter(bucket__gte=minute_bucket(moment))
+    
+    def window_totals(self, **windows):
+        """
+        Sum several trailing windows in one query, e.g.
+        ``window_totals(last_24_hours=timedelta(hours=24))``.
+        """
+        now = timezone.now()
+        return {
+            name: total or 0
+            for name, total in self.aggregate(**{
+                name: Sum('count', filter=Q(bucket__gte=minute_bucket(now - duration)))
+                for name, duration in windows.items()
+            }).items()
+        }
+
+
+class VoteRollup(models.Model):
+    """
+    Vote count per minute bucket, candidate and voter auth provider.
+    Trailing-window statistics sum these rows instead of scanning the votes table.
+    """
+    bucket = models.DateTimeField(help_text="Start of the minute the votes were cast in")
+    candidate = models.ForeignKey(
+        'candidates.Candidate',
+        on_delete=models.CASCADE,
+        related_name='rollups'
+    )
+    auth_provider = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+    
+    objects = VoteRollupManager()
+    
+    class Meta:
+        db_table = 'vote_rollups'
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket', 'candidate', 'auth_provider'],
+                name='unique_vote_rollup_bucket'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:%M} candidate {self.candidate_id} ({self.auth_provider}): {self.count}"
+
+
+class ResetJob(models.Model):
+    """
+    A background wipe of every ballot, run by votes.reset in bounded batches.
+    The counters let the admin UI report progress while it runs.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vote_reset_jobs'
+    )
+    votes_total = models.BigIntegerField(default=0)
+    votes_deleted = models.BigIntegerField(default=0)
+    users_total = models.BigIntegerField(default=0)
+    users_reset = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Touched after every batch")
+    
+    class Meta:
+        db_table = 'vote_reset_jobs'
+        ordering = ['-created_at']
+        constraints = [
+            # At most one pending or running job: every active row indexes the constant 1
+            models.UniqueConstraint(
+                models.Value(1),
+                condition=Q(status__in=['pending', 'running']),
+                name='one_active_vote_reset',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Vote reset {self.pk} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Fraction of the rows to clear that have been cleared, 0.0 to 1.0."""
+        total = self.votes_total + self.users_total
+        if self.status == self.STATUS_SUCCEEDED or not total:
+            return 1.0 if self.status == self.STATUS_SUCCEEDED else 0.0
+        return min(1.0, (self.votes_deleted + self.users_reset) / total)
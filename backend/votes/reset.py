@@ -0,0 +1,203 @@
+"""
+Background vote reset.
+
+Wiping the ballot log with one DELETE and one UPDATE across every user holds
+write locks for as long as both statements run. ``start_reset`` records a
+pending ResetJob instead, and the ``run_reset_worker`` command picks it up in
+its own process, out of reach of request timeouts and worker recycling. A
+unique constraint allows only one pending or running job at a time.
+
+The job clears the votes that existed when it started in primary-key ranges
+of VOTE_RESET_BATCH_SIZE rows, each in its own short transaction, then clears
+``has_voted`` in the same way, touching only users that have it set. With
+VOTE_RESET_FAST_PATH on, the votes are dropped in one statement where the
+backend does that without visiting rows (TRUNCATE on PostgreSQL, SQLite's
+unqualified DELETE).
+
+Ballots cast while a reset runs are kept. The tallies and rollups are recounted
+from the surviving ballots as the job's last step, with new ballots held off
+meanwhile, so they match the votes table however the two interleaved.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from users.models import User
+from voting_platform.authentication import forget_users_everywhere
+from . import stats_cache
+from .models import Vote, CandidateTally, VoteRollup, ResetJob
+from .voted_index import get_voted_index
+
+logger = logging.getLogger(__name__)
+
+
+class ResetInProgress(Exception):
+    """Another reset job is still running; carries that job."""
+    
+    def __init__(self, job):
+        super().__init__(f'Vote reset {job.pk} is still {job.status}')
+        self.job = job
+
+
+def active_job():
+    """The reset job still pending or running, if any. Jobs that stopped reporting are failed."""
+    stale_before = timezone.now() - timedelta(seconds=settings.VOTE_RESET_STALE_SECONDS)
+    ResetJob.objects.filter(
+        status__in=ResetJob.ACTIVE_STATUSES, updated_at__lt=stale_before
+    ).update(
+        status=ResetJob.STATUS_FAILED, error='Abandoned: the worker stopped reporting progress',
+        finished_at=timezone.now()
+    )
+    return ResetJob.objects.filter(status__in=ResetJob.ACTIVE_STATUSES).first()
+
+
+def start_reset(requested_by=None):
+    """
+    Queue a reset job for the reset worker (or run it inline, see
+    VOTE_RESET_IN_BACKGROUND). Raises ResetInProgress if one is active.
+    """
+    with transaction.atomic():
+        running = active_job()
+        if running is not None:
+            raise ResetInProgress(running)
+        try:
+            with transaction.atomic():
+                job = ResetJob.objects.create(requested_by=requested_by)
+        except IntegrityError:
+            # Another request queued one between the check and the insert
+            raise ResetInProgress(active_job())
+    
+    if not settings.VOTE_RESET_IN_BACKGROUND:
+        run_reset(job.pk)
+        job.refresh_from_db()
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest pending job running and return it, or None if there is none."""
+    for job in ResetJob.objects.filter(status=ResetJob.STATUS_PENDING).order_by('created_at'):
+        claimed = ResetJob.objects.filter(pk=job.pk, status=ResetJob.STATUS_PENDING).update(
+            status=ResetJob.STATUS_RUNNING, started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            return job
+    return None
+
+
+def run_reset(job_id):
+    """Clear every ballot cast before the job started, recording progress on the job."""
+    job = ResetJob.objects.get(pk=job_id)
+    job.status = ResetJob.STATUS_RUNNING
+    job.started_at = job.started_at or timezone.now()
+    
+    with transaction.atomic():
+        # Counters restart from zero; ballots cast from here on count towards them
+        max_vote_id = Vote.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        CandidateTally.objects.all().delete()
+        VoteRollup.objects.all().delete()
+    stats_cache.bump_version()
+    
+    job.votes_total = Vote.objects.filter(pk__lte=max_vote_id).count()
+    job.users_total = User.objects.filter(has_voted=True).count()
+    job.save()
+    
+    try:
+        if not (settings.VOTE_RESET_FAST_PATH and _truncate_votes(job, max_vote_id)):
+            _delete_votes(job, max_vote_id)
+        stats_cache.bump_version()
+        get_voted_index().invalidate()
+        _reset_users(job)
+        _recount()
+    except Exception as exc:
+        logger.exception('Vote reset %s failed', job.pk)
+        job.status = ResetJob.STATUS_FAILED
+        job.error = str(exc)
+    else:
+        job.status = ResetJob.STATUS_SUCCEEDED
+    job.finished_at = timezone.now()
+    job.save()
+    stats_cache.bump_version()
+    get_voted_index().invalidate()
+    return job
+
+
+def _recount():
+    """Rebuild tallies and rollups from the ballots left, with new ballots held off meanwhile."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Readers carry on; inserts wait until the recount commits
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Vote._meta.db_table)} IN SHARE MODE')
+        # On SQLite the first DELETE takes the database's write lock for the rest of the transaction
+        CandidateTally.objects.rebuild()
+        VoteRollup.objects.rebuild()
+    stats_cache.bump_version()
+
+
+def _truncate_votes(job, max_vote_id):
+    """
+    Drop every ballot in one statement. Only done when no ballot has arrived
+    since the job started; returns False to fall back to batched deletes.
+    """
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return False
+    table = connection.ops.quote_name(Vote._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        if Vote.objects.filter(pk__gt=max_vote_id).exists():
+            return False
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'TRUNCATE {table}')
+        else:
+            # Without a WHERE clause SQLite drops the pages instead of visiting rows
+            cursor.execute(f'DELETE FROM {table}')
+    job.votes_deleted = job.votes_total
+    job.save(update_fields=['votes_deleted', 'updated_at'])
+    return True
+
+
+def _delete_votes(job, max_vote_id):
+    batch_size = settings.VOTE_RESET_BATCH_SIZE
+    table = connection.ops.quote_name(Vote._meta.db_table)
+    pk = connection.ops.quote_name(Vote._meta.pk.column)
+    last_id = 0
+    while True:
+        ids = list(
+            Vote.objects.filter(pk__gt=last_id, pk__lte=max_vote_id)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        # Plain SQL, so no post_delete signal uncounts each ballot: the tallies
+        # and rollups were cleared up front and _recount rebuilds them at the end
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {pk} BETWEEN %s AND %s', [ids[0], ids[-1]]
+            )
+            deleted = cursor.rowcount
+        last_id = ids[-1]
+        job.votes_deleted += deleted
+        job.save(update_fields=['votes_deleted', 'updated_at'])
+
+
+def _reset_users(job):
+    batch_size = settings.VOTE_RESET_BATCH_SIZE
+    voted = User.objects.filter(has_voted=True, vote__isnull=True)
+    last_pk = None
+    while True:
+        batch = voted if last_pk is None else voted.filter(pk__gt=last_pk)
+        pks = list(batch.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            updated = voted.filter(pk__in=pks).update(has_voted=False)
+        # The web workers hold these users too; this runs in the reset worker
+        forget_users_everywhere()
+        last_pk = pks[-1]
+        job.users_reset += updated
+        job.save(update_fields=['users_reset', 'updated_at'])
@@ -2,7 +2,7 @@
 Serializers for Vote model.
 """
 from rest_framework import serializers
-from .models import Vote
+from .models import Vote, ResetJob
 from candidates.serializers import CandidateSerializer
 from users.serializers import UserSerializer
 
@@ -19,6 +19,13 @@ class VoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'candidate', 'created_at']
 
 
+class VoteReceiptSerializer(serializers.Serializer):
+    """Slim receipt returned after casting a vote."""
+    id = serializers.IntegerField()
+    candidate_id = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+
+
 class VoterSerializer(serializers.Serializer):
     """Serializer for voters list display."""
     id = serializers.UUIDField()
@@ -26,3 +33,15 @@ class VoterSerializer(serializers.Serializer):
     linkedin_url = serializers.URLField(allow_blank=True, allow_null=True)
     voted_at = serializers.DateTimeField()
 
+
+class ResetJobSerializer(serializers.ModelSerializer):
+    """Status and progress of a background vote reset."""
+    job_id = serializers.IntegerField(source='id', read_only=True)
+    progress = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = ResetJob
+        fields = [
+            'job_id', 'status', 'progress', 'votes_total', 'votes_deleted',
+            'users_total', 'users_reset', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
@@ -0,0 +1,28 @@
+"""
+Signal handlers for the votes app.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from users.models import User
+from . import stats_cache
+from .models import Vote, CandidateTally, VoteRollup
+
+
+@receiver(post_delete, sender=Vote)
+def uncount_vote(sender, instance, using, **kwargs):
+    """
+    Take a deleted ballot (admin delete, or cascaded from its voter) back out of
+    the candidate tally and the minute rollup. Counters already removed by a
+    cascade from the candidate are left alone.
+    """
+    CandidateTally.objects.db_manager(using).decrement(instance.candidate_id)
+    auth_provider = (
+        User.objects.using(using).filter(pk=instance.user_id)
+        .values_list('auth_provider', flat=True).first()
+    )
+    if auth_provider is not None:
+        VoteRollup.objects.db_manager(using).decrement(
+            instance.created_at, instance.candidate_id, auth_provider
+        )
+    stats_cache.bump_version()
@@ -0,0 +1,78 @@
+"""
+Short-TTL, stampede-protected cache for the public statistics payload.
+
+Cached snapshots are tagged with a votes version that create_vote, buffered
+flushes and reset_votes bump. A snapshot is fresh while its version matches and
+its TTL has not run out. Otherwise exactly one caller (holding a short cache
+lock) recomputes it while everyone else keeps serving the stale snapshot.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from voting_platform import conditional, metrics
+
+SNAPSHOT_KEY = 'votes:statistics:{}'
+LOCK_SUFFIX = ':lock'
+
+
+def current_version():
+    """Return the votes version token (shared with the conditional GET stamps)."""
+    return conditional.current_version('votes')[0]
+
+
+def bump_version():
+    """Mark cached vote-derived payloads, and the ETags derived from them, as out of date."""
+    conditional.bump_version('votes')
+
+
+def get_or_compute(variant, compute):
+    """
+    Return ``(payload, state)`` for the statistics ``variant``, where state is
+    'hit', 'stale' or 'miss'. ``compute`` is only called by the single caller
+    that wins the recompute lock (or when there is nothing to serve at all).
+    """
+    key = SNAPSHOT_KEY.format(variant)
+    version = current_version()
+    entry = cache.get(key)
+
+    if entry and entry['version'] == version and entry['expires'] > time.time():
+        metrics.increment('statistics_cache.hit')
+        return entry['payload'], 'hit'
+
+    lock_key = key + LOCK_SUFFIX
+    locked = cache.add(lock_key, 1, settings.STATISTICS_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry:
+            metrics.increment('statistics_cache.stale')
+            return entry['payload'], 'stale'
+        entry = _wait_for_snapshot(key)
+        if entry:
+            metrics.increment('statistics_cache.stale')
+            return entry['payload'], 'stale'
+
+    try:
+        payload = compute()
+        cache.set(key, {
+            'version': version,
+            'expires': time.time() + settings.STATISTICS_CACHE_TTL,
+            'payload': payload,
+        }, settings.STATISTICS_CACHE_TTL * 10)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+    metrics.increment('statistics_cache.miss')
+    return payload, 'miss'
+
+
+def _wait_for_snapshot(key, poll=0.02):
+    """Cold cache with a recompute in flight: wait briefly for its result."""
+    deadline = time.monotonic() + settings.STATISTICS_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        entry = cache.get(key)
+        if entry:
+            return entry
+    return None
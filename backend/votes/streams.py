@@ -0,0 +1,250 @@
+"""
+Server-Sent Events streams of live vote tallies.
+
+Each worker process runs one TallyHub per stream kind. The hub is the only
+thing that touches the cache or database: every VOTE_STREAM_INTERVAL_MS it
+checks the votes version and reloads the snapshot only when something changed
+(or VOTE_STREAM_MAX_STALENESS seconds passed, to pick up votes cast in other
+processes). Connections just wait on a one-slot queue, so an idle connection
+costs a coroutine and a few kilobytes, and a slow client only ever sees the
+latest snapshot.
+
+Streaming needs the ASGI entry point (voting_platform.asgi). Under WSGI each
+open stream would hold a worker thread for as long as the client stayed, so
+the endpoints answer 204 instead. That makes EventSource give up, and the
+pages fall back to polling the JSON endpoints. Each process also serves at
+most VOTE_STREAM_MAX_CONNECTIONS streams; further clients get 503 and poll.
+
+EventSource cannot send an Authorization header, and a bearer token in the
+URL would end up in access logs. The admin results stream is therefore
+opened with a ticket from ``results_stream_ticket``. A ticket is good for
+one connection and expires after VOTE_STREAM_TICKET_TTL seconds.
+"""
+import asyncio
+import json
+import secrets
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+from voting_platform import metrics
+from voting_platform.authentication import CachedJWTAuthentication
+from . import stats_cache
+
+TICKET_KEY = 'stream-ticket:{}'
+
+
+def load_results():
+    """Per-candidate counts, in the shape of the results endpoint."""
+    from .views import _compute_results
+    return _compute_results()
+
+
+def load_statistics():
+    """The public statistics payload, shared with the cached endpoint."""
+    from .views import _compute_statistics
+    payload, _ = stats_cache.get_or_compute('all', _compute_statistics)
+    return payload
+
+
+class TallyHub:
+    """Polls one snapshot source on behalf of every connection in this process."""
+
+    def __init__(self, load_snapshot):
+        self.load_snapshot = load_snapshot
+        self.subscribers = set()
+        self.latest = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._task = None
+
+    def subscribe(self):
+        """Register a connection; it immediately receives the latest snapshot if any."""
+        queue = asyncio.Queue(maxsize=1)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def refresh(self):
+        """Reload the snapshot if the votes version moved or it is too old."""
+        version = await sync_to_async(stats_cache.current_version)()
+        too_old = time.monotonic() - self._loaded_at >= settings.VOTE_STREAM_MAX_STALENESS
+        if version == self._version and not too_old and self.latest is not None:
+            return
+        snapshot = await sync_to_async(self.load_snapshot)()
+        self._version, self._loaded_at = version, time.monotonic()
+        if snapshot != self.latest:
+            self.latest = snapshot
+            self.publish(snapshot)
+
+    def publish(self, snapshot):
+        """Hand the snapshot to every connection, replacing anything not yet sent."""
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    async def _run(self):
+        interval = settings.VOTE_STREAM_INTERVAL_MS / 1000
+        while self.subscribers:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+
+_hubs = {}
+
+
+def get_hub(name, load_snapshot):
+    """One hub per stream kind and event loop."""
+    key = (name, id(asyncio.get_running_loop()))
+    if key not in _hubs:
+        _hubs[key] = TallyHub(load_snapshot)
+    return _hubs[key]
+
+
+def open_streams():
+    """Connections subscribed to any hub on the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    return sum(len(hub.subscribers) for (_, hub_loop), hub in _hubs.items() if hub_loop == loop_id)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def results_delta(previous, current):
+    """
+    Candidate counts that changed since the snapshot a connection last received.
+    Returns None when candidates were added, so the full snapshot is sent instead.
+    """
+    before = {row['id']: row['vote_count'] for row in previous}
+    after = {row['id']: row['vote_count'] for row in current}
+    if not after.keys() <= before.keys():
+        return None
+    return {
+        'changed': {cid: count for cid, count in after.items() if before.get(cid) != count},
+        'removed': [cid for cid in before if cid not in after],
+        'total_votes': sum(after.values()),
+    }
+
+
+def _snapshot_event(name, snapshot, sent, diff):
+    """A delta against what the connection last saw when possible, else the full snapshot."""
+    if diff is not None and sent is not None:
+        delta = diff(sent, snapshot)
+        if delta is not None:
+            return format_event('delta', delta)
+    return format_event(name, snapshot)
+
+
+async def stream_events(name, load_snapshot, diff=None):
+    """Async event generator for one connection."""
+    hub = get_hub(name, load_snapshot)
+    queue = hub.subscribe()
+    heartbeat = settings.VOTE_STREAM_HEARTBEAT_SECONDS
+    sent = None
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                snapshot = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield _snapshot_event(name, snapshot, sent, diff)
+            sent = snapshot
+    finally:
+        hub.unsubscribe(queue)
+
+
+def event_stream_response(request, name, load_snapshot, diff=None):
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    if open_streams() >= settings.VOTE_STREAM_MAX_CONNECTIONS:
+        metrics.increment(f'streams.{name}.rejected')
+        return JsonResponse(
+            {'error': 'Too many live streams open. Poll the JSON endpoint instead.'},
+            status=503, headers={'Retry-After': '30'}
+        )
+    response = StreamingHttpResponse(stream_events(name, load_snapshot, diff), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def results_stream_ticket(request):
+    """ADMIN-ONLY: Issue a single-use ticket for opening the results stream."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(TICKET_KEY.format(ticket), request.user.pk, settings.VOTE_STREAM_TICKET_TTL)
+    return Response(
+        {'ticket': ticket, 'expires_in': settings.VOTE_STREAM_TICKET_TTL},
+        status=status.HTTP_201_CREATED
+    )
+
+
+def _authenticate(request):
+    """Resolve the user from the Authorization header or a ?ticket= stream ticket."""
+    auth = CachedJWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        return _redeem_ticket(request.GET.get('ticket'))
+    raw_token = auth.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _redeem_ticket(ticket):
+    if not ticket:
+        return None
+    key = TICKET_KEY.format(ticket)
+    user_id = cache.get(key)
+    # Only the request that deletes the ticket may use it
+    if user_id is None or not cache.delete(key):
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+
+async def results_stream(request):
+    """
+    ADMIN-ONLY: Live per-candidate counts. Sends a `results` event, then
+    `delta` events with the counts that changed.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'}, status=401
+        )
+    if not user.is_staff:
+        return JsonResponse({'error': 'Admin privileges required'}, status=403)
+    return event_stream_response(request, 'results', load_results, diff=results_delta)
+
+
+async def statistics_stream(request):
+    """Live aggregate statistics, in the shape of the statistics endpoint."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    return event_stream_response(request, 'statistics', load_statistics)
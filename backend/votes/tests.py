@@ -1,12 +1,40 @@
 """
 Tests for votes app.
 """
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+from io import StringIO
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, AsyncClient, override_settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.utils import timezone
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import status
 from candidates.models import Candidate
-from .models import Vote
+from .models import Vote, CandidateTally, VoteRollup, ResetJob
+from voting_platform import authentication, metrics
+from voting_platform.ratelimit import ConcurrencyLimiter
+from voting_platform.query_plans import capture_plans
+from . import ingest, stats_cache, streams, voted_index
+from .ingest import VoteBuffer, AlreadyQueued, BufferFull
 
 User = get_user_model()
 
@@ -96,6 +124,36 @@ class VoteAPITest(TestCase):
         response2 = self.client.post(f'/api/votes/{candidate2.id}/')
         self.assertEqual(response2.status_code, status.HTTP_400_BAD_REQUEST)
     
+    def test_create_vote_query_count(self):
+        """Test that casting a vote costs one insert, one flag update and two counter upserts."""
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(4):
+            response = self.client.post(f'/api/votes/{self.candidate.id}/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['candidate_id'], self.candidate.id)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.has_voted)
+    
+    def test_create_vote_unknown_candidate(self):
+        """Test voting for a missing candidate returns 404 and records nothing."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/votes/9999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Vote.objects.exists())
+    
+    def test_duplicate_vote_with_stale_flag(self):
+        """Test that the unique constraint rejects a vote even if has_voted is stale."""
+        Vote.objects.create(user=self.user, candidate=self.candidate)
+        User.objects.filter(pk=self.user.pk).update(has_voted=False)
+        stale_user = User.objects.get(pk=self.user.pk)
+        
+        self.client.force_authenticate(user=stale_user)
+        response = self.client.post(f'/api/votes/{self.candidate.id}/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 1})
+        self.assertTrue(User.objects.get(pk=self.user.pk).has_voted)
+    
     def test_get_voters_list(self):
         """Test getting voters list."""
         self.client.force_authenticate(user=self.user)
@@ -103,5 +161,1157 @@ class VoteAPITest(TestCase):
         
         response = self.client.get('/api/votes/voters/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+    
+    def test_keyset_pagination(self):
+        """Test walking list_votes pages forward and back with opaque cursors."""
+        admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.client.force_authenticate(user=admin)
+        # Two votes share a timestamp so the id tie-breaker is exercised
+        same_time = timezone.now()
+        for i in range(5):
+            voter = User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            Vote.objects.create(
+                user=voter,
+                candidate=self.candidate,
+                created_at=same_time if i < 2 else same_time + timedelta(seconds=i)
+            )
+        expected = list(Vote.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        
+        pages = []
+        response = self.client.get('/api/votes/?page_size=2')
+        self.assertIsNone(response.data['previous'])
+        while True:
+            pages.append([vote['id'] for vote in response.data['results']])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual([vote_id for page in pages for vote_id in page], expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([vote['id'] for vote in response.data['results']], pages[1])
+        
+        response = self.client.get('/api/votes/?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    @override_settings(VOTERS_STREAM_CHUNK_SIZE=2)
+    def test_stream_voters_list(self):
+        """Test that the streamed voters list matches the regular response."""
+        self.client.force_authenticate(user=self.user)
+        for i in range(4):
+            voter = User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            Vote.objects.create(user=voter, candidate=self.candidate)
+        
+        expected = self.client.get('/api/votes/voters/').json()['results']
+        response = self.client.get('/api/votes/voters/?stream=1')
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, expected)
+
+
+class CandidateTallyTest(TestCase):
+    """Test the sharded candidate tally table."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        self.voters = [
+            User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            for i in range(3)
+        ]
+    
+    def cast_votes(self):
+        for voter in self.voters:
+            self.client.force_authenticate(user=voter)
+            self.client.post(f'/api/votes/{self.candidate.id}/')
+    
+    def test_vote_increments_tally(self):
+        """Test that casting votes increments the candidate tally."""
+        self.cast_votes()
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 3})
+    
+    def test_results_and_statistics_read_tallies(self):
+        """Test that results and statistics report tally counts."""
+        self.cast_votes()
+        self.client.force_authenticate(user=self.admin)
+        
+        response = self.client.get('/api/votes/results/')
+        self.assertEqual(response.data[0]['vote_count'], 3)
+        
+        response = self.client.get('/api/votes/statistics/')
+        self.assertEqual(response.data['total_votes'], 3)
+        self.assertEqual(response.data['candidate_statistics'][0]['vote_count'], 3)
+    
+    def test_statistics_windows_read_rollups(self):
+        """Test that trailing-window statistics come from the minute rollups."""
+        self.cast_votes()
+        self.assertEqual(VoteRollup.objects.aggregate(total=Sum('count'))['total'], 3)
+        
+        old = timezone.now() - timedelta(days=3)
+        VoteRollup.objects.increment(old, self.candidate.id, 'google', 2)
+        
+        response = self.client.get('/api/votes/statistics/?window=90m')
+        self.assertEqual(response.data['recent_votes'], {'last_24_hours': 3, 'last_7_days': 5})
+        self.assertEqual(response.data['window']['total_votes'], 3)
+        self.assertEqual(
+            {row['user__auth_provider']: row['count'] for row in response.data['votes_by_auth_provider']},
+            {'local': 3, 'google': 2}
+        )
+        
+        response = self.client.get('/api/votes/statistics/?window=4d')
+        self.assertEqual(response.data['window']['total_votes'], 5)
+        
+        response = self.client.get('/api/votes/statistics/?window=soon')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(VOTE_RESET_IN_BACKGROUND=False)
+    def test_reset_clears_tallies(self):
+        """Test that resetting votes clears the tallies."""
+        self.cast_votes()
+        self.client.force_authenticate(user=self.admin)
+        self.client.post('/api/votes/reset/')
+        self.assertFalse(CandidateTally.objects.exists())
+        self.assertFalse(VoteRollup.objects.exists())
+    
+    def test_reconcile_command(self):
+        """Test that the reconcile command detects and repairs drift."""
+        self.cast_votes()
+        CandidateTally.objects.update(count=0)
+        
+        with self.assertRaises(CommandError):
+            call_command('reconcile_vote_tallies', stdout=StringIO())
+        
+        call_command('reconcile_vote_tallies', '--fix', stdout=StringIO())
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 3})
+    
+    def test_reconcile_rebuilds_rollups(self):
+        """Test that the reconcile command also repairs the minute rollups."""
+        self.cast_votes()
+        VoteRollup.objects.update(count=7)
+        VoteRollup.objects.increment(timezone.now() - timedelta(days=2), self.candidate.id, 'google')
+        
+        with self.assertRaises(CommandError):
+            call_command('reconcile_vote_tallies', stdout=StringIO())
+        
+        call_command('reconcile_vote_tallies', '--fix', stdout=StringIO())
+        self.assertEqual(list(VoteRollup.objects.values_list('auth_provider', 'count')), [('local', 3)])
+        call_command('reconcile_vote_tallies', stdout=StringIO())
+    
+    def test_deleted_votes_leave_the_counters(self):
+        """Test that deleting a voter, or their ballot, takes the vote off the tally and rollup."""
+        self.cast_votes()
+        self.voters[0].delete()
+        Vote.objects.get(user=self.voters[1]).delete()
+        
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 1})
+        self.assertEqual(VoteRollup.objects.aggregate(total=Sum('count'))['total'], 1)
+    
+    def test_deleting_candidate_with_votes(self):
+        """Test that a candidate's cascade removes its votes and counters cleanly."""
+        self.cast_votes()
+        self.candidate.delete()
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(CandidateTally.objects.exists())
+        self.assertFalse(VoteRollup.objects.exists())
+
+
+class VoteBufferTest(TestCase):
+    """Test buffered write-behind vote ingestion."""
+    
+    def setUp(self):
+        self.wal_dir = tempfile.mkdtemp()
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        self.voters = [
+            User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            for i in range(3)
+        ]
+    
+    def tearDown(self):
+        shutil.rmtree(self.wal_dir, ignore_errors=True)
+    
+    def make_buffer(self, **kwargs):
+        return VoteBuffer(wal_dir=self.wal_dir, start=False, **kwargs)
+    
+    @override_settings(VOTE_INGEST_MODE='buffered')
+    def test_refused_without_file_locks(self):
+        """Test that buffered mode will not start where live log segments cannot be locked."""
+        with mock.patch('votes.ingest.fcntl', None):
+            with self.assertRaises(ImproperlyConfigured):
+                self.make_buffer()
+            with self.assertRaises(ImproperlyConfigured):
+                apps.get_app_config('votes').ready()
+        self.assertEqual(os.listdir(self.wal_dir), [])
+    
+    def test_drain_writes_votes_in_batches(self):
+        """Test that queued ballots are flushed with flags and tallies."""
+        buffer = self.make_buffer(batch_size=2)
+        for voter in self.voters:
+            buffer.submit(voter.pk, self.candidate.id)
+        
+        self.assertEqual(buffer.drain(), 3)
+        self.assertEqual(Vote.objects.count(), 3)
+        self.assertEqual(User.objects.filter(has_voted=True).count(), 3)
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 3})
+    
+    def test_dedupe(self):
+        """Test that queued and already-recorded users are not counted twice."""
+        buffer = self.make_buffer()
+        buffer.submit(self.voters[0].pk, self.candidate.id)
+        with self.assertRaises(AlreadyQueued):
+            buffer.submit(self.voters[0].pk, self.candidate.id)
+        
+        Vote.objects.create(user=self.voters[1], candidate=self.candidate)
+        buffer.submit(self.voters[1].pk, self.candidate.id)
+        buffer.drain()
+        self.assertEqual(Vote.objects.count(), 2)
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 2})
+    
+    def test_backpressure(self):
+        """Test that a full buffer rejects new ballots."""
+        buffer = self.make_buffer(max_pending=1)
+        buffer.submit(self.voters[0].pk, self.candidate.id)
+        with self.assertRaises(BufferFull):
+            buffer.submit(self.voters[1].pk, self.candidate.id)
+    
+    def test_replay_after_crash(self):
+        """Test that a new buffer replays log segments left by a dead one."""
+        crashed = self.make_buffer()
+        for voter in self.voters:
+            crashed.submit(voter.pk, self.candidate.id)
+        # Simulate the process dying: its segment locks are released unflushed
+        for segment in crashed._open_segments.values():
+            segment.close()
+        
+        self.make_buffer()
+        self.assertEqual(Vote.objects.count(), 3)
+        self.assertEqual(len(os.listdir(self.wal_dir)), 1)
+    
+    def test_worker_start_replays(self):
+        """Test that starting a worker replays orphaned logs without waiting for a ballot."""
+        crashed = self.make_buffer()
+        crashed.submit(self.voters[0].pk, self.candidate.id)
+        for segment in crashed._open_segments.values():
+            segment.close()
+        
+        with override_settings(VOTE_INGEST_MODE='buffered', VOTE_INGEST_WAL_DIR=self.wal_dir), \
+                mock.patch('votes.ingest._buffer', None):
+            ingest.start_vote_buffer()
+            self.assertTrue(Vote.objects.filter(user=self.voters[0]).exists())
+            ingest.get_vote_buffer().close()
+    
+    def test_conflict_fallback_keeps_ballot_time(self):
+        """Test that ballots flushed one by one keep the time they were acknowledged."""
+        buffer = self.make_buffer()
+        acknowledged = timezone.now() - timedelta(minutes=10)
+        with mock.patch('votes.ingest.timezone.now', return_value=acknowledged):
+            buffer.submit(self.voters[0].pk, self.candidate.id)
+        with mock.patch.object(Vote.objects, 'bulk_create', side_effect=IntegrityError):
+            buffer.drain()
+        
+        self.assertEqual(Vote.objects.get(user=self.voters[0]).created_at, acknowledged)
+        self.assertEqual(
+            list(VoteRollup.objects.values_list('bucket', flat=True)),
+            [acknowledged.replace(second=0, microsecond=0)]
+        )
+
+
+class StatisticsCacheTest(TestCase):
+    """Test the cached statistics snapshot."""
+    
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test User'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+    
+    def test_hit_after_miss(self):
+        """Test that a second request is served from the cache without queries."""
+        response = self.client.get('/api/votes/statistics/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/votes/statistics/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(
+            metrics.snapshot()['counters'],
+            {'statistics_cache.miss': 1, 'statistics_cache.hit': 1}
+        )
+    
+    def test_vote_invalidates_snapshot(self):
+        """Test that casting a vote bumps the version so totals are recomputed."""
+        self.client.get('/api/votes/statistics/')
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f'/api/votes/{self.candidate.id}/')
+        
+        response = self.client.get('/api/votes/statistics/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['total_votes'], 1)
+    
+    def test_stale_served_while_recomputing(self):
+        """Test that only the lock holder recomputes; others get the stale snapshot."""
+        self.client.get('/api/votes/statistics/')
+        stats_cache.bump_version()
+        cache.add(stats_cache.SNAPSHOT_KEY.format('all') + stats_cache.LOCK_SUFFIX, 1)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/votes/statistics/')
+        self.assertEqual(response['X-Cache'], 'STALE')
+
+
+class TallyStreamTest(TestCase):
+    """Test the live tally event streams."""
+    
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.voter = User.objects.create_user(
+            email='voter@example.com',
+            password='testpass123',
+            name='Voter'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+    
+    def test_hub_coalesces_updates(self):
+        """Test that a connection only holds the latest unsent snapshot."""
+        async def scenario():
+            hub = streams.TallyHub(lambda: None)
+            queue = hub.subscribe()
+            hub.publish({'total_votes': 1})
+            hub.publish({'total_votes': 2})
+            latest = queue.get_nowait()
+            hub.unsubscribe(queue)
+            return latest, queue.empty()
+        
+        latest, empty = async_to_sync(scenario)()
+        self.assertEqual(latest, {'total_votes': 2})
+        self.assertTrue(empty)
+    
+    def test_results_delta(self):
+        """Test that deltas carry only changed counts."""
+        before = [{'id': 1, 'vote_count': 3}, {'id': 2, 'vote_count': 1}]
+        after = [{'id': 1, 'vote_count': 4}, {'id': 2, 'vote_count': 1}]
+        self.assertEqual(
+            streams.results_delta(before, after),
+            {'changed': {1: 4}, 'removed': [], 'total_votes': 5}
+        )
+    
+    def ticket(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.post('/api/votes/results/stream/ticket/')
+    
+    def test_results_stream_requires_admin(self):
+        """Test that the per-candidate stream and its tickets are admin-only."""
+        response = self.client.get('/api/votes/results/stream/')
+        self.assertEqual(response.status_code, 401)
+        
+        self.assertEqual(self.ticket(self.voter).status_code, status.HTTP_403_FORBIDDEN)
+        token = AccessToken.for_user(self.voter)
+        response = self.client.get('/api/votes/results/stream/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 403)
+    
+    def test_stream_tickets(self):
+        """Test that tickets are single-use and bearer tokens are not accepted in the URL."""
+        token = AccessToken.for_user(self.admin)
+        response = self.client.get(f'/api/votes/results/stream/?token={token}')
+        self.assertEqual(response.status_code, 401)
+        
+        ticket = self.ticket(self.admin).data['ticket']
+        response = self.client.get(f'/api/votes/results/stream/?ticket={ticket}')
+        self.assertEqual(response.status_code, 204)
+        response = self.client.get(f'/api/votes/results/stream/?ticket={ticket}')
+        self.assertEqual(response.status_code, 401)
+    
+    async def test_results_stream_sends_snapshot(self):
+        """Test that an admin connection receives the current counts."""
+        ticket = (await sync_to_async(self.ticket)(self.admin)).data['ticket']
+        response = await AsyncClient().get(f'/api/votes/results/stream/?ticket={ticket}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        
+        chunks = response.streaming_content
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        event = (await anext(chunks)).decode()
+        await chunks.aclose()
+        self.assertTrue(event.startswith('event: results\n'))
+        self.assertIn('"vote_count": 0', event)
+    
+    def test_wsgi_streams_decline(self):
+        """Test that streams answer 204 over WSGI rather than pinning a worker thread."""
+        response = self.client.get('/api/votes/statistics/stream/')
+        self.assertEqual(response.status_code, 204)
+    
+    @override_settings(VOTE_STREAM_MAX_CONNECTIONS=0)
+    async def test_stream_cap(self):
+        """Test that connections beyond the per-process cap are turned away."""
+        response = await AsyncClient().get('/api/votes/statistics/stream/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+
+
+class VoteExportTest(TestCase):
+    """Test the streaming audit export."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        now = timezone.now()
+        for i in range(3):
+            voter = User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            Vote.objects.create(
+                user=voter, candidate=self.candidate, created_at=now - timedelta(days=i)
+            )
+    
+    def test_export_requires_admin(self):
+        """Test that regular users cannot export the ballot log."""
+        voter = User.objects.get(email='voter0@example.com')
+        self.client.force_authenticate(user=voter)
+        response = self.client.get('/api/votes/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_csv_export(self):
+        """Test CSV export with a time-range filter."""
+        self.client.force_authenticate(user=self.admin)
+        since = (timezone.now() - timedelta(days=1, hours=1)).isoformat()
+        response = self.client.get('/api/votes/export/', {'since': since})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['user_email'] for row in rows], ['voter1@example.com', 'voter0@example.com'])
+        self.assertEqual(rows[0]['candidate_name'], 'Test Candidate')
+    
+    def test_gzip_ndjson_export(self):
+        """Test gzip-compressed NDJSON export."""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/votes/export/', {'output': 'ndjson', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['user_email'], 'voter2@example.com')
+    
+    def test_export_command(self):
+        """Test the export_votes management command."""
+        out = StringIO()
+        call_command('export_votes', '--output', 'ndjson', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+@override_settings(VOTE_RESET_IN_BACKGROUND=False, VOTE_RESET_BATCH_SIZE=2)
+class ResetJobTest(TestCase):
+    """Test the batched background vote reset."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        for i in range(5):
+            voter = User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            Vote.objects.cast(voter, self.candidate.id)
+        self.client.force_authenticate(user=self.admin)
+    
+    def assertReset(self, response):
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], ResetJob.STATUS_SUCCEEDED)
+        self.assertEqual(response.data['progress'], 1.0)
+        self.assertEqual((response.data['votes_deleted'], response.data['users_reset']), (5, 5))
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(CandidateTally.objects.exists())
+        self.assertFalse(User.objects.filter(has_voted=True).exists())
+    
+    @override_settings(VOTE_RESET_FAST_PATH=False)
+    def test_batched_reset(self):
+        """Test that votes and users are cleared in primary-key batches."""
+        self.assertReset(self.client.post('/api/votes/reset/'))
+    
+    def test_fast_path_reset(self):
+        """Test the one-statement delete."""
+        self.assertReset(self.client.post('/api/votes/reset/'))
+    
+    def test_progress_endpoint(self):
+        """Test polling a job, and that regular users cannot."""
+        job_id = self.client.post('/api/votes/reset/').data['job_id']
+        response = self.client.get(f'/api/votes/reset/{job_id}/')
+        self.assertEqual(response.data['status'], ResetJob.STATUS_SUCCEEDED)
+        self.assertEqual(self.client.get('/api/votes/reset/999/').status_code, status.HTTP_404_NOT_FOUND)
+        
+        self.client.force_authenticate(user=User.objects.get(email='voter0@example.com'))
+        response = self.client.get(f'/api/votes/reset/{job_id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_one_job_at_a_time(self):
+        """Test that a second reset is refused while one runs, unless the first was abandoned."""
+        job = ResetJob.objects.create(status=ResetJob.STATUS_RUNNING)
+        response = self.client.post('/api/votes/reset/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['job_id'], job.id)
+        
+        ResetJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertReset(self.client.post('/api/votes/reset/'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ResetJob.STATUS_FAILED)
+    
+    @override_settings(VOTE_RESET_FAST_PATH=False)
+    def test_ballots_cast_during_reset_survive(self):
+        """Test that a ballot newer than the job's starting point is kept with its tally."""
+        from . import reset
+        late_voter = User.objects.create_user(
+            email='late@example.com', password='testpass123', name='Late'
+        )
+        original = reset._delete_votes
+        
+        def cast_then_delete(job, max_vote_id):
+            Vote.objects.cast(late_voter, self.candidate.id)
+            original(job, max_vote_id)
+        
+        with mock.patch.object(reset, '_delete_votes', cast_then_delete):
+            self.client.post('/api/votes/reset/')
+        self.assertEqual(list(Vote.objects.values_list('user_id', flat=True)), [late_voter.id])
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 1})
+        late_voter.refresh_from_db()
+        self.assertTrue(late_voter.has_voted)
+    
+    def test_counters_recounted_from_survivors(self):
+        """Test that counters lost to an interleaved cast are rebuilt from the ballots left."""
+        from . import reset
+        late_voter = User.objects.create_user(
+            email='late@example.com', password='testpass123', name='Late'
+        )
+        original = reset._truncate_votes
+        
+        def cast_then_truncate(job, max_vote_id):
+            Vote.objects.cast(late_voter, self.candidate.id)
+            # As if the cast's increments had landed before the counters were cleared
+            CandidateTally.objects.all().delete()
+            VoteRollup.objects.all().delete()
+            return original(job, max_vote_id)
+        
+        with mock.patch.object(reset, '_truncate_votes', cast_then_truncate):
+            self.client.post('/api/votes/reset/')
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(CandidateTally.objects.counts(), {self.candidate.id: 1})
+        self.assertEqual(VoteRollup.objects.aggregate(total=Sum('count'))['total'], 1)
+    
+    def test_concurrent_start_refused(self):
+        """Test that the constraint refuses a second active job that slipped past the check."""
+        from . import reset
+        job = ResetJob.objects.create(status=ResetJob.STATUS_RUNNING)
+        with mock.patch.object(reset, 'active_job', side_effect=[None, job]):
+            with self.assertRaises(reset.ResetInProgress) as raised:
+                reset.start_reset()
+        self.assertEqual(raised.exception.job, job)
+        self.assertEqual(ResetJob.objects.count(), 1)
+    
+    @override_settings(VOTE_RESET_IN_BACKGROUND=True)
+    def test_worker_runs_queued_job(self):
+        """Test that a queued job waits for the reset worker, which runs it."""
+        response = self.client.post('/api/votes/reset/')
+        self.assertEqual(response.data['status'], ResetJob.STATUS_PENDING)
+        self.assertEqual(Vote.objects.count(), 5)
+        
+        call_command('run_reset_worker', '--once', stdout=StringIO())
+        self.assertEqual(ResetJob.objects.get(pk=response.data['job_id']).status, ResetJob.STATUS_SUCCEEDED)
+        self.assertFalse(Vote.objects.exists())
+    
+    @override_settings(VOTE_RESET_IN_BACKGROUND=True)
+    def test_web_workers_forget_reset_users(self):
+        """Test that a web worker's cached has_voted=True is dropped once the reset worker clears it."""
+        voter = User.objects.get(email='voter0@example.com')
+        web_worker = authentication.UserCache(max_size=10, ttl=60, sync_interval=0)
+        web_worker.put(voter.pk, voter)
+        self.assertTrue(web_worker.get(voter.pk).has_voted)
+        
+        self.client.post('/api/votes/reset/')
+        call_command('run_reset_worker', '--once', stdout=StringIO())
+        self.assertIsNone(web_worker.get(voter.pk))
+
+
+class VotedIndexTest(TestCase):
+    """Test the in-process voted-user index behind has_voted."""
+    
+    def setUp(self):
+        cache.clear()
+        voted_index._index = None
+        self.client = APIClient()
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        self.voter = User.objects.create_user(
+            email='voter@example.com',
+            password='testpass123',
+            name='Voter'
+        )
+    
+    @override_settings(VOTED_INDEX_SYNC_INTERVAL=60)
+    def test_answers_from_memory(self):
+        """Test that create_vote updates the index and lookups then need no query."""
+        index = voted_index.get_voted_index()
+        self.assertNotIn(self.voter.pk, index)
+        
+        self.client.force_authenticate(user=self.voter)
+        self.client.post(f'/api/votes/{self.candidate.id}/')
+        with self.assertNumQueries(0):
+            self.assertIn(self.voter.pk, index)
+            self.assertNotIn(uuid.uuid4(), index)
+        
+        # The stored flag is not consulted once the index knows the ballot
+        User.objects.filter(pk=self.voter.pk).update(has_voted=False)
+        self.voter.refresh_from_db()
+        response = self.client.get('/api/votes/has_voted/')
+        self.assertTrue(response.data['has_voted'])
+    
+    @override_settings(VOTED_INDEX_SYNC_INTERVAL=0)
+    def test_follows_votes_table_and_resets(self):
+        """Test that ballots cast elsewhere are picked up and a reset empties the index."""
+        index = voted_index.get_voted_index()
+        self.assertEqual(len(index), 0)
+        Vote.objects.cast(self.voter, self.candidate.id)
+        self.assertIn(self.voter.pk, index)
+        
+        admin = User.objects.create_superuser(
+            email='admin@example.com', password='testpass123', name='Admin'
+        )
+        self.client.force_authenticate(user=admin)
+        with override_settings(VOTE_RESET_IN_BACKGROUND=False):
+            self.client.post('/api/votes/reset/')
+        self.assertNotIn(self.voter.pk, index)
+    
+    @override_settings(VOTED_INDEX_SYNC_INTERVAL=0, VOTED_INDEX_SYNC_OVERLAP=100)
+    def test_late_commit_below_high_water(self):
+        """Test that a ballot with a lower id committed after a higher one is still picked up."""
+        index = voted_index.get_voted_index()
+        late = User.objects.create_user(email='late@example.com', password='testpass123', name='Late')
+        Vote.objects.create(id=50, user=self.voter, candidate=self.candidate)
+        self.assertIn(self.voter.pk, index)
+        
+        Vote.objects.create(id=40, user=late, candidate=self.candidate)
+        self.assertIn(late.pk, index)
+        self.assertEqual(index._high_water, 50)
+    
+    @override_settings(VOTED_INDEX_SYNC_INTERVAL=60)
+    def test_warmed_at_worker_start(self):
+        """Test that warming builds the index, so the first lookup needs no query."""
+        Vote.objects.cast(self.voter, self.candidate.id)
+        voted_index.warm_voted_index()
+        with self.assertNumQueries(0):
+            self.assertIn(self.voter.pk, voted_index.get_voted_index())
+    
+    def test_many_members(self):
+        """Test lookups across merges and Bloom filter growth."""
+        index = voted_index.VotedIndex(sync_interval=3600)
+        index._synced_at = time.monotonic()
+        members = [uuid.uuid4() for _ in range(3000)]
+        for member in members:
+            index.add(member)
+        self.assertEqual(len(index), 3000)
+        self.assertTrue(all(member in index for member in members))
+        self.assertFalse(any(uuid.uuid4() in index for _ in range(1000)))
+    
+    @override_settings(JWT_HAS_VOTED_CLAIM=True)
+    def test_token_claim(self):
+        """Test the has_voted claim and that a reset invalidates it."""
+        from users.views import get_tokens_for_user
+        Vote.objects.cast(self.voter, self.candidate.id)
+        self.voter.refresh_from_db()
+        access = AccessToken(get_tokens_for_user(self.voter)['access'])
+        self.assertTrue(access['has_voted'])
+        self.assertTrue(voted_index.token_claims_vote(access))
+        voted_index.bump_generation()
+        self.assertFalse(voted_index.token_claims_vote(access))
+
+
+@override_settings(VOTED_INDEX_SYNC_INTERVAL=60)
+class AuthUserCacheTest(TestCase):
+    """Test cached user resolution in CachedJWTAuthentication."""
+    
+    def setUp(self):
+        metrics.reset()
+        authentication.forget_all_users()
+        voted_index._index = None
+        voted_index.get_voted_index().sync(force=True)
+        self.client = APIClient()
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        self.user = User.objects.create_user(
+            email='voter@example.com',
+            password='testpass123',
+            name='Voter'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+    
+    def test_repeat_requests_skip_user_query(self):
+        """Test that only the first request loads the user row."""
+        with self.assertNumQueries(1):
+            self.client.get('/api/votes/has_voted/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/votes/has_voted/')
+        self.assertFalse(response.data['has_voted'])
+        counters = metrics.snapshot()['counters']
+        self.assertEqual((counters['auth_user_cache.miss'], counters['auth_user_cache.hit']), (1, 1))
+    
+    def test_save_and_vote_evict(self):
+        """Test that saves and the cast path drop the cached copy."""
+        self.client.get('/api/users/me/')
+        self.client.post(f'/api/votes/{self.candidate.id}/')
+        self.assertTrue(self.client.get('/api/users/me/').data['has_voted'])
+        
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_changes_reach_other_processes(self):
+        """Test that a save elsewhere empties this process's cache at its next sync."""
+        other = authentication.UserCache(max_size=10, ttl=60, sync_interval=0)
+        other.put(self.user.pk, self.user)
+        self.assertIsNotNone(other.get(self.user.pk))
+        
+        User.objects.create_user(email='new@example.com', password='testpass123', name='New')
+        self.assertIsNotNone(other.get(self.user.pk))
+        
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(other.get(self.user.pk))
+        self.assertEqual(metrics.snapshot()['counters']['auth_user_cache.generation'], 1)
+    
+    def test_lru_eviction_and_ttl(self):
+        """Test that the cache stays bounded and entries expire."""
+        cache = authentication.UserCache(max_size=2, ttl=60)
+        users = [self.user] + [
+            User.objects.create_user(email=f'other{i}@example.com', password='testpass123', name='Other')
+            for i in range(2)
+        ]
+        for user in users:
+            cache.put(user.pk, user)
+        self.assertIsNone(cache.get(self.user.pk))
+        self.assertEqual(cache.get(users[2].pk).email, 'other1@example.com')
+        self.assertEqual(metrics.snapshot()['counters']['auth_user_cache.eviction'], 1)
+        
+        cache.ttl = 0
+        cache.put(self.user.pk, self.user)
+        self.assertIsNone(cache.get(self.user.pk))
+
+
+class ConditionalGetTest(TestCase):
+    """Test ETag / Last-Modified revalidation of the read-mostly endpoints."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+    
+    def test_candidate_list(self):
+        """Test 304s without queries, and that editing a candidate changes the ETag."""
+        response = self.client.get('/api/candidates/')
+        etag = response['ETag']
+        self.assertIn('stale-while-revalidate=60', response['Cache-Control'])
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/candidates/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        
+        response = self.client.get('/api/candidates/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.client.force_authenticate(user=self.admin)
+        self.client.patch(f'/api/candidates/{self.candidate.id}/', {'name': 'Renamed'})
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/candidates/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data[0]['name'], 'Renamed')
+    
+    def test_version_tokens_expire(self):
+        """Test that a version token is replaced once it outlives CONDITIONAL_VERSION_TTL."""
+        etag = self.client.get('/api/candidates/')['ETag']
+        later = time.time() + settings.CONDITIONAL_VERSION_TTL + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            response = self.client.get('/api/candidates/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_results_checks_permission_first(self):
+        """Test that results are private, and a vote changes their ETag."""
+        self.client.force_authenticate(user=self.admin)
+        etag = self.client.get('/api/votes/results/')['ETag']
+        self.assertEqual(
+            self.client.get('/api/votes/results/', HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        
+        voter = User.objects.create_user(email='voter@example.com', password='testpass123', name='Voter')
+        self.client.force_authenticate(user=voter)
+        response = self.client.get('/api/votes/results/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.post(f'/api/votes/{self.candidate.id}/')
+        
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/votes/results/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+    
+    def test_statistics(self):
+        """Test statistics revalidation; each window is its own representation."""
+        etag = self.client.get('/api/votes/statistics/')['ETag']
+        response = self.client.get('/api/votes/statistics/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get('/api/votes/statistics/?window=6h', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class QueryPlanTest(TestCase):
+    """Test that the hot vote and user queries are served by an index."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            name='Admin'
+        )
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        self.voter = User.objects.create_user(
+            email='voter@example.com',
+            password='testpass123',
+            name='Voter'
+        )
+        for i in range(3):
+            user = User.objects.create_user(
+                email=f'voter{i}@example.com',
+                password='testpass123',
+                name=f'Voter {i}'
+            )
+            Vote.objects.create(user=user, candidate=self.candidate)
+    
+    def assertNoFullScans(self, method, url, user, data=None):
+        self.client.force_authenticate(user=user)
+        with capture_plans() as plans:
+            response = getattr(self.client, method)(url, data)
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 500)
+        self.assertTrue(len(plans))
+        self.assertEqual(plans.full_scans(), [])
+        return response
+    
+    def test_harness_reports_full_scans(self):
+        with capture_plans() as plans:
+            list(User.objects.filter(name='Voter').order_by())
+        self.assertEqual([table for _, table in plans.full_scans()], ['users'])
+    
+    def test_cast_vote(self):
+        self.assertNoFullScans('post', f'/api/votes/{self.candidate.id}/', self.voter)
+    
+    @override_settings(VOTED_INDEX_SYNC_INTERVAL=60)
+    def test_has_voted(self):
+        voted_index._index = None
+        voted_index.get_voted_index().sync(force=True)
+        self.client.force_authenticate(user=self.voter)
+        with self.assertNumQueries(0):
+            self.client.get('/api/votes/has_voted/')
+    
+    def test_vote_listings(self):
+        first = self.assertNoFullScans('get', '/api/votes/', self.admin, {'page_size': 2})
+        self.assertNoFullScans('get', first.data['next'], self.admin)
+        self.assertNoFullScans('get', '/api/votes/voters/', self.admin, {'page_size': 2})
+    
+    def test_export_range(self):
+        since = (timezone.now() - timedelta(hours=1)).isoformat()
+        self.assertNoFullScans('get', '/api/votes/export/', self.admin, {'since': since})
+    
+    def test_user_token_lookups(self):
+        self.voter.reset_token = 'reset-token'
+        self.voter.reset_token_expires = timezone.now() + timedelta(hours=1)
+        self.voter.verification_token = 'verify-token'
+        self.voter.save()
+        self.assertNoFullScans('post', '/api/users/verify-email/', None, {'token': 'verify-token'})
+        self.assertNoFullScans('post', '/api/users/reset-password/', None, {
+            'token': 'reset-token', 'new_password': 'NewPass123!', 'confirm_password': 'NewPass123!'
+        })
+    
+    def test_list_users(self):
+        self.assertNoFullScans('get', '/api/users/', self.admin, {'page_size': 2})
+
+
+class VoteAdmissionTest(TestCase):
+    """Test the throttle and concurrency limit in front of create_vote."""
+    
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.candidate = Candidate.objects.create(
+            name='Candidate', linkedin_url='https://www.linkedin.com/in/c/', team_id=1
+        )
+        self.voters = [
+            User.objects.create_user(email=f'voter{i}@example.com', password='testpass123', name=f'Voter {i}')
+            for i in range(4)
+        ]
+    
+    @override_settings(RATE_LIMITS={'vote.user': '2/min', 'vote.ip': '3/min'})
+    def test_retry_storm_throttled(self):
+        """Test that a retrying user, then the whole IP, get 429s without reaching the view."""
+        self.client.force_authenticate(user=self.voters[0])
+        codes = [self.client.post(f'/api/votes/{self.candidate.id}/').status_code for _ in range(3)]
+        self.assertEqual(codes, [201, 400, 429])
+        
+        self.client.force_authenticate(user=self.voters[1])
+        self.assertEqual(self.client.post(f'/api/votes/{self.candidate.id}/').status_code, 201)
+        self.client.force_authenticate(user=self.voters[2])
+        with self.assertNumQueries(0):
+            response = self.client.post(f'/api/votes/{self.candidate.id}/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual((counters['ratelimit.vote.user.rejected'], counters['ratelimit.vote.ip.rejected']), (1, 1))
+    
+    @override_settings(CONCURRENCY_LIMITS={'vote': 2})
+    @mock.patch('voting_platform.ratelimit.time.time', return_value=1000.0)
+    def test_saturated_limit_answers_503_fast(self, _):
+        """Test that with every slot taken a vote is refused at once, without retrying."""
+        limiter = ConcurrencyLimiter('vote', 2, 30)
+        leases = [limiter.acquire(), limiter.acquire()]
+        self.assertIsNone(limiter.acquire())
+        
+        self.client.force_authenticate(user=self.voters[0])
+        with mock.patch.object(cache, 'incr', wraps=cache.incr) as incr:
+            response = self.client.post(f'/api/votes/{self.candidate.id}/')
+        # One increment to claim a slot, one (through decr) to give it back
+        slot_calls = [c for c in incr.call_args_list if c.args[0].startswith('concurrency:')]
+        self.assertEqual(len(slot_calls), 2)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Vote.objects.exists())
+        
+        limiter.release(leases.pop())
+        response = self.client.post(f'/api/votes/{self.candidate.id}/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The request returned its slot
+        self.assertIsNotNone(limiter.acquire())
+    
+    def test_holders_counted_across_windows(self):
+        """Test that a holder from the previous window still counts, and a leaked count expires."""
+        limiter = ConcurrencyLimiter('test', 1, 30)
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1000.0):
+            held = limiter.acquire()
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1025.0):
+            self.assertIsNone(limiter.acquire())
+            limiter.release(held)
+            current = limiter.acquire()
+            self.assertIsNotNone(current)
+        # ``current`` is never released, as if its worker crashed
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1055.0):
+            self.assertIsNone(limiter.acquire())
+        with mock.patch('voting_platform.ratelimit.time.time', return_value=1085.0):
+            self.assertIsNotNone(limiter.acquire())
+
 
+class IdempotencyKeyTest(TestCase):
+    """Test Idempotency-Key handling on create_vote."""
+    
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='voter@example.com', password='testpass123', name='Voter')
+        self.candidate = Candidate.objects.create(
+            name='Candidate', linkedin_url='https://www.linkedin.com/in/c/', team_id=1
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def vote(self, key, data=None):
+        return self.client.post(f'/api/votes/{self.candidate.id}/', data or {}, HTTP_IDEMPOTENCY_KEY=key)
+    
+    def test_replay_returns_original_receipt(self):
+        """Test that a retried vote gets the original 201 without touching votes."""
+        first = self.vote('attempt-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        
+        with self.assertNumQueries(0):
+            replay = self.vote('attempt-1')
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Vote.objects.count(), 1)
+        
+        # A different key is a different request: the user has voted already
+        self.assertEqual(self.vote('attempt-2').status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(RATE_LIMITS={'vote.user': '2/min', 'vote.ip': ''})
+    def test_replays_not_throttled(self):
+        """Test that retries past the vote limit still get the stored receipt, and cost no tokens."""
+        first = self.vote('attempt-1')
+        for _ in range(4):
+            replay = self.vote('attempt-1')
+            self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(replay.data, first.data)
+        
+        self.assertEqual(self.vote('attempt-2').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.vote('attempt-3').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(metrics.snapshot()['counters']['ratelimit.vote.replay'], 4)
+    
+    def test_key_is_scoped_to_user(self):
+        """Test that another user's request with the same key is not answered from the store."""
+        self.vote('shared-key')
+        other = User.objects.create_user(email='other@example.com', password='testpass123', name='Other')
+        self.client.force_authenticate(user=other)
+        response = self.vote('shared-key')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Vote.objects.count(), 2)
+    
+    def test_mismatched_body_and_in_progress(self):
+        """Test that reuse with another body gets 422 and a concurrent duplicate gets 409."""
+        duplicates = []
+        
+        def cast_during_duplicate(*args):
+            duplicates.append(self.vote('attempt-1'))
+            return Vote.objects.create(user=self.user, candidate=self.candidate)
+        
+        with mock.patch('votes.views.Vote.objects.cast', side_effect=cast_during_duplicate):
+            self.assertEqual(self.vote('attempt-1').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(duplicates[0].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.vote('attempt-1', {'note': 'x'}).status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+    
+    def test_server_error_not_stored(self):
+        """Test that a failed attempt can be retried with the same key."""
+        with mock.patch('votes.views.Vote.objects.cast', side_effect=RuntimeError('database went away')):
+            with self.assertRaises(RuntimeError):
+                self.vote('attempt-1')
+        self.assertEqual(self.vote('attempt-1').status_code, status.HTTP_201_CREATED)
+
+
+class SerializedCastTest(TransactionTestCase):
+    """Test ballot casting through the SQLite writer thread."""
+    
+    def setUp(self):
+        self.candidate = Candidate.objects.create(
+            name='Test Candidate',
+            linkedin_url='https://www.linkedin.com/in/test/',
+            team_id=1
+        )
+        self.users = [
+            User.objects.create_user(email=f'voter{n}@example.com', password='testpass123', name=f'Voter {n}')
+            for n in range(8)
+        ]
+    
+    def test_concurrent_casts_all_recorded(self):
+        """Test that simultaneous casts from many threads are all written, once each."""
+        results, errors = [], []
+        
+        def cast(user):
+            try:
+                results.append(Vote.objects.cast(user, self.candidate.id))
+                results.append(Vote.objects.cast(user, self.candidate.id))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=cast, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(vote is not None for vote in results), len(self.users))
+        self.assertEqual(Vote.objects.count(), len(self.users))
+        self.assertEqual(
+            CandidateTally.objects.filter(candidate=self.candidate).aggregate(total=Sum('count'))['total'],
+            len(self.users)
+        )
+        self.assertFalse(User.objects.filter(has_voted=False).exists())
@@ -2,15 +2,20 @@
 URL configuration for votes app.
 """
 from django.urls import path
-from . import views
+from . import views, streams
 
 urlpatterns = [
     path('', views.list_votes, name='list-votes'),
     path('<int:candidate_id>/', views.create_vote, name='create-vote'),
     path('has_voted/', views.has_voted, name='has-voted'),
     path('results/', views.results, name='results'),
+    path('results/stream/', streams.results_stream, name='results-stream'),
+    path('results/stream/ticket/', streams.results_stream_ticket, name='results-stream-ticket'),
     path('voters/', views.voters_list, name='voters-list'),
     path('statistics/', views.vote_statistics, name='vote-statistics'),
+    path('statistics/stream/', streams.statistics_stream, name='vote-statistics-stream'),
     path('reset/', views.reset_votes, name='reset-votes'),
+    path('reset/<int:job_id>/', views.reset_progress, name='reset-progress'),
+    path('export/', views.export_votes, name='export-votes'),
 ]
 
@@ -1,66 +1,103 @@
 """
 Views for Vote model.
 """
-from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+import json
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
-from django.db import IntegrityError
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
-from .models import Vote
-from .serializers import VoteSerializer, VoterSerializer
+from .models import Vote, CandidateTally, VoteRollup, ResetJob, minute_bucket
+from . import export, reset, stats_cache
+from .export import EXPORT_FORMATS
+from .ingest import AlreadyQueued, BufferFull, buffered_ingest_enabled, get_vote_buffer
+from .voted_index import get_voted_index, token_claims_vote, voted_index_enabled
+from .serializers import VoteSerializer, VoteReceiptSerializer, VoterSerializer, ResetJobSerializer
 from candidates.models import Candidate
+from voting_platform.conditional import conditional, versions
+from voting_platform.idempotency import idempotent
+from voting_platform.pagination import KeysetPagination
+from voting_platform.ratelimit import VoteThrottle, concurrency_limited
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([VoteThrottle])
+@idempotent
+@concurrency_limited('vote')
 def create_vote(request, candidate_id):
     """
     Create a vote for a candidate.
-    Enforces one vote per user using OneToOneField.
+    Enforces one vote per user using the OneToOneField unique constraint.
     """
     user = request.user
     
-    # Check if user has already voted
+    # Already-loaded flag, costs no query
     if user.has_voted:
         return Response(
             {'error': 'You have already voted. Each user can vote only once.'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Check if vote already exists (shouldn't happen due to OneToOneField, but check anyway)
-    if hasattr(user, 'vote'):
+    if buffered_ingest_enabled():
+        return _queue_vote(user, candidate_id)
+    
+    try:
+        vote = Vote.objects.cast(user, candidate_id)
+    except Candidate.DoesNotExist:
+        return Response(
+            {'error': 'Candidate not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if vote is None:
         return Response(
             {'error': 'You have already voted. Each user can vote only once.'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Validate candidate exists
-    try:
-        candidate = Candidate.objects.get(id=candidate_id)
-    except Candidate.DoesNotExist:
+    stats_cache.bump_version()
+    if voted_index_enabled():
+        get_voted_index().add(user.pk)
+    serializer = VoteReceiptSerializer(vote)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def _queue_vote(user, candidate_id):
+    """Hand the ballot to the write-behind buffer and acknowledge it."""
+    buffer = get_vote_buffer()
+    
+    if not buffer.candidate_exists(candidate_id):
         return Response(
             {'error': 'Candidate not found.'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Create vote
     try:
-        vote = Vote.objects.create(user=user, candidate=candidate)
-        serializer = VoteSerializer(vote)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    except IntegrityError:
+        ballot = buffer.submit(user.pk, candidate_id)
+    except AlreadyQueued:
         return Response(
             {'error': 'You have already voted. Each user can vote only once.'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    except Exception as e:
+    except BufferFull:
         return Response(
-            {'error': str(e)},
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': 'Too many votes are being processed. Please retry shortly.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
         )
+    
+    return Response({
+        'status': 'queued',
+        'candidate_id': ballot['candidate_id'],
+        'created_at': ballot['created_at'],
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 @api_view(['GET'])
@@ -68,21 +105,35 @@ def create_vote(request, candidate_id):
 def has_voted(request):
     """
     Check if the current user has already voted.
+    Answers from the loaded user row, a token claim or the in-process voted index.
     """
     user = request.user
-    has_voted = hasattr(user, 'vote') or user.has_voted
+    has_voted = user.has_voted or token_claims_vote(request.auth)
+    if not has_voted:
+        if voted_index_enabled():
+            has_voted = user.pk in get_voted_index()
+        else:
+            has_voted = hasattr(user, 'vote')
+    if not has_voted and buffered_ingest_enabled():
+        has_voted = get_vote_buffer().is_pending(user.pk)
     return Response({'has_voted': has_voted}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@conditional(versions('candidates', 'votes'), private=True, stale_while_revalidate=5)
 def results(request):
     """
     ADMIN-ONLY: Get election results with vote counts for each candidate.
     Results are hidden from regular voters following real-world voting standards.
     """
+    return Response(_compute_results(), status=status.HTTP_200_OK)
+
+
+def _compute_results():
+    """Per-candidate vote counts from the tally table."""
     candidates = Candidate.objects.annotate(
-        vote_count=Count('votes')
+        vote_count=Coalesce(Sum('tallies__count'), 0)
     ).order_by('-vote_count')
     
     results_data = []
@@ -93,8 +144,7 @@ def results(request):
             'description': candidate.description or '',
             'vote_count': candidate.vote_count,
         })
-    
-    return Response(results_data, status=status.HTTP_200_OK)
+    return results_data
 
 
 @api_view(['GET'])
@@ -103,8 +153,18 @@ def voters_list(request):
     """
     Get list of all voters with their LinkedIn profiles.
     Public endpoint (authenticated users can view).
+    Pass ?stream=1 to stream the JSON array in constant memory.
     """
-    votes = Vote.objects.select_related('user', 'candidate').all()
+    if request.query_params.get('stream') in ('1', 'true'):
+        return StreamingHttpResponse(_stream_voters(), content_type='application/json')
+    
+    paginator = KeysetPagination()
+    votes = paginator.paginate_queryset(
+        Vote.objects.select_related('user').only(
+            'id', 'created_at', 'user__id', 'user__name', 'user__linkedin_url'
+        ),
+        request
+    )
     
     voters_data = []
     for vote in votes:
@@ -116,23 +176,77 @@ def voters_list(request):
         })
     
     serializer = VoterSerializer(voters_data, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginator.get_paginated_response(serializer.data)
+
+
+def _stream_voters():
+    """Yield the voters list as a JSON array, one database chunk at a time."""
+    chunk_size = settings.VOTERS_STREAM_CHUNK_SIZE
+    voted_at = serializers.DateTimeField()
+    rows = Vote.objects.values_list(
+        'user_id', 'user__name', 'user__linkedin_url', 'created_at'
+    ).iterator(chunk_size=chunk_size)
+    
+    yield '['
+    separator = ''
+    buffer = []
+    for user_id, name, linkedin_url, created_at in rows:
+        buffer.append(separator + json.dumps({
+            'id': str(user_id),
+            'name': name,
+            'linkedin_url': linkedin_url or '',
+            'voted_at': voted_at.to_representation(created_at),
+        }))
+        separator = ','
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    yield ''.join(buffer) + ']'
+
+
+def _statistics_stamp(request):
+    """Candidates and votes versions, plus the minute: trailing windows move with the clock."""
+    token, modified_at = versions('candidates', 'votes')(request)
+    minute = minute_bucket(timezone.now())
+    return f'{token}:{minute:%Y%m%d%H%M}', max(modified_at, int(minute.timestamp()))
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(_statistics_stamp, max_age=settings.STATISTICS_CACHE_TTL)
 def vote_statistics(request):
     """
     Get voting statistics including vote counts, percentages, and trends.
+    Pass ?window=<n>m|h|d (e.g. 90m, 6h, 30d) for counts over any trailing window.
     """
-    total_votes = Vote.objects.count()
+    window_param = request.query_params.get('window')
+    window = _parse_window(window_param) if window_param else None
+    if window_param and window is None:
+        return Response(
+            {'error': 'window must look like 90m, 6h or 30d.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Get vote counts per candidate
-    candidate_stats = Vote.objects.values(
+    data, cache_state = stats_cache.get_or_compute(
+        window_param.lower() if window else 'all',
+        lambda: _compute_statistics(window, window_param),
+    )
+    headers = {'X-Cache': cache_state.upper()}
+    if cache_state == 'stale':
+        # Older than the versions the ETag would name; do not let clients keep it
+        headers['Cache-Control'] = 'no-cache'
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+
+def _compute_statistics(window=None, window_param=None):
+    """Build the statistics payload from the tally and rollup tables."""
+    # Get vote counts per candidate from the tally table
+    candidate_stats = list(CandidateTally.objects.values(
         'candidate__id', 'candidate__name', 'candidate__team_id'
     ).annotate(
-        vote_count=Count('id')
-    ).order_by('-vote_count')
+        vote_count=Sum('count')
+    ).filter(vote_count__gt=0).order_by('-vote_count'))
+    total_votes = sum(stat['vote_count'] for stat in candidate_stats)
     
     # Calculate percentages
     stats_data = []
@@ -146,26 +260,53 @@ def vote_statistics(request):
             'percentage': round(percentage, 2),
         })
     
-    # Get votes by time (last 24 hours, last week, etc.)
-    now = timezone.now()
-    last_24h = Vote.objects.filter(created_at__gte=now - timedelta(hours=24)).count()
-    last_week = Vote.objects.filter(created_at__gte=now - timedelta(days=7)).count()
+    # Get votes by time (last 24 hours, last week, etc.) from the minute rollups
+    recent_votes = VoteRollup.objects.window_totals(
+        last_24_hours=timedelta(hours=24),
+        last_7_days=timedelta(days=7),
+    )
     
     # Get votes by auth provider
-    votes_by_provider = Vote.objects.values('user__auth_provider').annotate(
-        count=Count('id')
-    )
+    votes_by_provider = VoteRollup.objects.values(
+        user__auth_provider=F('auth_provider')
+    ).annotate(count=Sum('count')).order_by()
     
-    return Response({
+    data = {
         'total_votes': total_votes,
         'candidates_by_votes': stats_data,
         'candidate_statistics': stats_data,
-        'recent_votes': {
-            'last_24_hours': last_24h,
-            'last_7_days': last_week,
-        },
+        'recent_votes': recent_votes,
         'votes_by_auth_provider': list(votes_by_provider),
-    }, status=status.HTTP_200_OK)
+    }
+    
+    if window is not None:
+        rollups = VoteRollup.objects.since(timezone.now() - window)
+        by_candidate = rollups.values('candidate_id').annotate(
+            vote_count=Sum('count')
+        ).order_by('-vote_count')
+        data['window'] = {
+            'duration': window_param,
+            'total_votes': sum(row['vote_count'] for row in by_candidate),
+            'candidates': [
+                {'id': row['candidate_id'], 'vote_count': row['vote_count']}
+                for row in by_candidate
+            ],
+        }
+    
+    return data
+
+
+WINDOW_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+MAX_WINDOW = timedelta(days=366)
+
+
+def _parse_window(value):
+    """Parse a trailing window such as '90m', '6h' or '30d' into a timedelta."""
+    amount, unit = value[:-1], value[-1:].lower()
+    if unit not in WINDOW_UNITS or not amount.isdigit() or int(amount) == 0:
+        return None
+    window = timedelta(**{WINDOW_UNITS[unit]: int(amount)})
+    return window if window <= MAX_WINDOW else None
 
 
 @api_view(['GET'])
@@ -178,31 +319,103 @@ def list_votes(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    votes = Vote.objects.select_related('user', 'candidate').all().order_by('-created_at')
+    paginator = KeysetPagination()
+    votes = paginator.paginate_queryset(
+        Vote.objects.select_related('user', 'candidate'), request
+    )
     serializer = VoteSerializer(votes, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def reset_votes(request):
-    """Reset all votes - admin only."""
+    """
+    Reset all votes - admin only.
+    Queues a job for the reset worker and returns 202 with its id; poll reset/<job_id>/ for progress.
+    """
     if not request.user.is_staff:
         return Response(
             {'error': 'Admin privileges required'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Delete all votes
-    count = Vote.objects.count()
-    Vote.objects.all().delete()
+    # Commit ballots still waiting in this process's buffer before wiping
+    if buffered_ingest_enabled():
+        get_vote_buffer().drain()
     
-    # Reset has_voted status for all users
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    User.objects.all().update(has_voted=False)
+    try:
+        job = reset.start_reset(requested_by=request.user)
+    except reset.ResetInProgress as exc:
+        return Response({
+            'error': 'A vote reset is already in progress',
+            **ResetJobSerializer(exc.job).data
+        }, status=status.HTTP_409_CONFLICT)
     
     return Response({
-        'message': f'Successfully reset {count} votes'
-    }, status=status.HTTP_200_OK)
+        'message': f'Vote reset {job.pk} started',
+        **ResetJobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reset_progress(request, job_id):
+    """Status and progress of a vote reset job - admin only."""
+    if not request.user.is_staff:
+        return Response(
+            {'error': 'Admin privileges required'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        job = ResetJob.objects.get(pk=job_id)
+    except ResetJob.DoesNotExist:
+        return Response(
+            {'error': 'Reset job not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(ResetJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_votes(request):
+    """
+    Export the full ballot log - admin only.
+    Query params: output=csv|ndjson, gzip=1, since/until=<ISO datetime>.
+    """
+    if not request.user.is_staff:
+        return Response(
+            {'error': 'Admin privileges required'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    output = request.query_params.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'output must be one of: {", ".join(EXPORT_FORMATS)}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    bounds = {}
+    for name in ('since', 'until'):
+        value = request.query_params.get(name)
+        if value:
+            bounds[name] = parse_datetime(value)
+            if bounds[name] is None:
+                return Response(
+                    {'error': f'{name} must be an ISO 8601 datetime.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+    
+    compress = request.query_params.get('gzip') in ('1', 'true')
+    filename = f'votes.{output}' + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        export.export(output, compress, **bounds),
+        content_type='application/gzip' if compress else (
+            'text/csv' if output == 'csv' else 'application/x-ndjson'
+        )
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,222 @@
+"""
+In-process index of the users who have voted, so has_voted answers from memory.
+
+Users are keyed by the high 64 bits of their UUID (random for uuid4, so two
+voters sharing a key is vanishingly unlikely; a collision could only make
+has_voted report a ballot that create_vote would still accept). The keys live
+in a sorted ``array('Q')``, eight bytes per voter, with a Bloom filter in front
+that answers most "has not voted" lookups without a binary search. Recent
+inserts sit in a small set until they are merged into the array.
+
+Each gunicorn worker builds the index as it starts (post_worker_init), and
+any other process builds it on first use. It then follows the votes table by
+primary key: every VOTED_INDEX_SYNC_INTERVAL seconds a lookup reads the votes
+newer than the highest id it has seen, less VOTED_INDEX_SYNC_OVERLAP ids. Ids
+are handed out before commit, so on Postgres a lower id can become visible
+after a higher one; the overlap re-reads that window so a late commit is not
+skipped. create_vote adds its ballot straight away. reset_votes bumps a
+generation token in the shared cache, and every process rebuilds when it sees
+the token change.
+"""
+import bisect
+import hashlib
+import heapq
+import math
+import threading
+import time
+import uuid
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from voting_platform import metrics
+from .models import Vote
+
+GENERATION_KEY = 'votes:voted-index:generation'
+
+MERGE_THRESHOLD = 1024
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+BLOOM_MIN_CAPACITY = 1024
+
+
+def user_key(user_id):
+    """The 64-bit key for a user UUID (or its string form)."""
+    if not isinstance(user_id, uuid.UUID):
+        user_id = uuid.UUID(str(user_id))
+    return user_id.int >> 64
+
+
+def current_generation():
+    """Return the voted-index generation token, creating one if the cache has none."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Make every process rebuild its index on its next sync (after a reset)."""
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit keys."""
+
+    def __init__(self, capacity, error_rate=BLOOM_FALSE_POSITIVE_RATE):
+        self.capacity = max(capacity, BLOOM_MIN_CAPACITY)
+        bits = math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.size = bits
+        self.hashes = max(1, round(bits / self.capacity * math.log(2)))
+        self.bits = bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.to_bytes(8, 'little'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class VotedIndex:
+    """Membership set of voted users for this process."""
+
+    def __init__(self, sync_interval, overlap=0):
+        self.sync_interval = sync_interval
+        self.overlap = overlap
+        self._lock = threading.Lock()
+        self._keys = array('Q')
+        self._recent = set()
+        self._bloom = BloomFilter(0)
+        self._high_water = 0
+        self._generation = None
+        self._synced_at = None
+
+    def __len__(self):
+        return len(self._keys) + len(self._recent)
+
+    def __contains__(self, user_id):
+        """True if the user has voted, as of the last sync or local insert."""
+        self.sync()
+        key = user_key(user_id)
+        if key not in self._bloom:
+            metrics.increment('voted_index.bloom_negative')
+            return False
+        return self._has_key(key)
+
+    def add(self, user_id):
+        """Record a ballot cast by this process."""
+        with self._lock:
+            self._add_key(user_key(user_id))
+
+    def sync(self, force=False):
+        """Pick up ballots cast elsewhere, or rebuild after a reset, at most once per interval."""
+        now = time.monotonic()
+        if not force and self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if not force and self._synced_at is not None and now - self._synced_at < self.sync_interval:
+                return
+            generation = current_generation()
+            if generation != self._generation:
+                self._rebuild(generation)
+            else:
+                since = max(self._high_water - self.overlap, 0)
+                newer = Vote.objects.filter(id__gt=since).order_by('id').values_list('id', 'user_id')
+                for vote_id, user_id in newer:
+                    self._add_key(user_key(user_id))
+                    self._high_water = max(self._high_water, vote_id)
+                metrics.increment('voted_index.sync')
+            self._synced_at = time.monotonic()
+
+    def invalidate(self):
+        """Drop this process's index and make every other process rebuild too."""
+        bump_generation()
+        with self._lock:
+            self._synced_at = None
+
+    def _rebuild(self, generation):
+        keys = array('Q')
+        high_water = 0
+        for vote_id, user_id in Vote.objects.order_by('id').values_list('id', 'user_id').iterator(chunk_size=10000):
+            keys.append(user_key(user_id))
+            high_water = vote_id
+        keys = array('Q', sorted(keys))
+        bloom = BloomFilter(len(keys) * 2)
+        for key in keys:
+            bloom.add(key)
+        self._keys, self._recent, self._bloom = keys, set(), bloom
+        self._high_water, self._generation = high_water, generation
+        metrics.increment('voted_index.rebuild')
+
+    def _has_key(self, key):
+        if key in self._recent:
+            return True
+        keys = self._keys
+        position = bisect.bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def _add_key(self, key):
+        if self._has_key(key):
+            return
+        if len(self) >= self._bloom.capacity:
+            # Grow the filter before it saturates
+            self._merge()
+            bloom = BloomFilter(len(self._keys) * 2)
+            for existing in self._keys:
+                bloom.add(existing)
+            self._bloom = bloom
+        self._bloom.add(key)
+        self._recent.add(key)
+        if len(self._recent) >= MERGE_THRESHOLD:
+            self._merge()
+
+    def _merge(self):
+        if self._recent:
+            self._keys = array('Q', heapq.merge(self._keys, sorted(self._recent)))
+            self._recent = set()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_voted_index():
+    """The process-wide voted-user index."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VotedIndex(settings.VOTED_INDEX_SYNC_INTERVAL, settings.VOTED_INDEX_SYNC_OVERLAP)
+                metrics.register_gauge('voted_index.size', lambda: len(_index))
+    return _index
+
+
+def voted_index_enabled():
+    return settings.VOTED_INDEX_ENABLED
+
+
+def warm_voted_index():
+    """Build the index now, so the first has_voted lookup does not wait for it."""
+    if voted_index_enabled():
+        get_voted_index().sync(force=True)
+
+
+def add_token_claims(token, user):
+    """Record in ``token`` whether ``user`` has voted, valid until the next reset."""
+    token['has_voted'] = user.has_voted
+    token['voted_generation'] = current_generation()
+
+
+def token_claims_vote(token):
+    """True if ``token`` says its user voted and no reset happened since it was issued."""
+    if token is None or not token.get('has_voted'):
+        return False
+    return token.get('voted_generation') == current_generation()
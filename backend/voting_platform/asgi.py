@@ -0,0 +1,19 @@
+"""
+ASGI config for voting_platform project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn voting_platform.asgi:application``)
+to hold many concurrent live-tally streams per process. With OAUTH_ASYNC_VIEWS
+set, the OAuth logins also run as coroutines here (see users.async_views).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voting_platform.settings')
+
+application = get_asgi_application()
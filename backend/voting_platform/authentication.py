@@ -0,0 +1,184 @@
+"""
+JWT authentication that resolves users from an in-process cache.
+
+Stock JWTAuthentication loads the user row on every request. CachedJWTAuthentication
+keeps a bounded LRU of recently seen users (every column except the password
+hash) and rebuilds the model instance from it, so repeat requests skip the
+query. Entries expire after AUTH_USER_CACHE_TTL seconds. Saving a user evicts
+it (see users.signals), as do the bulk has_voted updates in the vote paths.
+
+Saves and vote resets also bump a generation token in the shared cache. Each
+process checks the token at most every AUTH_USER_CACHE_SYNC_INTERVAL seconds
+and drops all its entries when it has changed, so other workers see the change
+within that interval rather than after the TTL. Casting a vote does not bump
+it: a worker still holding has_voted=False only lets the cast path try, and
+the votes table's unique user turns the duplicate away.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import metrics
+
+GENERATION_KEY = 'auth:user-cache:generation'
+
+
+def current_generation():
+    """Return the user-cache generation token, creating one if the cache has none."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+class UserCache:
+    """Bounded LRU of user field values, each kept for at most ``ttl`` seconds."""
+
+    def __init__(self, max_size, ttl, sync_interval=0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._synced_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def field_names(self):
+        user_model = get_user_model()
+        names = [field.attname for field in user_model._meta.concrete_fields]
+        if not api_settings.CHECK_REVOKE_TOKEN:
+            names.remove('password')
+        return names
+
+    def sync(self):
+        """Drop every entry if the shared generation moved, checking at most once per interval."""
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        generation = current_generation()
+        with self._lock:
+            if generation != self._generation:
+                if self._entries:
+                    self._entries.clear()
+                    metrics.increment('auth_user_cache.generation')
+                self._generation = generation
+            self._synced_at = now
+
+    def get(self, user_id):
+        """A fresh user instance for ``user_id``, or None on a miss."""
+        self.sync()
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.increment('auth_user_cache.miss')
+                return None
+            expires, field_names, values = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                metrics.increment('auth_user_cache.expired')
+                metrics.increment('auth_user_cache.miss')
+                return None
+            self._entries.move_to_end(key)
+        metrics.increment('auth_user_cache.hit')
+        return get_user_model().from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+    def put(self, user_id, user):
+        self.sync()
+        field_names = self.field_names()
+        values = tuple(getattr(user, name) for name in field_names)
+        with self._lock:
+            self._entries[str(user_id)] = (time.monotonic() + self.ttl, field_names, values)
+            self._entries.move_to_end(str(user_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                metrics.increment('auth_user_cache.eviction')
+
+    def forget(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(str(user_id), None) is not None:
+                    metrics.increment('auth_user_cache.invalidation')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        metrics.increment('auth_user_cache.clear')
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """The process-wide user cache."""
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache(
+                    settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL,
+                    settings.AUTH_USER_CACHE_SYNC_INTERVAL,
+                )
+                metrics.register_gauge('auth_user_cache.size', lambda: len(_user_cache))
+    return _user_cache
+
+
+def forget_users(*user_ids):
+    """Drop cached copies of these users, after writes that bypass User.save."""
+    if _user_cache is not None:
+        _user_cache.forget(user_ids)
+
+
+def forget_all_users():
+    if _user_cache is not None:
+        _user_cache.clear()
+
+
+def forget_users_everywhere():
+    """Make every process drop its cached users, after a change they must not serve stale."""
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+    forget_all_users()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves repeat users from the process-wide UserCache."""
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_USER_CACHE_SIZE:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user_cache = get_user_cache()
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.put(user_id, user)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+        return user
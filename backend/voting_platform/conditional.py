@@ -0,0 +1,109 @@
+"""
+Conditional GET support for read-mostly endpoints.
+
+Each cacheable resource has a version token in the shared cache, replaced
+whenever the underlying data changes (``bump_version('candidates')``).
+``conditional`` derives a strong ETag and a Last-Modified date from the versions
+a view depends on. When the client already holds that representation it
+answers 304 before the view runs, so no database query or serializer is
+involved.
+
+Tokens expire after CONDITIONAL_VERSION_TTL seconds and are then replaced
+with a new one. A change missed by a process, such as one made behind the
+ORM's back or recorded in a cache that process does not share, therefore
+stops being validated after at most that long.
+"""
+import functools
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = '{}:version'
+
+
+def current_version(name):
+    """Return ``(token, modified_at)`` for the named resource, creating it if the cache has none."""
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, (uuid.uuid4().hex, int(time.time())), settings.CONDITIONAL_VERSION_TTL)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """
+    Mark the named resource as changed.
+    Tokens are random so independent processes never reuse one for different data.
+    """
+    cache.set(VERSION_KEY.format(name), (uuid.uuid4().hex, int(time.time())), settings.CONDITIONAL_VERSION_TTL)
+
+
+def versions(*names):
+    """A stamp function for ``conditional`` covering the named resources."""
+    def stamp(request):
+        current = [current_version(name) for name in names]
+        return ':'.join(token for token, _ in current), max(modified for _, modified in current)
+    return stamp
+
+
+def conditional(stamp, max_age=0, stale_while_revalidate=30, private=False):
+    """
+    Decorate a view (below ``@permission_classes``, so access is checked first)
+    with ETag / Last-Modified validation.
+
+    ``stamp(request)`` returns ``(token, modified_at)``; the ETag also covers the
+    view, full path, host and Accept header, so every distinct representation gets
+    its own tag. Responses that already set Cache-Control are passed through
+    untouched, which lets a view opt out (e.g. when serving a stale snapshot).
+    """
+    cache_control = '{}, max-age={}, stale-while-revalidate={}'.format(
+        'private' if private else 'public', max_age, stale_while_revalidate
+    )
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            token, modified_at = stamp(request)
+            digest = hashlib.sha256('|'.join([
+                f'{view.__module__}.{view.__name__}',
+                token,
+                request.get_full_path(),
+                request.get_host(),
+                request.META.get('HTTP_ACCEPT', ''),
+            ]).encode()).hexdigest()[:32]
+            headers = {
+                'ETag': quote_etag(digest),
+                'Last-Modified': http_date(modified_at),
+                'Cache-Control': cache_control,
+            }
+
+            if _not_modified(request, headers['ETag'], modified_at):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK and not response.has_header('Cache-Control'):
+                for header, value in headers.items():
+                    response[header] = value
+            return response
+        return wrapped
+    return decorator
+
+
+def _not_modified(request, etag, modified_at):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # Weak comparison, as RFC 9110 prescribes for If-None-Match
+        tags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+        return '*' in tags or etag in tags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and modified_at <= if_modified_since
@@ -0,0 +1,201 @@
+"""
+In-process database connection pool.
+
+Each worker process keeps up to POOL['SIZE'] open connections and hands them
+to requests as they need them. It may open up to POOL['MAX_OVERFLOW'] extra
+connections under load, which are closed again on return. When all of them
+are checked out, a request waits up to POOL['TIMEOUT'] seconds before failing.
+Connections idle longer than POOL['PING_AFTER'] seconds are pinged before
+reuse, and any connection older than POOL['RECYCLE'] seconds is replaced.
+
+``PooledDatabaseWrapperMixin`` plugs the pool into a Django backend: opening
+the connection checks one out and closing it returns it. Pair it with
+CONN_MAX_AGE = 0 so every request hands its connection back. Usage is
+published per worker on the metrics endpoint as ``db.pool.<alias>.*``.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from voting_platform import metrics
+
+DEFAULTS = {'SIZE': 5, 'MAX_OVERFLOW': 10, 'TIMEOUT': 10, 'PING_AFTER': 30, 'RECYCLE': 3600}
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections; ``ping(conn)`` raises if one is unusable."""
+
+    def __init__(self, name, ping, size, max_overflow, timeout, ping_after, recycle):
+        self.name = name
+        self._ping = ping
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+        self._idle = deque()   # (connection, opened_at, returned_at)
+        self._opened = {}      # id(connection) -> opened_at, for connections out of the pool
+        self._total = 0
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+
+    def _check_fork(self):
+        # Sockets inherited from the parent belong to it; forget them without closing
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._opened.clear()
+            self._total = 0
+
+    def acquire(self, connect):
+        """
+        Check a connection out, waiting for one or opening one with ``connect()``
+        as needed; raises PoolTimeout.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            self._check_fork()
+            while not self._idle and self._total >= self.size + self.max_overflow:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.increment(f'db.pool.{self.name}.timeouts')
+                    raise PoolTimeout(
+                        f'No connection free in pool {self.name!r} after {self.timeout}s '
+                        f'({self.size} + {self.max_overflow} overflow in use)'
+                    )
+                metrics.increment(f'db.pool.{self.name}.waits')
+                self._condition.wait(remaining)
+            if self._idle:
+                connection, opened_at, returned_at = self._idle.pop()
+            else:
+                connection = opened_at = returned_at = None
+                self._total += 1
+
+        now = time.monotonic()
+        if connection is not None:
+            # A replaced connection hands its place in the count to the new one
+            if now - opened_at > self.recycle:
+                self._close(connection)
+                connection = None
+            elif now - returned_at > self.ping_after:
+                try:
+                    self._ping(connection)
+                except Exception:
+                    self._close(connection)
+                    connection = None
+
+        if connection is None:
+            try:
+                connection = connect()
+            except Exception:
+                with self._condition:
+                    self._total -= 1
+                    self._condition.notify()
+                raise
+            opened_at = now
+            metrics.increment(f'db.pool.{self.name}.opened')
+        with self._condition:
+            self._opened[id(connection)] = opened_at
+        return connection
+
+    def release(self, connection, reusable=True):
+        """Return a checked-out connection; it is closed if unusable or beyond the pool size."""
+        with self._condition:
+            if self._pid != os.getpid():
+                return
+            opened_at = self._opened.pop(id(connection), None)
+            if opened_at is None:
+                return
+            if reusable and len(self._idle) < self.size:
+                self._idle.append((connection, opened_at, time.monotonic()))
+                self._condition.notify()
+                return
+        self._discard(connection)
+
+    def _discard(self, connection):
+        with self._condition:
+            self._total -= 1
+            self._condition.notify()
+        self._close(connection)
+
+    def _close(self, connection):
+        metrics.increment(f'db.pool.{self.name}.closed')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._condition:
+            idle = len(self._idle)
+            in_use = self._total - idle
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'in_use': in_use,
+                'idle': idle,
+                'overflow': max(0, self._total - self.size),
+                'saturation': round(in_use / (self.size + self.max_overflow), 3),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, ping):
+    """The process-wide pool for database ``alias``, built from its POOL settings."""
+    with _pools_lock:
+        if alias not in _pools:
+            options = {**DEFAULTS, **settings_dict.get('POOL', {})}
+            _pools[alias] = ConnectionPool(
+                alias, ping,
+                size=options['SIZE'],
+                max_overflow=options['MAX_OVERFLOW'],
+                timeout=options['TIMEOUT'],
+                ping_after=options['PING_AFTER'],
+                recycle=options['RECYCLE'],
+            )
+            metrics.register_gauge(f'db.pool.{alias}', _pools[alias].stats)
+        return _pools[alias]
+
+
+class PooledDatabaseWrapperMixin:
+    """Check connections out of a ConnectionPool instead of opening a new one each time."""
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict, self._ping_connection)
+        try:
+            return pool.acquire(lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params))
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    @staticmethod
+    def _ping_connection(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get(self.alias)
+        if pool is None:
+            return super()._close()
+        reusable = True
+        try:
+            # Never hand a connection on mid-transaction
+            if self.in_atomic_block or not self.autocommit:
+                self.connection.rollback()
+            if self.errors_occurred:
+                self._ping_connection(self.connection)
+        except Exception:
+            reusable = False
+        pool.release(self.connection, reusable=reusable)
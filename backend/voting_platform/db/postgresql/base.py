@@ -0,0 +1,11 @@
+"""
+PostgreSQL backend that draws connections from an in-process pool
+(see voting_platform.db.pool). Select it with DB_POOL=True.
+"""
+from django.db.backends.postgresql import base
+
+from voting_platform.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,27 @@
+"""
+SQLite backend tuned for many concurrent requests. Select it with
+SQLITE_TUNING=True (the default).
+
+Each new connection applies the PRAGMAS from its database settings. By
+default these switch the file to write-ahead logging, so readers keep
+reading the last committed state while a ballot is written. They also make
+a writer wait up to busy_timeout for the write lock instead of failing with
+"database is locked", relax fsync to once per checkpoint (synchronous=NORMAL
+is still crash-safe in WAL mode), and memory-map the file for reads.
+"""
+from django.db.backends.sqlite3 import base
+
+# Applied in this order; busy_timeout first so switching journal mode can wait
+PRAGMA_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict.get('PRAGMAS', {})
+        names = [name for name in PRAGMA_ORDER if name in pragmas]
+        names += [name for name in pragmas if name not in PRAGMA_ORDER]
+        for name in names:
+            conn.execute(f'PRAGMA {name} = {pragmas[name]}')
+        return conn
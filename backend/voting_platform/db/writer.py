@@ -0,0 +1,85 @@
+"""
+Serialized writes for SQLite.
+
+SQLite takes one writer at a time. When several request threads write at
+once, all but one wait on the file lock, and under enough load some give up
+with "database is locked". With SQLITE_SERIAL_WRITES on, ``serialized`` hands
+each write to a single thread per process, which runs them in arrival order
+on its own connection. The request thread waits for its write and gets back
+its result or exception. Only the worker processes then compete for the
+lock, and busy_timeout absorbs that. Under WAL, readers never wait for the
+writer either way.
+
+A write runs inline instead when the database is not SQLite, when the caller
+is already in a transaction (moving the write to another connection would
+break its atomicity), or when it is issued from the writer thread itself.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from voting_platform import metrics
+
+
+class SerialWriter:
+    """Run callables one at a time, in submission order, on a dedicated thread."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._thread_ident = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the writer thread and return its result."""
+        if threading.get_ident() == self._thread_ident:
+            return fn(*args, **kwargs)
+        with self._lock:
+            self._pending += 1
+        try:
+            return self._executor.submit(self._call, fn, args, kwargs).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _call(self, fn, args, kwargs):
+        self._thread_ident = threading.get_ident()
+        metrics.increment('db.writer.writes')
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # The writer thread keeps its connections between writes, within CONN_MAX_AGE
+            for connection in connections.all(initialized_only=True):
+                connection.close_if_unusable_or_obsolete()
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return this process's SerialWriter; a forked child gets its own."""
+    global _writer
+    if _writer is None or _writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = SerialWriter()
+                metrics.register_gauge('db.writer', _writer.stats)
+    return _writer
+
+
+def serialized(fn, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Call ``fn`` for a write to ``using``, through the writer thread when that applies."""
+    connection = connections[using]
+    if (not settings.SQLITE_SERIAL_WRITES or connection.vendor != 'sqlite'
+            or connection.in_atomic_block):
+        return fn(*args, **kwargs)
+    return get_writer().run(fn, *args, **kwargs)
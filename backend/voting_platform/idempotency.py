@@ -0,0 +1,110 @@
+"""
+Idempotency keys for unsafe requests.
+
+A client that may retry sends an ``Idempotency-Key`` header, the same value on
+every attempt. The first attempt claims the key in the shared cache and runs
+the view. Its response is then stored under the key for IDEMPOTENCY_KEY_TTL
+seconds. Later attempts get that stored response back, marked with
+``Idempotent-Replayed: true``, without the view running again.
+
+Keys are scoped to the user and path. Reusing a key with a different request
+body is answered with 422, and an attempt that arrives while the first is
+still running gets 409. Server errors are not stored, so a retry after one
+runs the view again.
+
+Throttles run before the view, so a throttle that sets ``replays_exempt``
+lets through requests whose key already has a record (see ``has_record``).
+A client retrying for its stored receipt then gets that receipt instead of a
+429, and a replay never runs the view, so it costs the limit nothing.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+KEY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+RECORD_KEY = 'idempotency:{}'
+IN_PROGRESS = 'in-progress'
+# Outcomes that another attempt could change are not stored
+NOT_STORED = (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def _error(message, code, **headers):
+    return Response({'error': message}, status=code, headers=headers or None)
+
+
+def _record_key(request, key):
+    user = request.user.pk if request.user and request.user.is_authenticated else ''
+    return RECORD_KEY.format(
+        hashlib.sha256(f'{user}|{request.method}|{request.get_full_path()}|{key}'.encode()).hexdigest()
+    )
+
+
+def has_record(request):
+    """Whether ``@idempotent`` will answer this request from its key's record without running the view."""
+    key = request.META.get(KEY_HEADER, '').strip()
+    return bool(key) and len(key) <= 255 and cache.get(_record_key(request, key)) is not None
+
+
+def idempotent(view):
+    """Decorate a view (below ``@throttle_classes``) to honour ``Idempotency-Key``."""
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = request.META.get(KEY_HEADER, '').strip()
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return _error('Idempotency-Key must be at most 255 characters.', status.HTTP_400_BAD_REQUEST)
+
+        record_key = _record_key(request, key)
+        fingerprint = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        if not cache.add(record_key, (IN_PROGRESS, fingerprint), settings.IDEMPOTENCY_LOCK_SECONDS):
+            record = cache.get(record_key)
+            if record is not None:
+                return _replay(record, fingerprint)
+            # The claim expired between the two calls; treat the key as new
+            cache.add(record_key, (IN_PROGRESS, fingerprint), settings.IDEMPOTENCY_LOCK_SECONDS)
+
+        stored = False
+        try:
+            response = view(request, *args, **kwargs)
+            if response.status_code < 500 and response.status_code not in NOT_STORED:
+                cache.set(
+                    record_key,
+                    ((response.status_code, response.data), fingerprint),
+                    settings.IDEMPOTENCY_KEY_TTL,
+                )
+                stored = True
+            return response
+        finally:
+            if not stored:
+                cache.delete(record_key)
+    return wrapped
+
+
+def _replay(record, fingerprint):
+    outcome, stored_fingerprint = record
+    if stored_fingerprint != fingerprint:
+        metrics.increment('idempotency.mismatch')
+        return _error(
+            'This Idempotency-Key was already used with a different request.',
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if outcome == IN_PROGRESS:
+        metrics.increment('idempotency.in_progress')
+        return _error(
+            'A request with this Idempotency-Key is still being processed.',
+            status.HTTP_409_CONFLICT, **{'Retry-After': '1'}
+        )
+    metrics.increment('idempotency.replayed')
+    status_code, data = outcome
+    return Response(data, status=status_code, headers={'Idempotent-Replayed': 'true'})
@@ -0,0 +1,46 @@
+"""
+In-process counters and gauges for the admin metrics endpoint.
+
+Values are per worker process; scrape each worker (or sum them) for totals.
+"""
+import os
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+
+
+def increment(name, amount=1):
+    """Add ``amount`` to the named counter."""
+    with _lock:
+        _counters[name] += amount
+
+
+def register_gauge(name, func):
+    """Register a callable whose return value is reported under ``name``."""
+    _gauges[name] = func
+
+
+def snapshot():
+    """Return the current counters and gauges for this process."""
+    with _lock:
+        counters = dict(_counters)
+    gauges = {}
+    for name, func in list(_gauges.items()):
+        try:
+            gauges[name] = func()
+        except Exception as e:
+            gauges[name] = f'error: {e}'
+    return {
+        'pid': os.getpid(),
+        'counters': counters,
+        'gauges': gauges,
+    }
+
+
+def reset():
+    """Clear all counters (used by tests)."""
+    with _lock:
+        _counters.clear()
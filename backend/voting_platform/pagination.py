@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first pagination keyed on (created_at, primary key).
+
+    Each page is a range scan that starts at the cursor position, so a deep page
+    costs the same as the first one. It uses no OFFSET, and no COUNT(*) is run
+    for a total. Cursors are opaque base64 tokens returned as ``next`` and
+    ``previous`` URLs.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.pk_name = queryset.model._meta.pk.name
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by('-created_at', f'-{self.pk_name}')
+        else:
+            reverse, created_at, pk = cursor
+            try:
+                pk = queryset.model._meta.pk.to_python(pk)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            if reverse:
+                # Rows newer than the position, walked oldest-first
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) |
+                    Q(created_at=created_at, **{f'{self.pk_name}__gt': pk}),
+                    created_at__gte=created_at,
+                ).order_by('created_at', self.pk_name)
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) |
+                    Q(created_at=created_at, **{f'{self.pk_name}__lt': pk}),
+                    created_at__lte=created_at,
+                ).order_by('-created_at', f'-{self.pk_name}')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self.position(rows[-1])
+            if (has_more and reverse) or (cursor is not None and not reverse):
+                self.previous_position = self.position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_link(self.next_position, reverse=False)),
+            ('previous', self.get_link(self.previous_position, reverse=True)),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                page_size = min(requested, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return page_size
+
+    def position(self, row):
+        return (row.created_at.isoformat(), str(getattr(row, self.pk_name)))
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        token = json.dumps([int(reverse), position[0], position[1]])
+        encoded = base64.urlsafe_b64encode(token.encode()).decode()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            reverse, created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(created_at)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), created_at, pk
@@ -0,0 +1,81 @@
+"""
+Query-plan checks for the hot request paths.
+
+``capture_plans`` records every query a block runs and asks the database to
+EXPLAIN each one. It works on SQLite (EXPLAIN QUERY PLAN) and PostgreSQL
+(EXPLAIN with sequential scans disabled, so a Seq Scan in the plan means no
+usable index rather than a tiny test table). Tests use ``full_scans`` to fail
+when a query on a hot table walks the whole table. Walking an index in order
+(``SCAN votes USING INDEX ...``) is allowed: the list endpoints do that under
+a LIMIT for their first page.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+HOT_TABLES = ('votes', 'users')
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$')
+
+
+class QueryPlans:
+    """The queries captured in a block, each with its EXPLAIN output."""
+
+    def __init__(self):
+        self.plans = []
+
+    def full_scans(self, tables=HOT_TABLES):
+        """Return ``(sql, table)`` for every full table scan of ``tables``."""
+        found = []
+        for sql, plan in self.plans:
+            for table in _scanned_tables(plan):
+                if table in tables:
+                    found.append((sql, table))
+        return found
+
+    def __len__(self):
+        return len(self.plans)
+
+
+def explain(sql):
+    """Return the plan for ``sql`` as a list of lines (SQLite) or nodes (PostgreSQL)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            return list(_walk_pg_plan(plan[0]['Plan']))
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _walk_pg_plan(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk_pg_plan(child)
+
+
+def _scanned_tables(plan):
+    for step in plan:
+        if isinstance(step, dict):
+            if step.get('Node Type') == 'Seq Scan':
+                yield step.get('Relation Name')
+        else:
+            match = SQLITE_FULL_SCAN.match(step)
+            if match:
+                yield match.group(1)
+
+
+@contextmanager
+def capture_plans():
+    """Capture the queries run inside the block and EXPLAIN each of them afterwards."""
+    plans = QueryPlans()
+    with CaptureQueriesContext(connection) as context:
+        yield plans
+    for query in context.captured_queries:
+        sql = query['sql']
+        if EXPLAINABLE.match(sql):
+            plans.plans.append((sql, explain(sql)))
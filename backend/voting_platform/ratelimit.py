@@ -0,0 +1,259 @@
+"""
+Sliding-window rate limiting.
+
+A limit of N per period lets a client burst N requests and then sustain the
+configured rate. Each key keeps one counter per fixed window of ``period``
+seconds in the shared cache, and a request counts what it used in the current
+window plus the previous window's count, weighted by how much of that window
+still overlaps the last ``period`` seconds. Counters are bumped with the
+cache's atomic ``incr`` and expire two windows later. No lock is held, so
+requests for different keys never wait on each other, and the count holds
+across processes that share the cache.
+
+Limits come from the RATE_LIMITS setting, keyed ``<scope>.<kind>`` (e.g.
+``login.ip``), in DRF's ``'<count>/<s|m|h|d>'`` format; an empty value turns
+a limit off. The throttles run in DRF's ``initial()``, so a rejected request
+costs three cache calls and never reaches password hashing or the database.
+
+``concurrency_limited`` caps how many requests run a view at once at
+CONCURRENCY_LIMITS[name], counted with an atomic counter in the cache. A
+request over the limit is answered at once with a 503 and Retry-After instead
+of queueing behind the others; the check costs two or three cache calls
+however busy the view is. A count left by a crashed worker expires within two
+CONCURRENCY_LEASE_SECONDS windows. Both limits hold node-wide when the cache
+backend is shared by the workers (memcached or Redis on localhost); the
+default LocMemCache makes them per process.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+from .idempotency import has_record
+
+WINDOW_KEY = 'ratelimit:{}:{}'
+COUNTER_KEY = 'concurrency:{}:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``: requests allowed and the period they are counted over."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip()[0]]
+
+
+def take(key, rate, cost=1):
+    """
+    Use ``cost`` requests from the limit ``key`` allows under ``rate``.
+    Returns 0 if they were available, otherwise the seconds until they will be.
+    """
+    capacity, period = parse_rate(rate)
+    elapsed, previous_key, window_key = windows(key, period)
+    previous = cache.get(previous_key, 0)
+    used = incr(window_key, cost, period * 2)
+    if previous * (1 - elapsed / period) + used <= capacity:
+        return 0
+    try:
+        cache.decr(window_key, cost)
+    except ValueError:
+        pass
+    return retry_after(capacity, period, elapsed, previous, used - cost, cost)
+
+
+def check(key, rate, cost=1):
+    """``take`` without using anything: 0 if ``cost`` more requests fit now, else the wait."""
+    capacity, period = parse_rate(rate)
+    elapsed, previous_key, window_key = windows(key, period)
+    counts = cache.get_many([previous_key, window_key])
+    previous, used = counts.get(previous_key, 0), counts.get(window_key, 0)
+    if previous * (1 - elapsed / period) + used + cost <= capacity:
+        return 0
+    return retry_after(capacity, period, elapsed, previous, used, cost)
+
+
+def windows(key, period):
+    """Seconds into the current window, and the previous and current window's counter keys."""
+    window, elapsed = divmod(time.time(), period)
+    return elapsed, WINDOW_KEY.format(key, int(window) - 1), WINDOW_KEY.format(key, int(window))
+
+
+def retry_after(capacity, period, elapsed, previous, used, cost):
+    """Seconds until ``cost`` more requests fit, given the previous and current window's counts."""
+    if cost > capacity:
+        return float(period)
+    excess = previous * (1 - elapsed / period) + used + cost - capacity
+    if previous and excess * period / previous <= period - elapsed:
+        # Enough of the previous window slides out before this one ends
+        return excess * period / previous
+    # Otherwise wait into the next window, where this window's count slides out
+    wait = period - elapsed
+    if used > capacity - cost:
+        wait += period * (1 - (capacity - cost) / used)
+    return wait
+
+
+def incr(key, delta, timeout):
+    """Atomically add ``delta`` to the counter ``key``, creating it with ``timeout``."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout)
+        return cache.incr(key, delta)
+
+
+def hashed(value):
+    """A fixed-length cache-safe identifier that does not store ``value`` itself."""
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+class RateLimitThrottle(BaseThrottle):
+    """
+    Check the ``<scope>.<kind>`` limit for each of ``kinds``, in order, and stop
+    at the first that is used up. Limits behind it are not drawn down, so
+    requests already rejected per IP cannot lock a victim's account.
+    """
+    scope = None
+    kinds = ('ip',)
+    # Kinds only checked here; the view charges them with ``record_failure``
+    failure_kinds = ()
+    # Let Idempotency-Key replays through; they return a stored response without running the view
+    replays_exempt = False
+
+    def identify(self, kind, request):
+        """The limit's identity for ``kind``, or None if this request has none."""
+        if kind == 'ip':
+            # Trusts X-Forwarded-For only as far as the NUM_PROXIES setting allows
+            return self.get_ident(request)
+        if kind == 'account':
+            email = request.data.get('email') if hasattr(request.data, 'get') else None
+            return hashed(email.strip().lower()) if isinstance(email, str) and email.strip() else None
+        if kind == 'account_ip':
+            account = self.identify('account', request)
+            return hashed(f'{account}|{self.get_ident(request)}') if account else None
+        if kind == 'user':
+            return str(request.user.pk) if request.user and request.user.is_authenticated else None
+        raise ValueError(f'Unknown rate limit kind: {kind}')
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if self.replays_exempt and has_record(request):
+            metrics.increment(f'ratelimit.{self.scope}.replay')
+            return True
+        for kind in self.kinds:
+            rate = settings.RATE_LIMITS.get(f'{self.scope}.{kind}')
+            ident = self.identify(kind, request) if rate else None
+            if ident is None:
+                continue
+            key = f'{self.scope}.{kind}:{ident}'
+            wait = check(key, rate) if kind in self.failure_kinds else take(key, rate)
+            if wait:
+                self.retry_after = wait
+                metrics.increment(f'ratelimit.{self.scope}.{kind}.rejected')
+                return False
+        metrics.increment(f'ratelimit.{self.scope}.allowed')
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+    def record_failure(self, request):
+        """Charge ``failure_kinds`` for a request the view turned down."""
+        for kind in self.failure_kinds:
+            rate = settings.RATE_LIMITS.get(f'{self.scope}.{kind}')
+            ident = self.identify(kind, request) if rate else None
+            if ident is not None:
+                take(f'{self.scope}.{kind}:{ident}', rate)
+
+
+class LoginThrottle(RateLimitThrottle):
+    # Failed passwords per account and address: a guesser elsewhere cannot
+    # lock the owner out, and successful logins cost nothing
+    scope = 'login'
+    kinds = ('ip', 'account_ip')
+    failure_kinds = ('account_ip',)
+
+
+class SignupThrottle(RateLimitThrottle):
+    scope = 'signup'
+    kinds = ('ip',)
+
+
+class ForgotPasswordThrottle(RateLimitThrottle):
+    scope = 'forgot_password'
+    kinds = ('ip', 'account')
+
+
+class VoteThrottle(RateLimitThrottle):
+    # Per user first: one scripted account is stopped without using up its NAT's IP limit
+    scope = 'vote'
+    kinds = ('user', 'ip')
+    replays_exempt = True
+
+
+class ConcurrencyLimiter:
+    """
+    At most ``limit`` concurrent holders among all processes sharing the cache.
+    
+    Holders are counted in one cache counter per ``lease_seconds`` window. A
+    holder decrements the counter it incremented, and the previous window's
+    counter still counts, so a request that spans a window boundary is counted
+    until it releases. A count leaked by a crashed worker drops out after two
+    windows.
+    """
+
+    def __init__(self, name, limit, lease_seconds):
+        self.name = name
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+
+    def acquire(self):
+        """Take a slot if one is free; return a lease for ``release`` or None."""
+        window = int(time.time() // self.lease_seconds)
+        key = COUNTER_KEY.format(self.name, window)
+        running = incr(key, 1, self.lease_seconds * 2)
+        running += cache.get(COUNTER_KEY.format(self.name, window - 1), 0)
+        if running > self.limit:
+            self.release(key)
+            return None
+        return key
+
+    def release(self, lease):
+        try:
+            cache.decr(lease)
+        except ValueError:
+            # The window has expired, and its count with it
+            pass
+
+
+def concurrency_limited(name):
+    """
+    Decorate a view (below ``@throttle_classes``) to run at most
+    CONCURRENCY_LIMITS[name] requests at once; 0 or a missing entry disables it.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            limit = settings.CONCURRENCY_LIMITS.get(name)
+            if not limit:
+                return view(request, *args, **kwargs)
+            limiter = ConcurrencyLimiter(name, limit, settings.CONCURRENCY_LEASE_SECONDS)
+            lease = limiter.acquire()
+            if lease is None:
+                metrics.increment(f'concurrency.{name}.rejected')
+                return Response(
+                    {'error': 'The server is busy. Please retry shortly.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '1'}
+                )
+            metrics.increment(f'concurrency.{name}.admitted')
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                limiter.release(lease)
+        return wrapped
+    return decorator
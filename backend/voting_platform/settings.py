@@ -5,7 +5,9 @@ Django settings for voting_platform project.
 from pathlib import Path
 from datetime import timedelta
 import os
-from decouple import config
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -73,29 +75,72 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'voting_platform.wsgi.application'
+ASGI_APPLICATION = 'voting_platform.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE picks the backend. It defaults to the bundled SQLite file; set it
+# to 'postgresql' explicitly, a DB_HOST alone does not switch engines.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+# Connections persist for DB_CONN_MAX_AGE seconds, health-checked before reuse.
+# DB_POOL instead keeps an in-process pool per worker (voting_platform.db.pool):
+# DB_POOL_SIZE kept open, up to DB_POOL_MAX_OVERFLOW more under load, and a
+# request waits at most DB_POOL_TIMEOUT seconds for one before failing.
+# Under ASGI, Django advises DB_CONN_MAX_AGE=0; use DB_POOL or an external pooler.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
+# SQLITE_TUNING applies the SQLITE_* pragmas to every connection
+# (voting_platform.db.sqlite3): WAL so reads never wait on ballot writes, and a
+# busy timeout so writers queue for the lock instead of failing. With
+# SQLITE_SERIAL_WRITES, ballot writes go through one writer thread per process
+# (voting_platform.db.writer).
+SQLITE_TUNING = config('SQLITE_TUNING', default=True, cast=bool)
+SQLITE_SERIAL_WRITES = config('SQLITE_SERIAL_WRITES', default=True, cast=bool)
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'voting_platform.db.postgresql' if DB_POOL else 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='voting_platform'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Pooled connections go back to the pool at the end of each request
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int)},
+            'POOL': {
+                'SIZE': config('DB_POOL_SIZE', default=5, cast=int),
+                'MAX_OVERFLOW': config('DB_POOL_MAX_OVERFLOW', default=10, cast=int),
+                'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+                'PING_AFTER': config('DB_POOL_PING_AFTER', default=30, cast=int),
+                'RECYCLE': config('DB_POOL_RECYCLE', default=3600, cast=int),
+            },
+        }
     }
-}
-
-# Uncomment for PostgreSQL
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': config('DB_NAME', default='voting_platform'),
-#         'USER': config('DB_USER', default='postgres'),
-#         'PASSWORD': config('DB_PASSWORD', default=''),
-#         'HOST': config('DB_HOST', default='localhost'),
-#         'PORT': config('DB_PORT', default='5432'),
-#     }
-# }
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'voting_platform.db.sqlite3' if SQLITE_TUNING else 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'PRAGMAS': {
+                'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int),
+                'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+                'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+                'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'postgresql' or 'sqlite', not {DB_ENGINE!r}")
 
 
 # Password validation
@@ -149,14 +194,43 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'voting_platform.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'voting_platform.pagination.KeysetPagination',
     'PAGE_SIZE': 100,
+    # Reverse proxies in front of the app. Client IPs (for throttling) come from
+    # X-Forwarded-For only past this many hops; 0 uses REMOTE_ADDR, so a client
+    # cannot pick its own address.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
+}
+
+# Sliding-window limits per '<scope>.<kind>' (voting_platform.ratelimit), as
+# '<count>/<s|m|h|d>': <count> requests in any such period. Empty disables one.
+RATE_LIMITS = {
+    'login.ip': config('RATE_LIMIT_LOGIN_IP', default='60/min'),
+    # Failed logins for one account from one address
+    'login.account_ip': config('RATE_LIMIT_LOGIN_ACCOUNT_IP', default='10/hour'),
+    'signup.ip': config('RATE_LIMIT_SIGNUP_IP', default='20/hour'),
+    'forgot_password.ip': config('RATE_LIMIT_FORGOT_PASSWORD_IP', default='10/hour'),
+    'forgot_password.account': config('RATE_LIMIT_FORGOT_PASSWORD_ACCOUNT', default='3/hour'),
+    'vote.user': config('RATE_LIMIT_VOTE_USER', default='5/min'),
+    'vote.ip': config('RATE_LIMIT_VOTE_IP', default='300/min'),
+}
+
+# Requests allowed to run a view at once (0 disables; more are answered 503
+# at once), and the window after which a count left by a crashed worker expires
+CONCURRENCY_LIMITS = {
+    'vote': config('CONCURRENCY_LIMIT_VOTE', default=32, cast=int),
 }
+CONCURRENCY_LEASE_SECONDS = config('CONCURRENCY_LEASE_SECONDS', default=30, cast=int)
+
+# How long a response is replayed for its Idempotency-Key, and how long a
+# claimed key stays locked while its first request runs
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+IDEMPOTENCY_LOCK_SECONDS = config('IDEMPOTENCY_LOCK_SECONDS', default=30, cast=int)
 
 # JWT Settings
 SIMPLE_JWT = {
@@ -169,6 +243,13 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Users resolved by CachedJWTAuthentication are kept in a per-process LRU of
+# this many entries, for at most AUTH_USER_CACHE_TTL seconds (0 disables it)
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=30, cast=int)
+# How often each process checks the shared generation that saves and resets bump
+AUTH_USER_CACHE_SYNC_INTERVAL = config('AUTH_USER_CACHE_SYNC_INTERVAL', default=1.0, cast=float)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -176,6 +257,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Social Auth Settings
 AUTHENTICATION_BACKENDS = (
@@ -201,6 +283,29 @@ SOCIAL_AUTH_LINKEDIN_OAUTH2_EXTRA_DATA = [
     ('profilePicture', 'profile_picture'),
 ]
 
+# Provider endpoints, overridable so tests can point them at a local stand-in
+GOOGLE_OAUTH2_USERINFO_URL = config('GOOGLE_OAUTH2_USERINFO_URL', default='https://www.googleapis.com/oauth2/v3/userinfo')
+GOOGLE_OAUTH2_CERTS_URL = config('GOOGLE_OAUTH2_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
+# Least seconds between refetches of Google's certs forced by an unknown key id
+GOOGLE_CERTS_MIN_REFRESH_SECONDS = config('GOOGLE_CERTS_MIN_REFRESH_SECONDS', default=60, cast=int)
+LINKEDIN_OAUTH2_TOKEN_URL = config('LINKEDIN_OAUTH2_TOKEN_URL', default='https://www.linkedin.com/oauth/v2/accessToken')
+LINKEDIN_OAUTH2_USERINFO_URL = config('LINKEDIN_OAUTH2_USERINFO_URL', default='https://api.linkedin.com/v2/userinfo')
+
+# Outbound provider HTTP: pooled keep-alive session, timeouts, and a per-host
+# circuit breaker that fails fast after repeated failures
+OAUTH_HTTP_CONNECT_TIMEOUT = config('OAUTH_HTTP_CONNECT_TIMEOUT', default=3.05, cast=float)
+OAUTH_HTTP_READ_TIMEOUT = config('OAUTH_HTTP_READ_TIMEOUT', default=5.0, cast=float)
+OAUTH_HTTP_POOL_SIZE = config('OAUTH_HTTP_POOL_SIZE', default=10, cast=int)
+OAUTH_CIRCUIT_FAILURE_THRESHOLD = config('OAUTH_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+OAUTH_CIRCUIT_RESET_SECONDS = config('OAUTH_CIRCUIT_RESET_SECONDS', default=30, cast=int)
+
+# Route the OAuth logins to the async views; only worth it when served over ASGI
+OAUTH_ASYNC_VIEWS = config('OAUTH_ASYNC_VIEWS', default=False, cast=bool)
+OAUTH_ASYNC_MAX_CONNECTIONS = config('OAUTH_ASYNC_MAX_CONNECTIONS', default=100, cast=int)
+
+# Seconds a login token stays mapped to its user (never past the token's expiry)
+OAUTH_IDENTITY_CACHE_TTL = config('OAUTH_IDENTITY_CACHE_TTL', default=300, cast=int)
+
 SOCIAL_AUTH_PIPELINE = (
     'social_core.pipeline.social_auth.social_details',
     'social_core.pipeline.social_auth.social_uid',
@@ -229,4 +334,90 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@votingplatform.com')
-
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+
+# Email outbox (delivered by `manage.py run_mail_worker`): messages per batch,
+# attempts before dead-lettering, retry backoff, and how long a worker's claim lasts
+MAIL_OUTBOX_BATCH_SIZE = config('MAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+MAIL_OUTBOX_MAX_ATTEMPTS = config('MAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+MAIL_OUTBOX_RETRY_BASE_SECONDS = config('MAIL_OUTBOX_RETRY_BASE_SECONDS', default=30, cast=int)
+MAIL_OUTBOX_RETRY_MAX_SECONDS = config('MAIL_OUTBOX_RETRY_MAX_SECONDS', default=3600, cast=int)
+MAIL_OUTBOX_LEASE_SECONDS = config('MAIL_OUTBOX_LEASE_SECONDS', default=300, cast=int)
+MAIL_WORKER_POLL_INTERVAL = config('MAIL_WORKER_POLL_INTERVAL', default=2.0, cast=float)
+
+
+# Voting Configuration
+# Number of counter rows per candidate in the vote tally table
+VOTE_TALLY_SHARDS = config('VOTE_TALLY_SHARDS', default=8, cast=int)
+
+# Vote ingestion: 'direct' commits each ballot in the request, 'buffered'
+# logs it to a local write-ahead log and flushes to the database in batches
+VOTE_INGEST_MODE = config('VOTE_INGEST_MODE', default='direct')
+VOTE_INGEST_WAL_DIR = config('VOTE_INGEST_WAL_DIR', default=str(BASE_DIR / 'vote_wal'))
+VOTE_INGEST_MAX_PENDING = config('VOTE_INGEST_MAX_PENDING', default=10000, cast=int)
+VOTE_INGEST_BATCH_SIZE = config('VOTE_INGEST_BATCH_SIZE', default=500, cast=int)
+VOTE_INGEST_FLUSH_INTERVAL = config('VOTE_INGEST_FLUSH_INTERVAL', default=0.2, cast=float)
+
+# Cache
+# Throttles, idempotency keys, version stamps and concurrency leases live here,
+# so every worker process must see the same cache: use Redis or Memcached when
+# WEB_CONCURRENCY (the number of worker processes) is above 1. Readiness fails
+# for a per-process LocMemCache shared by more than one worker.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='voting-platform'),
+    }
+}
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+
+# Seconds an ETag version token lives before it is replaced, bounding how long
+# a change another process missed can still be answered with 304
+CONDITIONAL_VERSION_TTL = config('CONDITIONAL_VERSION_TTL', default=300, cast=int)
+
+# Seconds a statistics snapshot stays fresh, and how long one recompute may hold the lock
+STATISTICS_CACHE_TTL = config('STATISTICS_CACHE_TTL', default=2, cast=int)
+STATISTICS_CACHE_LOCK_TIMEOUT = config('STATISTICS_CACHE_LOCK_TIMEOUT', default=5, cast=int)
+
+# Live tally streams: per-process poll interval, heartbeat, and the longest a
+# snapshot may go unrefreshed (picks up votes cast in other worker processes)
+VOTE_STREAM_INTERVAL_MS = config('VOTE_STREAM_INTERVAL_MS', default=1000, cast=int)
+VOTE_STREAM_HEARTBEAT_SECONDS = config('VOTE_STREAM_HEARTBEAT_SECONDS', default=15, cast=int)
+VOTE_STREAM_MAX_STALENESS = config('VOTE_STREAM_MAX_STALENESS', default=5, cast=int)
+# Seconds a single-use results stream ticket stays valid
+VOTE_STREAM_TICKET_TTL = config('VOTE_STREAM_TICKET_TTL', default=30, cast=int)
+# Open streams per ASGI process; clients beyond it get 503 and poll instead
+VOTE_STREAM_MAX_CONNECTIONS = config('VOTE_STREAM_MAX_CONNECTIONS', default=1000, cast=int)
+
+# Rows fetched per round trip (and per written chunk) when streaming the voters list
+VOTERS_STREAM_CHUNK_SIZE = config('VOTERS_STREAM_CHUNK_SIZE', default=2000, cast=int)
+
+# Rows fetched per round trip (and per written chunk) by the vote audit export
+VOTE_EXPORT_CHUNK_SIZE = config('VOTE_EXPORT_CHUNK_SIZE', default=5000, cast=int)
+
+# Vote reset jobs: whether they are left to the run_reset_worker command (and
+# how often it polls) or run inside the request, rows cleared per transaction,
+# whether to drop the votes in one statement when the backend supports it, and
+# how long a job may go without reporting progress before it is treated as abandoned
+VOTE_RESET_IN_BACKGROUND = config('VOTE_RESET_IN_BACKGROUND', default=True, cast=bool)
+VOTE_RESET_POLL_INTERVAL = config('VOTE_RESET_POLL_INTERVAL', default=2, cast=float)
+VOTE_RESET_BATCH_SIZE = config('VOTE_RESET_BATCH_SIZE', default=5000, cast=int)
+VOTE_RESET_FAST_PATH = config('VOTE_RESET_FAST_PATH', default=True, cast=bool)
+VOTE_RESET_STALE_SECONDS = config('VOTE_RESET_STALE_SECONDS', default=600, cast=int)
+
+# has_voted answers from an in-process index of voted users; each process
+# picks up ballots cast elsewhere at most this often (seconds)
+VOTED_INDEX_ENABLED = config('VOTED_INDEX_ENABLED', default=True, cast=bool)
+VOTED_INDEX_SYNC_INTERVAL = config('VOTED_INDEX_SYNC_INTERVAL', default=1.0, cast=float)
+# Ids below the highest one seen that every sync reads again, to catch
+# ballots whose transactions committed out of id order
+VOTED_INDEX_SYNC_OVERLAP = config('VOTED_INDEX_SYNC_OVERLAP', default=1000, cast=int)
+
+# Add a has_voted claim to issued tokens so clients can skip the has_voted call
+JWT_HAS_VOTED_CLAIM = config('JWT_HAS_VOTED_CLAIM', default=False, cast=bool)
+
+# Candidate profile images are rendered at these widths (WebP and JPEG) by a
+# pool of CANDIDATE_IMAGE_WORKERS threads after upload
+CANDIDATE_IMAGE_WIDTHS = config('CANDIDATE_IMAGE_WIDTHS', default='160,320,640', cast=Csv(int))
+CANDIDATE_IMAGE_WORKERS = config('CANDIDATE_IMAGE_WORKERS', default=2, cast=int)
+CANDIDATE_IMAGES_IN_BACKGROUND = config('CANDIDATE_IMAGES_IN_BACKGROUND', default=True, cast=bool)
@@ -0,0 +1,227 @@
+"""
+Tests for the project-level views.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+from django.db import connections
+from django.db.backends.sqlite3 import base as sqlite_base
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from . import metrics, views
+from .db import pool as pool_module
+from .db.pool import ConnectionPool, PoolTimeout, PooledDatabaseWrapperMixin
+from .db.sqlite3 import base as tuned_sqlite
+from .db.writer import SerialWriter, serialized
+
+
+class HealthCheckTest(TestCase):
+    """Test the liveness and readiness endpoints."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        views._migrated = False
+    
+    def test_liveness(self):
+        """Test that liveness answers without touching the database."""
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/health/live/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_ready(self):
+        """Test that a migrated database and a working cache report ready."""
+        response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['checks'], {'database': 'ok', 'cache': 'ok'})
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        # The migration check is only paid until it first passes
+        with self.assertNumQueries(1):
+            self.client.get('/api/health/ready/')
+    
+    def test_not_ready(self):
+        """Test that unapplied migrations or a broken cache answer 503."""
+        with mock.patch('voting_platform.views.MigrationExecutor') as executor:
+            executor.return_value.migration_plan.return_value = [('votes', '9999_pending')]
+            response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['checks']['database'], 'unapplied migrations')
+        
+        with mock.patch('voting_platform.views.cache.get', side_effect=ConnectionError('down')):
+            with self.assertLogs('voting_platform.views', level='WARNING'):
+                response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['checks']['cache'], 'unreachable')
+    
+    def test_per_process_cache_with_several_workers(self):
+        """Test that a LocMemCache is only ready for a single worker process."""
+        with override_settings(WEB_CONCURRENCY=3):
+            response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['checks']['cache'], 'per-process cache with several workers')
+
+
+class ConnectionPoolTest(TestCase):
+    """Test the in-process connection pool."""
+    
+    def make_pool(self, **options):
+        options = {'size': 1, 'max_overflow': 1, 'timeout': 0.1, 'ping_after': 30, 'recycle': 3600, **options}
+        return ConnectionPool('test', lambda conn: conn.execute('SELECT 1'), **options)
+    
+    def test_reuse_overflow_and_timeout(self):
+        """Test that connections are reused, overflow is closed on return, and exhaustion times out."""
+        pool = self.make_pool()
+        first = pool.acquire(lambda: sqlite3.connect(':memory:', check_same_thread=False))
+        overflow = pool.acquire(lambda: sqlite3.connect(':memory:', check_same_thread=False))
+        self.assertEqual(pool.stats()['overflow'], 1)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(lambda: sqlite3.connect(':memory:'))
+        
+        pool.release(first)
+        pool.release(overflow)
+        self.assertEqual((pool.stats()['idle'], pool.stats()['in_use']), (1, 0))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            overflow.execute('SELECT 1')
+        self.assertIs(pool.acquire(lambda: None), first)
+    
+    def test_waiter_gets_released_connection(self):
+        """Test that a request waiting on a full pool is handed the next returned connection."""
+        pool = self.make_pool(max_overflow=0, timeout=5)
+        held = pool.acquire(lambda: sqlite3.connect(':memory:', check_same_thread=False))
+        threading.Timer(0.05, pool.release, [held]).start()
+        self.assertIs(pool.acquire(lambda: None), held)
+    
+    def test_broken_connections_replaced(self):
+        """Test that an idle connection failing its ping, or a non-reusable one, is replaced."""
+        pool = self.make_pool(ping_after=0)
+        broken = pool.acquire(lambda: sqlite3.connect(':memory:', check_same_thread=False))
+        pool.release(broken)
+        broken.close()
+        fresh = pool.acquire(lambda: sqlite3.connect(':memory:', check_same_thread=False))
+        self.assertIsNot(fresh, broken)
+        pool.release(fresh, reusable=False)
+        self.assertEqual(pool.stats()['idle'], 0)
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+
+class PooledBackendTest(TestCase):
+    """Test the pooled wrapper on top of a real Django backend."""
+    
+    databases = {'default'}
+    
+    def test_wrapper_returns_connection_to_pool(self):
+        class DatabaseWrapper(PooledDatabaseWrapperMixin, sqlite_base.DatabaseWrapper):
+            pass
+        
+        # SQLite ignores close() on in-memory databases, so use a file
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(tmp.name, 'pooled.sqlite3'),
+            'POOL': {'SIZE': 1, 'MAX_OVERFLOW': 0},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias='pooled-test')
+        self.addCleanup(pool_module._pools.pop, 'pooled-test', None)
+        
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.close()
+        self.assertIsNone(wrapper.connection)
+        
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(metrics.snapshot()['gauges']['db.pool.pooled-test']['in_use'], 1)
+        wrapper.close()
+
+
+class SqliteTuningTest(TestCase):
+    """Test the SQLite pragmas and the serialized writer."""
+    
+    def make_wrapper(self, path):
+        wrapper = tuned_sqlite.DatabaseWrapper({
+            **connections['default'].settings_dict,
+            'NAME': path,
+            'PRAGMAS': {'busy_timeout': 2000, 'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'mmap_size': 1 << 20},
+        }, alias='tuned-test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+    
+    def make_database(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'tuned.sqlite3')
+        with sqlite3.connect(path) as setup:
+            setup.execute('CREATE TABLE ballots (id INTEGER PRIMARY KEY)')
+            setup.execute('INSERT INTO ballots DEFAULT VALUES')
+        setup.close()
+        return path
+    
+    def test_pragmas_applied(self):
+        """Test that every new connection gets the configured pragmas."""
+        wrapper = self.make_wrapper(self.make_database())
+        with wrapper.cursor() as cursor:
+            values = {}
+            for name in ('journal_mode', 'busy_timeout', 'synchronous', 'mmap_size'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        # synchronous NORMAL reads back as 1
+        self.assertEqual(values, {'journal_mode': 'wal', 'busy_timeout': 2000, 'synchronous': 1, 'mmap_size': 1 << 20})
+    
+    def test_reads_and_writes_during_a_write(self):
+        """Test that readers see committed rows and writers wait while another write holds the lock."""
+        path = self.make_database()
+        wrapper = self.make_wrapper(path)
+        wrapper.ensure_connection()
+        
+        writer = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(writer.close)
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute('INSERT INTO ballots DEFAULT VALUES')
+        
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM ballots')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        
+        # A second writer waits out the lock (busy_timeout) instead of failing
+        threading.Timer(0.1, writer.execute, ['COMMIT']).start()
+        with wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO ballots DEFAULT VALUES')
+            cursor.execute('SELECT COUNT(*) FROM ballots')
+            self.assertEqual(cursor.fetchone()[0], 3)
+    
+    def test_writer_runs_one_at_a_time_in_order(self):
+        """Test that the writer runs calls on one thread, never overlapping, and re-raises errors."""
+        serial = SerialWriter()
+        running, seen, threads = [], [], set()
+        
+        def write(n):
+            running.append(n)
+            self.assertEqual(len(running), 1)
+            threads.add(threading.get_ident())
+            seen.append(n)
+            running.remove(n)
+            return n * 2
+        
+        results = {}
+        callers = [threading.Thread(target=lambda n=n: results.__setitem__(n, serial.run(write, n))) for n in range(20)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        
+        self.assertEqual(results, {n: n * 2 for n in range(20)})
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(threading.get_ident(), threads)
+        with self.assertRaises(ZeroDivisionError):
+            serial.run(lambda: 1 / 0)
+        self.assertEqual(serial.stats(), {'pending': 0})
+    
+    def test_writes_in_a_transaction_run_inline(self):
+        """Test that a write inside an open transaction stays on the caller's connection."""
+        # TestCase wraps every test in a transaction
+        self.assertEqual(serialized(threading.get_ident), threading.get_ident())
@@ -1,10 +1,14 @@
 """
 URL configuration for voting_platform project.
 """
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
+from . import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,6 +16,9 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/candidates/', include('candidates.urls')),
     path('api/votes/', include('votes.urls')),
+    path('api/metrics/', views.metrics, name='metrics'),
+    path('api/health/live/', views.liveness, name='liveness'),
+    path('api/health/ready/', views.readiness, name='readiness'),
 ]
 
 # Optional: API Documentation (uncomment after installing drf-yasg)
@@ -44,5 +51,13 @@ urlpatterns = [
 
 # Serve media files in development
 if settings.DEBUG:
+    urlpatterns += [
+        # Content-hashed image renditions never change, so let browsers keep them
+        re_path(
+            r'^%s(?P<path>candidates/variants/.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            cache_control(public=True, max_age=31536000, immutable=True)(serve),
+            {'document_root': settings.MEDIA_ROOT},
+        ),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
@@ -0,0 +1,86 @@
+"""
+Project-level views.
+"""
+import logging
+import uuid
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from rest_framework import status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from . import metrics as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Set once this process has seen every migration applied; schemas only move forward
+_migrated = False
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """ADMIN-ONLY: Counters and gauges for the worker process serving the request."""
+    return Response(metrics_registry.snapshot(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def liveness(request):
+    """Process is up and serving requests; touches nothing else."""
+    return Response({'status': 'alive'}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def readiness(request):
+    """
+    Ready to take traffic: the database answers and is fully migrated, and the
+    cache (shared by throttles, idempotency keys and version stamps) works.
+    """
+    checks = {'database': _check_database(), 'cache': _check_cache()}
+    ready = all(result == 'ok' for result in checks.values())
+    return Response(
+        {'status': 'ready' if ready else 'unavailable', 'checks': checks},
+        status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Cache-Control': 'no-store'}
+    )
+
+
+def _check_database():
+    global _migrated
+    try:
+        connection = connections[DEFAULT_DB_ALIAS]
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not _migrated:
+            executor = MigrationExecutor(connection)
+            if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+                return 'unapplied migrations'
+            _migrated = True
+    except Exception as e:
+        logger.warning('Readiness database check failed: %s', e)
+        return 'unreachable'
+    return 'ok'
+
+
+def _check_cache():
+    # Each process would keep its own throttles, idempotency records and versions
+    if isinstance(caches['default'], LocMemCache) and settings.WEB_CONCURRENCY > 1:
+        return 'per-process cache with several workers'
+    key, value = 'health:readiness', uuid.uuid4().hex
+    try:
+        cache.set(key, value, 10)
+        if cache.get(key) != value:
+            return 'not retaining values'
+    except Exception as e:
+        logger.warning('Readiness cache check failed: %s', e)
+        return 'unreachable'
+    return 'ok'
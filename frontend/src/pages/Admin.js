@@ -32,6 +32,18 @@ const Admin = () => {
     }
   }, [user]);
 
+  // List endpoints are cursor-paginated; follow `next` until the last page
+  const fetchAllPages = async (url, headers) => {
+    const rows = [];
+    let next = url;
+    while (next) {
+      const response = await axios.get(next, { headers });
+      rows.push(...response.data.results);
+      next = response.data.next;
+    }
+    return rows;
+  };
+
   const fetchAllData = async () => {
     setLoading(true);
     setError('');
@@ -39,16 +51,14 @@ const Admin = () => {
     const headers = { Authorization: `Bearer ${token}` };
     try {
       // Fetch users
-      const usersRes = await axios.get('http://localhost:8000/api/users/', { headers });
-      setUsers(usersRes.data);
+      setUsers(await fetchAllPages('http://localhost:8000/api/users/?page_size=500', headers));
 
       // Fetch candidates
       const candidatesRes = await axios.get('http://localhost:8000/api/candidates/', { headers });
       setCandidates(candidatesRes.data);
 
       // Fetch votes
-      const votesRes = await axios.get('http://localhost:8000/api/votes/', { headers });
-      setVotes(votesRes.data);
+      setVotes(await fetchAllPages('http://localhost:8000/api/votes/?page_size=500', headers));
 
       // Fetch statistics
       const statsRes = await axios.get('http://localhost:8000/api/votes/statistics/', { headers });
@@ -140,13 +150,26 @@ const Admin = () => {
     
     try {
       const token = localStorage.getItem('access_token');
-      await axios.post('http://localhost:8000/api/votes/reset/', {}, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
+      const headers = { Authorization: `Bearer ${token}` };
+      const response = await axios.post('http://localhost:8000/api/votes/reset/', {}, { headers });
+      
+      // The reset runs in the background; poll its progress until it finishes
+      let job = response.data;
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const progress = await axios.get(
+          `http://localhost:8000/api/votes/reset/${job.job_id}/`, { headers }
+        );
+        job = progress.data;
+      }
       fetchAllData();
-      alert('All votes have been reset');
+      if (job.status === 'succeeded') {
+        alert(`All votes have been reset (${job.votes_deleted} votes removed)`);
+      } else {
+        alert(`Failed to reset votes: ${job.error}`);
+      }
     } catch (err) {
-      alert('Failed to reset votes');
+      alert(err.response?.data?.error || 'Failed to reset votes');
       console.error('Error resetting votes:', err);
     }
   };
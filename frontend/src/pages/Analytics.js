@@ -11,9 +11,22 @@ const Analytics = () => {
 
   useEffect(() => {
     fetchStatistics();
-    // Refresh statistics every 5 seconds
-    const interval = setInterval(fetchStatistics, 5000);
-    return () => clearInterval(interval);
+    // Live updates over Server-Sent Events; fall back to polling every 5 seconds
+    let interval = null;
+    const source = new EventSource('http://localhost:8000/api/votes/statistics/stream/');
+    source.addEventListener('statistics', (event) => {
+      setStatistics(JSON.parse(event.data));
+      setLoading(false);
+    });
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && !interval) {
+        interval = setInterval(fetchStatistics, 5000);
+      }
+    };
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   const fetchStatistics = async () => {
@@ -96,18 +96,29 @@ const Dashboard = () => {
             {candidates.map((candidate) => (
               <div key={candidate.id} className="dashboard-candidate-card">
                 {candidate.profile_image_url ? (
-                  <img
-                    src={candidate.profile_image_url}
-                    alt={candidate.name}
-                    style={{
-                      width: '100px',
-                      height: '100px',
-                      borderRadius: '50%',
-                      objectFit: 'cover',
-                      marginBottom: '20px',
-                      border: '3px solid #f7fafc'
-                    }}
-                  />
+                  <picture>
+                    {candidate.profile_image_srcset && (
+                      <source
+                        type="image/webp"
+                        srcSet={candidate.profile_image_srcset.webp}
+                        sizes="100px"
+                      />
+                    )}
+                    <img
+                      src={candidate.profile_image_url}
+                      srcSet={candidate.profile_image_srcset?.jpeg}
+                      sizes="100px"
+                      alt={candidate.name}
+                      style={{
+                        width: '100px',
+                        height: '100px',
+                        borderRadius: '50%',
+                        objectFit: 'cover',
+                        marginBottom: '20px',
+                        border: '3px solid #f7fafc'
+                      }}
+                    />
+                  </picture>
                 ) : (
                   <div style={{
                     width: '100px',
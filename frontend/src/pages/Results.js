@@ -13,6 +13,51 @@ const Results = () => {
 
   useEffect(() => {
     fetchResults();
+    // Live per-candidate counts over Server-Sent Events; fall back to polling every 5 seconds.
+    // EventSource cannot send headers, so the stream is opened with a single-use ticket.
+    let interval = null;
+    let source = null;
+    let cancelled = false;
+    const startPolling = () => {
+      if (!interval) {
+        interval = setInterval(fetchResults, 5000);
+      }
+    };
+    axios.post('http://127.0.0.1:8000/api/votes/results/stream/ticket/', null, {
+      headers: { Authorization: `Bearer ${token}` },
+    }).then((response) => {
+      if (cancelled) return;
+      source = new EventSource(
+        `http://127.0.0.1:8000/api/votes/results/stream/?ticket=${encodeURIComponent(response.data.ticket)}`
+      );
+      source.addEventListener('results', (event) => {
+        const data = JSON.parse(event.data);
+        setResults(data);
+        setTotalVotes(data.reduce((sum, candidate) => sum + candidate.vote_count, 0));
+      });
+      source.addEventListener('delta', (event) => {
+        const delta = JSON.parse(event.data);
+        setResults((current) => current
+          .filter((candidate) => !delta.removed.includes(candidate.id))
+          .map((candidate) => (
+            String(candidate.id) in delta.changed
+              ? { ...candidate, vote_count: delta.changed[candidate.id] }
+              : candidate
+          ))
+          .sort((a, b) => b.vote_count - a.vote_count));
+        setTotalVotes(delta.total_votes);
+      });
+      // The ticket is spent, so a dropped stream cannot reconnect; poll instead
+      source.onerror = () => {
+        source.close();
+        startPolling();
+      };
+    }).catch(startPolling);
+    return () => {
+      cancelled = true;
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   const fetchResults = async () => {
@@ -1,5 +1,5 @@
 import '../HomeResponsive.css';
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { useAuth } from '../context/AuthContext';
@@ -15,6 +15,9 @@ const Vote = () => {
   const [error, setError] = useState('');
   const { token } = useAuth();
   const navigate = useNavigate();
+  // One key per ballot, reused when the same vote is retried, so a retry
+  // after a lost response gets the original receipt back
+  const voteAttempt = useRef(null);
 
   useEffect(() => {
     fetchCandidates();
@@ -57,11 +60,20 @@ const Vote = () => {
     setSubmitting(true);
     setError('');
 
+    if (voteAttempt.current?.candidate !== selectedCandidate) {
+      voteAttempt.current = { candidate: selectedCandidate, key: crypto.randomUUID() };
+    }
+
     try {
       await axios.post(
         `http://127.0.0.1:8000/api/votes/${selectedCandidate}/`,
         {},
-        { headers: { Authorization: `Bearer ${token}` } }
+        {
+          headers: {
+            Authorization: `Bearer ${token}`,
+            'Idempotency-Key': voteAttempt.current.key,
+          },
+        }
       );
       setVoteSuccess(true);
       setHasVoted(true);
@@ -262,11 +274,22 @@ const Vote = () => {
 
                 <div className="candidate-header-premium">
                   {candidate.profile_image_url ? (
-                    <img 
-                      src={candidate.profile_image_url} 
-                      alt={candidate.name}
-                      className="candidate-image-premium"
-                    />
+                    <picture>
+                      {candidate.profile_image_srcset && (
+                        <source
+                          type="image/webp"
+                          srcSet={candidate.profile_image_srcset.webp}
+                          sizes="140px"
+                        />
+                      )}
+                      <img 
+                        src={candidate.profile_image_url} 
+                        srcSet={candidate.profile_image_srcset?.jpeg}
+                        sizes="140px"
+                        alt={candidate.name}
+                        className="candidate-image-premium"
+                      />
+                    </picture>
                   ) : (
                     <div style={{
                       width: '140px',
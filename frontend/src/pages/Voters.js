@@ -14,8 +14,15 @@ const Voters = () => {
 
   const fetchVoters = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/votes/voters/');
-      setVoters(response.data);
+      // Cursor-paginated: follow `next` until the last page
+      const rows = [];
+      let next = 'http://localhost:8000/api/votes/voters/?page_size=500';
+      while (next) {
+        const response = await axios.get(next);
+        rows.push(...response.data.results);
+        next = response.data.next;
+      }
+      setVoters(rows);
     } catch (err) {
       setError('Failed to load voters. Please try again.');
       console.error('Error fetching voters:', err);